@@ -5,7 +5,7 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-import pandas as pd, pytz, numpy as np
+import pandas as pd, pytz, numpy as np, os
 from weakref import WeakValueDictionary
 from datetime import datetime
 from dateutil import rrule
@@ -28,7 +28,13 @@ class Calendar (object):
         try:
             instance = cls.cache['calendar']
         except KeyError:
-            all_sessions = tsclient.to_ts_calendar('1990-01-01', '3000-01-01').values
+            # sessions file (one %Y-%m-%d per line) e.g. offline runs and benchmarks
+            sessions_path = os.environ.get('ARKQUANT_SESSIONS')
+            if sessions_path:
+                # python str as sessions of tsclient
+                all_sessions = np.loadtxt(sessions_path, dtype=str, ndmin=1).astype(object)
+            else:
+                all_sessions = tsclient.to_ts_calendar('1990-01-01', '3000-01-01').values
             # cls.cache['calendar'] = instance = super(TradingCalendar, cls).__new__(cls)._init(all_sessions)
             # 继承方式调用 -- __new__ 方法（实例）
             cls.cache['calendar'] = instance = super().__new__(cls)._init(all_sessions)
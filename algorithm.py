@@ -52,6 +52,7 @@ from metric.tracker import MetricsTracker, _ClassicRiskMetrics
 from util.wrapper import api_method
 from util.api_support import AlgoAPI
 from util.events import EventManager, Event, Always
+from util.profiling import logger
 # benchmark source
 from gateway.driver.benchmark_source import BenchmarkSource
 
@@ -116,6 +117,8 @@ class TradingAlgorithm(object):
                  disallow_righted=True,
                  disallowed_violation=True,
                  engine=None,
+                 pipeline_executor=None,
+                 pipeline_chunk_size=None,
                  # risk
                  risk_fuse=None,
                  risk_models=None,
@@ -151,6 +154,8 @@ class TradingAlgorithm(object):
         self.final = final or Final()
         self.pipelines = pipelines or []
         self.pipeline_engine = engine
+        self.pipeline_executor = pipeline_executor
+        self.pipeline_chunk_size = pipeline_chunk_size
         # set risk module
         self.risk_allocation = risk_allocation or Equal()
         self.risk_models = risk_models or NoRisk()
@@ -230,7 +235,11 @@ class TradingAlgorithm(object):
                                                         self.final,
                                                         self.restrictions,
                                                         self.righted,
-                                                        self.violated)
+                                                        self.violated,
+                                                        executor=self.pipeline_executor,
+                                                        chunk_size=self.pipeline_chunk_size)
+            if self.pipeline_chunk_size:
+                self.pipeline_engine.initialize_chunks(self.sim_params.sessions)
 
             self.ledger = Ledger(self.sim_params, self.risk_models, self.risk_fuse)
             self._create_broker()
@@ -252,7 +261,8 @@ class TradingAlgorithm(object):
         """
         If the clock property is not set, then create one based on frequency.
         """
-        return MinuteSimulationClock(self.sim_params)
+        return MinuteSimulationClock(self.sim_params,
+                                     minute_emission=self.sim_params.data_frequency == 'minute')
 
     def _create_simulation(self):
         """
@@ -331,7 +341,7 @@ class TradingAlgorithm(object):
         aggregate_stats['daily_perf'] = daily_perf
         aggregate_stats['cumulative_risk_metrics'] = cumulative_perf
         aggregate_stats['title'] = perfs[-1]
-        print('aggregate_stats', aggregate_stats)
+        logger.debug('aggregate_stats %s', aggregate_stats)
         return aggregate_stats
 
     def run(self):
@@ -341,9 +351,12 @@ class TradingAlgorithm(object):
         # Create px_trade and loop through simulated_trading.
         # Each iteration returns a perf dictionary
         perfs = []
-        for perf in self.yield_simulation():
-            print('perf', perf)
-            perfs.append(perf)
+        try:
+            for perf in self.yield_simulation():
+                logger.debug('perf %s', perf)
+                perfs.append(perf)
+        finally:
+            self.pipeline_engine.close()
         # convert perf dict to pandas frame
         analysis = self._create_daily_stats(perfs)
         # analysis = self.analyse(daily_stats)
@@ -497,10 +510,26 @@ class TradingAlgorithm(object):
         try:
             pipeline = Pipeline(terms, ump_pickers)
         except Exception as e:
-            print('can not create pipeline due to %s' % e)
+            logger.warning('can not create pipeline due to %s', e)
         else:
             self.attach_pipeline(pipeline)
 
+    def set_pipeline_executor(self, executor):
+        """
+        :param executor: None (serial) , 'thread' or 'process' --- run pipelines concurrently
+        """
+        if self.initialized:
+            raise AttributeError
+        self.pipeline_executor = executor
+
+    def set_pipeline_chunk_size(self, chunk_size):
+        """
+        :param chunk_size: int e.g. 126 , load metadata and precompute pipelines by chunk of sessions
+        """
+        if self.initialized:
+            raise AttributeError
+        self.pipeline_chunk_size = chunk_size
+
     def set_engine_restriction(self,
                                righted=True,
                                violated=True):
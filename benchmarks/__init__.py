@@ -0,0 +1,43 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+
+asv benchmarks on synthetic market data --- no mysql , bcolz or network needed
+    asv run --quick
+    asv continuous master HEAD
+
+dependencies are pinned by the matrix of asv.conf.json (SQLAlchemy 1.x , sa.select([...]) and
+engine.execute are used) , --python=same runs in the current environment instead
+
+environment (must be set before ArkQuant modules are imported , done here on package import):
+    ARKQUANT_BENCH_ROOT --- directory of synthetic data , default ~/.arkquant/asv
+    ARKQUANT_BENCH_SIDS --- number of equities , default 100
+    ARKQUANT_BENCH_DAYS --- number of sessions , default 500
+    ARKQUANT_ENGINE / ARKQUANT_SESSIONS / ARKQUANT_BENCHMARK --- point to the synthetic sqlite db ,
+    sessions file and benchmark store unless already set
+"""
+import os, sys
+import numpy as np, pandas as pd
+
+# repo modules are top level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BenchRoot = os.environ.get('ARKQUANT_BENCH_ROOT', os.path.join(os.path.expanduser('~'), '.arkquant', 'asv'))
+BenchSids = int(os.environ.get('ARKQUANT_BENCH_SIDS', 100))
+BenchDays = int(os.environ.get('ARKQUANT_BENCH_DAYS', 500))
+# first synthetic session
+BenchStart = '2018-01-02'
+
+os.makedirs(BenchRoot, exist_ok=True)
+
+SessionsPath = os.path.join(BenchRoot, 'sessions_%d.txt' % BenchDays)
+if not os.path.exists(SessionsPath):
+    # weekdays stand for trading days
+    np.savetxt(SessionsPath, pd.bdate_range(BenchStart, periods=BenchDays).strftime('%Y-%m-%d'), fmt='%s')
+
+os.environ.setdefault('ARKQUANT_ENGINE', 'sqlite:///%s' % os.path.join(BenchRoot, 'ark_%dx%d.db' % (BenchSids, BenchDays)))
+os.environ.setdefault('ARKQUANT_SESSIONS', SessionsPath)
+os.environ.setdefault('ARKQUANT_BENCHMARK', os.path.join(BenchRoot, 'benchmark'))
@@ -0,0 +1,54 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+from benchmarks.synthetic import prepare_market
+
+
+class TimeHistoryWindow(object):
+    """
+        DataPortal.get_history_window over the synthetic universe
+    """
+    # bar_count is negative --- window ends before end_date
+    params = ([10, 100], [-20, -120], ['daily', 'minute'])
+    param_names = ['assets', 'bar_count', 'frequency']
+
+    def setup(self, n_assets, bar_count, frequency):
+        from gateway.asset.assets import Equity
+        from gateway.driver.data_portal import portal
+        market = prepare_market()
+        if n_assets > len(market.sids) or (frequency == 'minute' and n_assets > 10):
+            # minute windows of the whole universe are out of laptop scope
+            raise NotImplementedError()
+        self.portal = portal
+        self.assets = [Equity(sid) for sid in market.sids[:n_assets]]
+        self.end_date = market.sessions[-1]
+
+    def time_get_history_window(self, n_assets, bar_count, frequency):
+        self.portal.get_history_window(self.assets, self.end_date, bar_count, ['open', 'close'], frequency)
+
+
+class TimeAdjustments(object):
+    """
+        HistoryCompatibleAdjustments.calculate_adjustments_in_sessions --- qfq coef of dividends and rights
+    """
+    params = [10, 100]
+    param_names = ['assets']
+
+    def setup(self, n_assets):
+        from gateway.asset.assets import Equity
+        from gateway.driver.adjustArray import HistoryCompatibleAdjustments
+        from gateway.driver.bar_reader import AssetSessionReader
+        from gateway.driver.adjustment_reader import SQLiteAdjustmentReader
+        market = prepare_market()
+        if n_assets > len(market.sids):
+            raise NotImplementedError()
+        self.adjustments = HistoryCompatibleAdjustments(AssetSessionReader(), SQLiteAdjustmentReader())
+        self.assets = [Equity(sid) for sid in market.sids[:n_assets]]
+        self.sessions = [market.sessions[0], market.sessions[-1]]
+
+    def time_calculate_adjustments_in_sessions(self, n_assets):
+        self.adjustments.calculate_adjustments_in_sessions(self.sessions, self.assets)
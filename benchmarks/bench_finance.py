@@ -0,0 +1,78 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import pandas as pd
+from benchmarks.synthetic import prepare_market
+
+
+class TimeBulkTransactions(object):
+    """
+        SimulationBlotter.create_bulk_transactions of ticker orders , one per asset
+    """
+    params = [10, 100]
+    param_names = ['orders']
+
+    def setup(self, n_orders):
+        from gateway.asset.assets import Equity
+        from finance.order import TickerOrder
+        from finance.slippage import FixedBasisPointSlippage
+        from finance.execution import LimitOrder
+        from finance.commission import Commission
+        from pb.blotter import SimulationBlotter
+        market = prepare_market()
+        if n_orders > len(market.sids):
+            raise NotImplementedError()
+        self.blotter = SimulationBlotter(Commission(), FixedBasisPointSlippage(), LimitOrder(0.08))
+        self.session = market.sessions[-1]
+        ticker = pd.Timestamp(self.session + ' 10:00')
+        self.assets = [Equity(sid) for sid in market.sids[:n_orders]]
+        self.orders = [TickerOrder(asset, 100, ticker) for asset in self.assets]
+
+    def time_create_bulk_transactions(self, n_orders):
+        self.blotter.create_bulk_transactions(self.orders, self.session)
+
+
+class TimeEndOfSession(object):
+    """
+        Ledger.end_of_session --- synchronize positions with closes and update portfolio stats
+    """
+    params = [10, 100]
+    param_names = ['positions']
+
+    def setup(self, n_positions):
+        from gateway.asset.assets import Equity
+        from finance.ledger import Ledger
+        from finance.transaction import Transaction
+        from risk.alert import PositionLossRisk
+        from risk.fuse import Fuse
+        from trade.params import create_simulation_parameters
+        market = prepare_market()
+        if n_positions > len(market.sids):
+            raise NotImplementedError()
+        session = market.sessions[-1]
+        sim_params = create_simulation_parameters(start=market.sessions[-20],
+                                                  end=session,
+                                                  delay=None,
+                                                  loan_base=None,
+                                                  per_capital=None,
+                                                  capital_base=None,
+                                                  data_frequency='daily',
+                                                  benchmark=None)
+        self.ledger = Ledger(sim_params, PositionLossRisk(0.1), Fuse(0.85))
+        created_dt = pd.Timestamp(session + ' 10:00')
+        loc = len(market.sessions) - 1
+        transactions = [Transaction(asset=Equity(sid),
+                                    amount=100,
+                                    price=market.daily['open'][loc, i],
+                                    dts=created_dt,
+                                    cost=5.0)
+                        for i, sid in enumerate(market.sids[:n_positions])]
+        self.ledger.start_of_session(session)
+        self.ledger.process_transaction(transactions)
+
+    def time_end_of_session(self, n_positions):
+        self.ledger.end_of_session()
@@ -0,0 +1,39 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+from benchmarks.synthetic import prepare_market
+
+
+class TimeExecutionPlan(object):
+    """
+        Pipeline.to_execution_plan of the default pipeline (cross -> break , as run.py) on a session ,
+        metadata loaded in setup so that only the terms are timed
+    """
+    params = [10, 100]
+    param_names = ['assets']
+
+    def setup(self, n_assets):
+        from gateway.asset.assets import Equity
+        from pipe.term import Term
+        from pipe.pipeline import Pipeline
+        from pipe.final import Final
+        from pipe.loader.loader import PricingLoader
+        market = prepare_market()
+        if n_assets > len(market.sids):
+            raise NotImplementedError()
+        cross_term = Term('cross', {'window': (5, 10), 'fields': ['close']})
+        break_term = Term('break', {'fields': ['close'], 'window': 5, 'final': True}, cross_term)
+        self.pipeline = Pipeline([break_term, cross_term])
+        self.final = Final()
+        self.session = market.sessions[-1]
+        assets = [Equity(sid) for sid in market.sids[:n_assets]]
+        loader = PricingLoader([break_term, cross_term])
+        self.metadata = loader.load_pipeline_arrays(self.session, assets, 'daily')
+        self.mask = [asset for asset in assets if asset.sid in self.metadata]
+
+    def time_to_execution_plan(self, n_assets):
+        self.pipeline.to_execution_plan(self.metadata, self.mask, self.final)
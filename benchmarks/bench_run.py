@@ -0,0 +1,32 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+from benchmarks.synthetic import prepare_market
+
+
+class TimeRunAlgorithm(object):
+    """
+        full run_algorithm (default pipeline , broker , blotter , ledger , metrics) over the
+        latest sessions of the synthetic market
+    """
+    params = [20, 60]
+    param_names = ['sessions']
+    # a backtest is long enough to be timed once per sample
+    number = 1
+    repeat = 3
+    timeout = 1800
+
+    def setup(self, n_sessions):
+        market = prepare_market()
+        if n_sessions >= len(market.sessions):
+            raise NotImplementedError()
+        self.start = market.sessions[-n_sessions]
+        self.end = market.sessions[-1]
+
+    def time_run_algorithm(self, n_sessions):
+        from run import run_algorithm
+        run_algorithm(start=self.start, end=self.end, benchmark='000001')
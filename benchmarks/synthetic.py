@@ -0,0 +1,242 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import numpy as np, pandas as pd, sqlalchemy as sa
+from functools import lru_cache
+from benchmarks import BenchSids, BenchDays, SessionsPath
+
+# minutes of session relative to midnight --- 9:30 - 11:30 , 13:00 - 15:00 (same as trade.clock)
+MinuteOffsets = np.concatenate([
+    np.arange(9 * 60 + 30, 11 * 60 + 31),
+    np.arange(13 * 60, 15 * 60 + 1)
+]).astype('timedelta64[m]')
+
+# rows per executemany
+WriteChunk = 5000
+
+
+class SyntheticMarket(object):
+    """
+        N sids × M sessions of synthetic equity data , deterministic for a seed
+        1 OHLCV --- geometric brownian motion of close restricted to 10% limit , open / high / low
+                    around close , pct is amplitude (as equity_price)
+        2 dividends --- sid_bonus , sid_transfer , bonus (per 10 shares) ; progress 实施
+        3 rights --- rights_bonus (per 10 shares) at a discount of close
+        4 minutes --- generated on demand per (sid , session) , bridged from open to close within
+                      high / low of session
+    """
+    def __init__(self,
+                 n_sids=BenchSids,
+                 n_days=BenchDays,
+                 seed=0,
+                 dividend_ratio=0.5,
+                 rights_ratio=0.1):
+        self.seed = seed
+        self.sessions = np.loadtxt(SessionsPath, dtype=str, ndmin=1)[:n_days]
+        # half shanghai , half shenzhen
+        self.sids = ['60%04d' % i if i % 2 == 0 else '00%04d' % i for i in range(n_sids)]
+        self._sid_loc = {sid: i for i, sid in enumerate(self.sids)}
+        self._session_loc = {session: k for k, session in enumerate(self.sessions)}
+        rng = np.random.RandomState(seed)
+        self._init_daily(rng)
+        self._init_adjustments(rng, dividend_ratio, rights_ratio)
+
+    def _init_daily(self, rng):
+        m, n = len(self.sessions), len(self.sids)
+        returns = np.clip(rng.normal(0.0003, 0.02, (m, n)), -0.099, 0.099)
+        self.initial_price = np.round(rng.uniform(5, 50, n), 2)
+        close = self.initial_price * np.cumprod(1 + returns, axis=0)
+        pre_close = np.vstack([self.initial_price, close[:-1]])
+        open_ = pre_close * (1 + np.clip(rng.normal(0, 0.005, (m, n)), -0.05, 0.05))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, (m, n))))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, (m, n))))
+        volume = (rng.lognormal(10, 1, (m, n)) * 100).astype('int64')
+        self.shares = rng.randint(1, 100, n) * 1e7
+        self.daily = {
+            'open': np.round(open_, 2),
+            'high': np.round(high, 2),
+            'low': np.round(low, 2),
+            'close': np.round(close, 2),
+            'volume': volume,
+            'amount': np.round(volume * (open_ + close) / 2, 2),
+            'pct': np.round((high - low) * 100 / pre_close, 2)
+        }
+
+    def _init_adjustments(self, rng, dividend_ratio, rights_ratio):
+        m = len(self.sessions)
+        dividends, rights = [], []
+        for i, sid in enumerate(self.sids):
+            # ex_date --- registered date , pay_date --- next session
+            if rng.rand() < dividend_ratio:
+                k = rng.randint(20, m - 1)
+                dividends.append({'sid': sid,
+                                  'declared_date': self.sessions[k - 10],
+                                  'ex_date': self.sessions[k],
+                                  'pay_date': self.sessions[k + 1],
+                                  'effective_date': self.sessions[k + 1],
+                                  'sid_bonus': int(rng.choice([0, 2, 3])),
+                                  'sid_transfer': int(rng.choice([0, 0, 2, 5])),
+                                  'bonus': round(rng.uniform(0.5, 3), 2),
+                                  'progress': '实施'})
+            if rng.rand() < rights_ratio:
+                k = rng.randint(20, m - 1)
+                rights.append({'sid': sid,
+                               'declared_date': self.sessions[k - 10],
+                               'ex_date': self.sessions[k],
+                               'pay_date': self.sessions[k + 1],
+                               'effective_date': self.sessions[k + 1],
+                               'rights_bonus': int(rng.choice([2, 3])),
+                               'rights_price': round(self.daily['close'][k, i] * 0.7, 2)})
+        self.dividends = dividends
+        self.rights = rights
+
+    def daily_frame(self):
+        """
+        :return: DataFrame columns --- equity_price
+        """
+        m, n = len(self.sessions), len(self.sids)
+        frame = pd.DataFrame({field: values.ravel() for field, values in self.daily.items()})
+        frame['trade_dt'] = np.repeat(self.sessions, n)
+        frame['sid'] = np.tile(self.sids, m)
+        return frame
+
+    def m_cap_frame(self):
+        m, n = len(self.sessions), len(self.sids)
+        mkv = self.daily['close'] * self.shares
+        return pd.DataFrame({'sid': np.tile(self.sids, m),
+                             'trade_dt': np.repeat(self.sessions, n),
+                             'mkv': mkv.ravel(),
+                             'mkv_cap': (mkv * 0.8).ravel(),
+                             'mkv_strict': (mkv * 0.2).ravel()})
+
+    def benchmark_closes(self):
+        """
+            equal weighted index of synthetic closes
+        """
+        close = self.daily['close'] / self.initial_price
+        return pd.Series(close.mean(axis=1) * 1000, index=self.sessions)
+
+    def minute_frame(self, sid, session):
+        i, k = self._sid_loc[sid], self._session_loc[session]
+        bar = {field: values[k, i] for field, values in self.daily.items()}
+        rng = np.random.RandomState([self.seed, i, k])
+        length = len(MinuteOffsets)
+        # brownian bridge from open to close within high / low
+        walk = np.cumsum(rng.normal(0, 1, length))
+        bridge = walk - np.linspace(0, 1, length) * walk[-1]
+        spread = (bar['high'] - bar['low']) / 4
+        close = bar['open'] + (bar['close'] - bar['open']) * np.linspace(0, 1, length) + \
+            spread * bridge / max(np.abs(bridge).max(), 1e-8)
+        close = np.round(np.clip(close, bar['low'], bar['high']), 2)
+        open_ = np.concatenate([[bar['open']], close[:-1]])
+        volume = rng.multinomial(bar['volume'], np.full(length, 1 / length))
+        minutes = pd.DatetimeIndex(np.datetime64(session, 'm') + MinuteOffsets)
+        return pd.DataFrame({'open': open_,
+                             'high': np.maximum(open_, close),
+                             'low': np.minimum(open_, close),
+                             'close': close,
+                             'volume': volume,
+                             'amount': np.round(volume * close, 2)}, index=minutes)
+
+    def write_sqlite(self, engine):
+        """
+            write assets , prices , market values and adjustments into the tables of db_schema ,
+            skipped if the db was written before
+        """
+        from gateway.database.db_schema import metadata
+        tables = metadata.tables
+        if engine.execute(sa.select([sa.func.count()]).select_from(tables['asset_router'])).scalar():
+            return
+        router = [{'sid': sid,
+                   'asset_name': 'SYN%s' % sid,
+                   'asset_type': 'equity',
+                   'exchange': '上海证券交易所' if sid.startswith('6') else '深圳证券交易所',
+                   'first_traded': self.sessions[0],
+                   'last_traded': None,
+                   'country_code': 'CH'} for sid in self.sids]
+        basics = [{'sid': sid,
+                   'dual_sid': None,
+                   'broker': 'synthetic',
+                   'district': '000000',
+                   'initial_price': float(price),
+                   'business_scope': ''} for sid, price in zip(self.sids, self.initial_price)]
+        with engine.begin() as conn:
+            conn.execute(tables['asset_router'].insert(), router)
+            conn.execute(tables['equity_basics'].insert(), basics)
+            for name, frame in [('equity_price', self.daily_frame()), ('m_cap', self.m_cap_frame())]:
+                records = frame.to_dict('records')
+                for loc in range(0, len(records), WriteChunk):
+                    conn.execute(tables[name].insert(), records[loc: loc + WriteChunk])
+            if self.dividends:
+                conn.execute(tables['equity_splits'].insert(), self.dividends)
+            if self.rights:
+                conn.execute(tables['equity_rights'].insert(), self.rights)
+
+
+class InMemoryMinuteReader(object):
+    """
+        minute bar reader (BcolzMinuteReader interface) serving minutes of SyntheticMarket ,
+        minutes of recent (sid , session) are cached
+    """
+    def __init__(self, market, cache_size=4096):
+        self._market = market
+        self._minutes = lru_cache(maxsize=cache_size)(market.minute_frame)
+
+    @property
+    def data_frequency(self):
+        return 'minute'
+
+    def get_spot_value(self, dt, asset, fields):
+        return self._minutes(asset.sid, dt).loc[:, fields]
+
+    def get_stack_value(self, tbl_name, session):
+        raise NotImplementedError('minute reader cannot implement stack value')
+
+    def load_raw_arrays(self, sessions, assets, columns):
+        sdate, edate = sessions
+        dts = [s for s in self._market.sessions if sdate <= s <= edate]
+        frame_dict = dict()
+        for asset in assets:
+            frames = [self._minutes(asset.sid, dt) for dt in dts]
+            frame_dict[asset.sid] = pd.concat(frames).loc[:, columns] if frames else pd.DataFrame(columns=columns)
+        return frame_dict
+
+
+def install_minute_reader(portal, reader):
+    """
+        serve minute history , spot values and daily aggregation of portal by reader
+    """
+    from gateway.driver.history import HistoryMinuteLoader
+    from gateway.driver.aggregator import DailyHistoryAggregator
+    portal._history_loader['minute'] = HistoryMinuteLoader(reader, portal.adjustment_reader)
+    portal._daily_aggregator = DailyHistoryAggregator(reader)
+
+
+_market = None
+
+
+def prepare_market():
+    """
+        synthetic market of the benchmark environment --- sqlite written , benchmark closes
+        stored and minute reader installed once per process
+    """
+    global _market
+    if _market is None:
+        from gateway.database import engine
+        # tables are created on import of the schema , before the readers of portal reflect them
+        from gateway.database import db_schema  # noqa
+        from gateway.driver.data_portal import portal
+        from gateway.driver.benchmark_source import BenchmarkStore
+        market = SyntheticMarket()
+        market.write_sqlite(engine)
+        BenchmarkStore().save('000001', market.benchmark_closes())
+        install_minute_reader(portal, InMemoryMinuteReader(market))
+        _market = market
+    return _market
+
+
+__all__ = ['SyntheticMarket', 'InMemoryMinuteReader', 'install_minute_reader', 'prepare_market']
@@ -8,6 +8,18 @@ Created on Tue Mar 12 15:37:47 2019
 from abc import ABC, abstractmethod
 import numpy as np, pandas as pd
 
+# commission rate is cut down for trading sessions after FeeCutoff
+FeeCutoff = pd.Timestamp('2015-06-09')
+
+
+def _base_rates(dts):
+    """
+        commission base rate of dts (sessions or created_dt of orders) , compared by session so
+        orders on the cutoff session are charged the same whatever their minute
+    """
+    sessions = pd.DatetimeIndex(pd.to_datetime(list(dts))).normalize()
+    return np.where(sessions > FeeCutoff, 1e-4, 1e-3)
+
 
 class CommissionModel(ABC):
     """
@@ -17,12 +29,43 @@ class CommissionModel(ABC):
     def calculate(self, order):
         raise NotImplementedError
 
+    @property
+    def min_cost(self):
+        return 0.0
+
+    def calculate_rates(self, sids, sessions):
+        """
+            fee rates of trading sids on sessions , used by vectorized backtest
+        :param sids: list of sid
+        :param sessions: list of %Y-%m-%d
+        :return: (buy rates , sell rates) ndarray shape (len(sessions), len(sids))
+        """
+        raise NotImplementedError
+
+    def calculate_costs(self, sids, prices, amounts, dts):
+        """
+            cost of a batch of orders in one vectorized call , used by SimulationBlotter
+        :param sids: list of sid
+        :param prices: ndarray
+        :param amounts: ndarray , negative means sell
+        :param dts: created_dt of orders
+        :return: ndarray of cost
+        """
+        raise NotImplementedError
+
 
 class NoCommission(CommissionModel):
 
     def calculate(self, order):
         return 0.0
 
+    def calculate_costs(self, sids, prices, amounts, dts):
+        return np.zeros(len(sids))
+
+    def calculate_rates(self, sids, sessions):
+        zeros = np.zeros((len(sessions), len(sids)))
+        return zeros, zeros
+
 
 class Commission(CommissionModel):
     """
@@ -44,9 +87,7 @@ class Commission(CommissionModel):
         self.base_cost = val
 
     def _generate_fee_rate(self, order):
-        dt = order.created_dt
-        dt = dt if isinstance(dt, pd.Timestamp) else pd.Timestamp(dt)
-        base_rate = 1e-4 if dt > pd.Timestamp('2015-06-09') else 1e-3
+        base_rate = _base_rates([order.created_dt])[0]
         commission_rate = base_rate * self.multiplier
         return commission_rate
 
@@ -62,15 +103,37 @@ class Commission(CommissionModel):
         fee = stamp_cost + transfer_cost + commission_rate
         return fee
 
+    def calculate_rates(self, sids, sessions):
+        """
+            rate rules of calculate_rate_fee broadcast over sessions (commission) and sids (transfer)
+        """
+        transfer_cost = np.array([2 * 1e-5 if sid.startswith('6') else 0 for sid in sids])
+        base_rate = _base_rates(sessions)
+        buy_rates = (base_rate * self.multiplier)[:, None] + transfer_cost[None, :]
+        # 印花税 on sell
+        sell_rates = buy_rates + 1e-3
+        return buy_rates, sell_rates
+
+    def calculate_costs(self, sids, prices, amounts, dts):
+        """
+            rate rules of calculate_rate_fee over arrays , the FeeCutoff is compared once
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        base_rate = _base_rates(dts)
+        transfer_cost = np.array([2 * 1e-5 if sid.startswith('6') else 0 for sid in sids])
+        stamp_cost = np.where(amounts > 0, 0, 1e-3)
+        fee = stamp_cost + transfer_cost + base_rate * self.multiplier
+        cost = np.abs(amounts) * np.asarray(prices, dtype=float) * fee
+        return np.maximum(cost, self.min_cost)
+
     def calculate(self, order):
         """
         :param order: Order object
         :return: cost for order
         """
-        print('order', order)
-        capital = order.amount * order.price
+        # sell amount is negative
+        capital = abs(order.amount) * order.price
         cost = capital * self.calculate_rate_fee(order)
-        print('cost', cost)
         cost = cost if cost >= self.min_cost else self.min_cost
         return cost
 
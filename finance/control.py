@@ -116,7 +116,11 @@ class MaxOrderSize(TradingControl):
         Fail if the magnitude of the given order exceeds either self.max_shares
         or self.max_notional.
         """
-        sliding_window = portal.get_window([asset], algo_datetime, - abs(self.window), ['volume'], 'daily')
+        context = portal.get_session_context(algo_datetime)
+        if context is not None:
+            sliding_window = context.history([asset], self.window, ['volume'])
+        else:
+            sliding_window = portal.get_window([asset], algo_datetime, - abs(self.window), ['volume'], 'daily')
         threshold = sliding_window[asset.sid]['volume'].mean() * self.max_notional
         # print('threshold', threshold)
         if amount > threshold:
@@ -164,10 +168,14 @@ class MaxPositionSize(TradingControl):
         except KeyError:
             holding = 0
         max_capital = max_capital - holding
-        spot_value = portal.get_spot_value(algo_datetime, asset, 'daily', ['close'])
+        context = portal.get_session_context(algo_datetime)
+        if context is not None:
+            spot_value = context.get_spot_value(asset, ['close'])
+        else:
+            spot_value = portal.get_spot_value(algo_datetime, asset, 'daily', ['close'])
         capital = amount * spot_value.iloc[-1] + holding
-        # calculate amount
-        if max_capital < capital:
+        # calculate amount --- 卖出没有限制 , selling reduces the position
+        if amount > 0 and max_capital < capital:
             self.handle_violation(asset, amount, algo_datetime)
             amount = int(amount * max_capital / capital)
         return amount
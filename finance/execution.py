@@ -5,6 +5,7 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
+import numpy as np
 from abc import ABC, abstractmethod
 from functools import lru_cache
 from gateway.driver.data_portal import portal
@@ -22,10 +23,17 @@ class ExecutionStyle(ABC):
     """
     @staticmethod
     @lru_cache(maxsize=32)
-    def get_pre_close(asset, dt):
+    def _get_pre_close(asset, dt):
         open_pct, pre_close = portal.get_open_pct(asset, dt)
         return pre_close
 
+    @staticmethod
+    def get_pre_close(asset, dt):
+        context = portal.get_session_context(dt)
+        if context is not None:
+            return context.get_pre_close(asset)
+        return ExecutionStyle._get_pre_close(asset, dt)
+
     @abstractmethod
     def get_limit_ratio(self, asset, dts):
         """
@@ -42,6 +50,22 @@ class ExecutionStyle(ABC):
         """
         raise NotImplementedError
 
+    def trigger_mask(self, assets, prices, dts):
+        """
+            orders whose price lies between stop price and limit price , bounds are calculated
+            once per sid
+        :param assets: list of Asset (one per order)
+        :param prices: ndarray
+        :param dts: session
+        :return: bool ndarray
+        """
+        proxy = {asset.sid: asset for asset in assets}
+        bounds = {sid: (self.get_stop_ratio(asset, dts), self.get_limit_ratio(asset, dts))
+                  for sid, asset in proxy.items()}
+        bottom, upper = np.array([bounds[asset.sid] for asset in assets], dtype=float).reshape(-1, 2).T
+        prices = np.asarray(prices, dtype=float)
+        return (bottom < prices) & (prices < upper)
+
 
 class MarketOrder(ExecutionStyle):
     """
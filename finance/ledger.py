@@ -11,6 +11,7 @@ from finance.account import Account
 # from finance._protocol import MutableView
 from finance.position_tracker import PositionTracker
 from risk.alert import UnionRisk
+from util.profiling import logger, tracer
 
 
 class Ledger(object):
@@ -66,20 +67,20 @@ class Ledger(object):
     def start_of_session(self, session_ix):
         # handle splits and  update last_sync_date
         left_cash = self.position_tracker.handle_splits(session_ix)
-        print('start handle split cash', left_cash)
+        logger.debug('start handle split cash %s', left_cash)
         self._cash_flow(left_cash)
         self._previous_total_returns = self._portfolio.returns
         self._portfolio.positions = self.positions
         # update portfolio daily value
         self._portfolio.record_daily_value(session_ix)
         self._dirty_portfolio = False
-        print('start portfolio cash', self.portfolio.portfolio_cash)
+        logger.debug('start portfolio cash %s', self.portfolio.portfolio_cash)
         # self._dirty_positions = True
 
     def process_transaction(self, transactions):
-        print('ledger process_transaction')
+        tracer.count('ledger.transactions', len(transactions))
         txn_capital = self.position_tracker.handle_transactions(transactions)
-        print('txn_capital', txn_capital)
+        logger.debug('txn_capital %s', txn_capital)
         self._cash_flow(txn_capital)
         self._processed_transaction.extend(transactions)
 
@@ -138,12 +139,13 @@ class Ledger(object):
     def end_of_session(self):
         self._dirty_portfolio = True
         # synchronize() -- update position attr and calculate position returns
-        self.position_tracker.synchronize()
+        with tracer.span('ledger.synchronize'):
+            self.position_tracker.synchronize()
         # self._dirty_positions = False
         self._calculate_portfolio_stats()
         self._dirty_portfolio = False
         self.fuse_risk.trigger(self._portfolio)
-        print('end session ledger positions', self.positions)
+        logger.debug('end session ledger positions %s', self.positions)
         # print('end session portfolio daily value', self.portfolio.portfolio_daily_value)
 
     def get_transactions(self, dt):
@@ -8,6 +8,7 @@ Created on Tue Mar 12 15:37:47 2019
 import numpy as np, pandas as pd
 from finance._protocol import InnerPosition, Position as ProtocolPosition
 from _calendar.trading_calendar import calendar
+from util.profiling import logger
 
 
 class Position(object):
@@ -82,14 +83,14 @@ class Position(object):
         # print('transaction cost', txn_cost)
         # 根据交易对持仓进行更新
         total_amount = txn.amount + self.amount
-        print('total amount after updating transaction', total_amount)
+        logger.debug('total amount after updating transaction %s', total_amount)
         if total_amount < 0:
             raise Exception('put action is not allowed')
         elif total_amount != 0.0:
             total_cost = base_value + txn_value + txn_cost
-            print('update total cost', total_cost)
+            logger.debug('update total cost %s', total_cost)
             self.inner_position.cost_basis = total_cost / total_amount
-            print('new cost basis', self.inner_position.cost_basis)
+            logger.debug('new cost basis %s', self.inner_position.cost_basis)
             self.inner_position.amount = total_amount
         else:
             """ 仓位结清 , 当持仓为0 --- 计算成本用于判断持仓最终是否盈利, _closed为True"""
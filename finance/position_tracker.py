@@ -10,6 +10,7 @@ from collections import defaultdict, OrderedDict
 from functools import partial
 from finance.position import Position
 from gateway.driver.data_portal import portal
+from util.profiling import logger
 
 
 class PositionTracker(object):
@@ -68,7 +69,7 @@ class PositionTracker(object):
         if position.closed:
             dts = transaction.created_dt.strftime('%Y-%m-%d')
             self.record_closed_position[dts].append(position)
-            print('end session closed positions', self.record_closed_position)
+            logger.debug('end session closed positions %s', self.record_closed_position)
             del self.positions[asset]
         return cash_flow
 
@@ -93,14 +94,18 @@ class PositionTracker(object):
         if sync_date_set:
             assert len(sync_date_set) == 1, 'all positions must be sync on the same date'
             sync_date = sync_date_set[0]
-            get_price = partial(portal.get_spot_value,
-                                dts=sync_date,
-                                frequency='daily',
-                                field='close')
+            context = portal.get_session_context(sync_date)
+            if context is not None:
+                get_price = partial(context.get_spot_value, field='close')
+            else:
+                get_price = partial(portal.get_spot_value,
+                                    dts=sync_date,
+                                    frequency='daily',
+                                    field='close')
             closed_positions = self.record_closed_position[sync_date]
-            print('synchronize closed_position', closed_positions)
+            logger.debug('synchronize closed_position %s', closed_positions)
             update_positions = set(closed_positions) | set(self.positions.values())
-            print('synchronize update_positions', update_positions)
+            logger.debug('synchronize update_positions %s', update_positions)
             for p in update_positions:
                 p.inner_position.last_sync_price = get_price(asset=p.asset)
                 # update position_returns
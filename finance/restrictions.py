@@ -7,38 +7,118 @@ Created on Tue Mar 12 15:37:47 2019
 """
 from abc import ABC, abstractmethod
 from functools import reduce
-import pandas as pd, operator
+from collections import OrderedDict
+import numpy as np, operator
 from gateway.asset.assets import Asset
-from gateway.asset.finder import asset_finder
+from gateway.driver.data_portal import portal
 from _calendar.trading_calendar import calendar
 
 
+class RestrictionUniverse(object):
+    """
+        fixed index over a universe of assets , restrictions evaluate to bool masks aligned with
+        assets (True means tradeable) which combine with & / |
+
+        universes are memoized by the sids of assets so that masks of restrictions are shared
+        across sessions as long as the universe does not change ; assets of a memoized universe
+        may be other objects of the same sids , masks are mapped back onto the assets of the query
+    """
+    _cache = OrderedDict()
+    _cache_size = 8
+
+    def __init__(self, assets):
+        self.assets = np.array(sorted(assets, key=lambda x: x.sid), dtype=object)
+        self.key = tuple(asset.sid for asset in self.assets)
+        self.sids = np.array(self.key, dtype=str)
+        self.first_traded = np.array([self._to_str(asset.first_traded) for asset in self.assets], dtype=str)
+        self.last_traded = np.array([self._to_str(asset.last_traded) for asset in self.assets], dtype=str)
+
+    @staticmethod
+    def _to_str(dt):
+        # '' means unknown (first_traded) or alive (last_traded)
+        return dt if isinstance(dt, str) else ''
+
+    def __len__(self):
+        return len(self.assets)
+
+    @classmethod
+    def of(cls, assets):
+        key = tuple(sorted(asset.sid for asset in assets))
+        try:
+            universe = cls._cache[key]
+            cls._cache.move_to_end(key)
+        except KeyError:
+            universe = cls._cache[key] = cls(assets)
+            if len(cls._cache) > cls._cache_size:
+                cls._cache.popitem(last=False)
+        return universe
+
+    def select(self, mask, assets=None):
+        """
+        :param mask: bool ndarray aligned with self.assets
+        :param assets: assets of the query (same sids as universe) , self.assets if None
+        :return: set of assets whose mask is True
+        """
+        if assets is None:
+            return set(self.assets[mask])
+        assets = list(assets)
+        # sids of universe are sorted
+        loc = np.searchsorted(self.sids, [asset.sid for asset in assets])
+        return {asset for asset, flag in zip(assets, mask[loc]) if flag}
+
+
 class Restrictions(ABC):
     """
     Abstract restricted list interface, representing a set of asset that an
     algorithm is restricted from trading.
          --- used for pipe which filter asset list
+
+    restrictions compute bool masks over a RestrictionUniverse , masks are memoized per
+    (universe , session)
     """
+    _memo_size = 4
 
     @abstractmethod
-    def is_restricted(self, assets, dt):
+    def _compute_mask(self, universe, dt):
+        """
+        Parameters
+        ----------
+        universe : RestrictionUniverse
+        dt : str , session
+
+        Returns
+        -------
+        mask : bool ndarray aligned with universe.assets , True means tradeable
         """
-        Is the asset restricted (RestrictionStates.FROZEN) on the given dt?
+        raise NotImplementedError('_compute_mask')
+
+    def mask(self, universe, dt):
+        memo = self.__dict__.setdefault('_memo', OrderedDict())
+        key = (universe.key, dt)
+        try:
+            return memo[key]
+        except KeyError:
+            mask = memo[key] = self._compute_mask(universe, dt)
+            if len(memo) > self._memo_size:
+                memo.popitem(last=False)
+            return mask
 
+    def is_restricted(self, assets, dt):
+        """
         Parameters
         ----------
-        assets : Asset of iterable of Assets
+        assets : iterable of Assets
             The asset(s) for which we are querying a restriction
-        dt : pd.Timestamp
-            The timestamp of the restriction query
+        dt : str
+            The session of the restriction query
 
         Returns
         -------
-        is_restricted : bool or pd.Series[bool] indexed by asset
-            Is the asset or asset restricted on this dt?
-
+        assets which are not restricted on this dt
         """
-        raise NotImplementedError('is_restricted')
+        assets = list(assets)
+        universe = RestrictionUniverse.of(assets)
+        return universe.select(self.mask(universe, dt), assets)
 
     def __or__(self, other_restriction):
         """Base implementation for combining two restrictions.
@@ -56,8 +136,8 @@ class NoRestrictions(Restrictions):
     """
     A no-op restrictions that contains no restrictions.
     """
-    def is_restricted(self, assets, dt):
-        return set(assets)
+    def _compute_mask(self, universe, dt):
+        return np.ones(len(universe), dtype=bool)
 
 
 class StaticRestrictions(Restrictions):
@@ -73,13 +153,13 @@ class StaticRestrictions(Restrictions):
 
     def __init__(self, restricted_list):
         self._restricted_set = frozenset(restricted_list)
+        self._restricted_sids = np.array([asset.sid for asset in self._restricted_set], dtype=str)
 
-    def is_restricted(self, assets, dt):
+    def _compute_mask(self, universe, dt):
         """
         An asset is restricted for all dts if it is in the static list.
         """
-        selector = set(assets) - set(self._restricted_set)
-        return selector
+        return ~np.isin(universe.sids, self._restricted_sids)
 
 
 class DataBoundsRestrictions(Restrictions):
@@ -89,12 +169,13 @@ class DataBoundsRestrictions(Restrictions):
     def __init__(self, length=30):
         self.window = length
 
-    def is_restricted(self, assets, dt):
+    def _compute_mask(self, universe, dt):
         s_date = calendar.dt_window_size(dt, self.window)
-        # a --- asset ipo date and dt excess 30 days
-        alive_assets = asset_finder.lifetimes([s_date, dt])
-        final_assets = set(assets) & set(alive_assets)
-        return final_assets
+        # a --- asset ipo date and dt excess 30 days (asset_finder.lifetimes)
+        first, last = universe.first_traded, universe.last_traded
+        mask = (first == '') | (first <= s_date)
+        mask &= (last == '') | (last >= dt)
+        return mask
 
 
 class StatusRestrictions(Restrictions):
@@ -105,20 +186,28 @@ class StatusRestrictions(Restrictions):
     def __init__(self, length=0):
         self.length = length
 
-    def is_restricted(self, assets, dt):
-        # a category
-        trade_assets = asset_finder.can_be_traded(dt)
-        # b category
-        del_assets = asset_finder.delist_assets(dt, self.length)
-        final_assets = (set(assets) - set(del_assets)) & set(trade_assets)
-        return final_assets
+    def _compute_mask(self, universe, dt):
+        first, last = universe.first_traded, universe.last_traded
+        # a category --- alive and has kline on dt (asset_finder.can_be_traded)
+        alive = (first <= dt) & ((last == '') | (dt <= last))
+        bars = portal.get_session_bars(list(universe.assets[alive]), dt, ['close'])
+        traded = [sid for sid, frame in bars.items() if not frame.empty]
+        mask = alive & np.isin(universe.sids, np.array(traded, dtype=str))
+        # b category --- delist (asset_finder.delist_assets)
+        if self.length == 0:
+            delist = last == dt
+        else:
+            sessions = calendar.all_sessions
+            left = np.searchsorted(sessions, np.where(last == '', dt, last)) - np.searchsorted(sessions, dt)
+            delist = (last > dt) & (left >= self.length)
+        return mask & ~delist
 
 
 class SwatRestrictions(Restrictions):
     """
         black swat : asset suffers negative affairs
     """
-    def is_restricted(self, assets, dt):
+    def _compute_mask(self, universe, dt):
         raise NotImplementedError()
 
 
@@ -166,17 +255,20 @@ class UnionRestrictions(Restrictions):
             new_sub_restrictions = self.sub_restrictions + [other_restriction]
         return UnionRestrictions(new_sub_restrictions)
 
-    def is_restricted(self, assets, dt):
-        if isinstance(assets, Asset):
-            return assets if len(set(r.is_restricted(assets, dt)
-                                     for r in self.sub_restrictions)) == 1 else None
+    def _compute_mask(self, universe, dt):
         return reduce(
             operator.and_,
-            (r.is_restricted(assets, dt) for r in self.sub_restrictions)
+            (r.mask(universe, dt) for r in self.sub_restrictions)
         )
 
+    def is_restricted(self, assets, dt):
+        if isinstance(assets, Asset):
+            return assets if self.is_restricted([assets], dt) else None
+        return super(UnionRestrictions, self).is_restricted(assets, dt)
+
 
 __all__ = [
+    'RestrictionUniverse',
     'UnionRestrictions',
     'NoRestrictions',
     'StaticRestrictions',
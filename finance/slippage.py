@@ -5,8 +5,10 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
+import numpy as np
 from abc import ABC, abstractmethod
 from gateway.driver.data_portal import portal
+from _calendar.trading_calendar import calendar
 
 
 class SlippageModel(ABC):
@@ -15,6 +17,17 @@ class SlippageModel(ABC):
     def calculate_slippage_factor(self, asset, dts):
         raise NotImplementedError
 
+    def calculate_slippage_factors(self, assets, dts):
+        """
+            slippage factors of a batch of orders , calculated once per sid
+        :param assets: list of Asset (one per order)
+        :param dts: session
+        :return: ndarray
+        """
+        proxy = {asset.sid: asset for asset in assets}
+        factors = {sid: self.calculate_slippage_factor(asset, dts) for sid, asset in proxy.items()}
+        return np.array([factors[asset.sid] for asset in assets], dtype=float)
+
 
 class NoSlippage(SlippageModel):
     """
@@ -23,6 +36,9 @@ class NoSlippage(SlippageModel):
     def calculate_slippage_factor(self, asset, dts):
         return 0.0
 
+    def calculate_slippage_factors(self, assets, dts):
+        return np.zeros(len(assets))
+
 
 class FixedBasisPointSlippage(SlippageModel):
     """
@@ -35,6 +51,9 @@ class FixedBasisPointSlippage(SlippageModel):
     def calculate_slippage_factor(self, asset, dts):
         return self.basis_points
 
+    def calculate_slippage_factors(self, assets, dts):
+        return np.full(len(assets), self.basis_points, dtype=float)
+
 
 class MarketImpact(SlippageModel):
 
@@ -53,14 +72,39 @@ class MarketImpact(SlippageModel):
         asset :param Asset
         :return:
         """
-        alpha = portal.get_window([asset], dts, self.length, ['amount', 'volume'])
+        context = portal.get_session_context(dts)
+        if context is not None:
+            alpha = context.history([asset], self.length, ['amount', 'volume'])
+        else:
+            alpha = portal.get_window([asset], dts, - abs(self.length), ['amount', 'volume'], 'daily')
         slippage = self.func(alpha)
         return slippage
 
 
+class VWAPSlippage(SlippageModel):
+    """
+        mean deviation of close from vwap over the sessions before dts , i.e. the cost of
+        executing at an intraday price instead of the close
+    """
+    def __init__(self, window=5):
+        self.window = window
+
+    def calculate_slippage_factors(self, assets, dts):
+        end = calendar.dt_window_size(dts, -2)
+        stats = portal.get_intraday_stats(list({asset.sid: asset for asset in assets}.values()),
+                                          end, self.window)
+        factors = {sid: np.nanmean(np.abs(frame['vwap'] / frame['close'] - 1))
+                   for sid, frame in stats.items()}
+        return np.array([factors.get(asset.sid, 0.0) for asset in assets], dtype=float)
+
+    def calculate_slippage_factor(self, asset, dts):
+        return self.calculate_slippage_factors([asset], dts)[0]
+
+
 __all__ = [
     'NoSlippage',
     'FixedBasisPointSlippage',
-    'MarketImpact'
+    'MarketImpact',
+    'VWAPSlippage'
 ]
 
@@ -0,0 +1,38 @@
+"""
+Restrictions answer with the asset objects of the query , universes are memoized by sids.
+"""
+import pytest
+
+try:
+    from finance.restrictions import (
+        NoRestrictions,
+        RestrictionUniverse,
+        StaticRestrictions,
+        UnionRestrictions
+    )
+except ImportError as e:
+    pytest.skip('restrictions are not importable : %s' % e, allow_module_level=True)
+
+
+class Asset(object):
+    """
+        compared by identity as gateway.asset.assets.Asset , tag is the pipeline name
+    """
+    def __init__(self, sid, tag=None):
+        self.sid = sid
+        self.tag = tag
+        self.first_traded = '2010-01-04'
+        self.last_traded = None
+
+
+def test_masks_are_mapped_onto_the_assets_of_the_query():
+    restrictions = UnionRestrictions([NoRestrictions(), StaticRestrictions([Asset('000002')])])
+    first = [Asset('600000', 'a'), Asset('000002', 'a'), Asset('000001', 'a')]
+    assert restrictions.is_restricted(first, '2020-01-02') == {first[0], first[2]}
+    # same sids , other objects (e.g. assets tagged by another pipeline) hit the memoized universe
+    second = [Asset('000001', 'b'), Asset('600000', 'b'), Asset('000002', 'b')]
+    assert RestrictionUniverse.of(second) is RestrictionUniverse.of(first)
+    allowed = restrictions.is_restricted(iter(second), '2020-01-02')
+    assert allowed == {second[0], second[1]}
+    assert all(any(asset is other for other in second) for asset in allowed)
+    assert restrictions.is_restricted([], '2020-01-02') == set()
@@ -6,6 +6,7 @@ Created on Tue Mar 12 15:37:47 2019
 @author: python
 """
 from finance.order import Order
+from util.profiling import logger
 
 
 class Transaction(object):
@@ -49,6 +50,21 @@ class Transaction(object):
         return p_dict
 
 
+def create_transactions(orders, costs):
+    """
+    :param orders: Order list with price and created_dt
+    :param costs: costs of orders calculated by CommissionModel.calculate_costs
+    :return: transactions
+    """
+    transactions = [Transaction(asset=order.asset,
+                                amount=order.amount,
+                                price=order.price,
+                                dts=order.created_dt,
+                                cost=cost)
+                    for order, cost in zip(orders, costs)]
+    return transactions
+
+
 def create_transaction(order, commission):
     """
     :param order: Ticker order or Price order
@@ -58,7 +74,7 @@ def create_transaction(order, commission):
     if isinstance(order, Order):
         # calculate cost
         cost = commission.calculate(order)
-        print('transaction cost', cost)
+        logger.debug('transaction cost %s', cost)
         transaction = Transaction(
             asset=order.asset,
             amount=order.amount,
@@ -10,7 +10,8 @@ from gateway.spider.asset_router import AssetRouterWriter
 from gateway.spider.bundle import BundlesWriter
 from gateway.spider.divdend_rights import AdjustmentsWriter
 from gateway.spider.ownership import OwnershipWriter
-from gateway.spider.events import EventWriter
+from gateway.spider.events import EventWriter, EVENTS
+from pipe.loader import EVENT
 
 
 # 初始化各个spider module
@@ -37,6 +38,10 @@ async def event_spider(flag):
     date = '2000-01-01' if flag else None
     await asyncio.sleep(10)
     event_writer.writer(date)
+    # stores loaded in this process merge the rows just written
+    for name in EVENTS:
+        if EVENT[name].loaded:
+            EVENT[name].refresh()
 
 
 async def main(initialization=True):
@@ -5,7 +5,7 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-import sqlalchemy as sa
+import sqlalchemy as sa, os
 
 # Define a version number for the database generated by these writers
 # Increment this version number any time a change is made to the schema of the
@@ -54,6 +54,10 @@ engine_path = 'mysql+pymysql://{user}:{password}@{host}:{port}/{database}'.forma
 # sa.CheckConstraint('id <= 1')
 # ins = ins.order_by(table.c.trade_dt)
 
-engine = sa.create_engine(engine_path, pool_size=PoolSize, max_overflow=OVerFlow)
+# e.g. ARKQUANT_ENGINE=sqlite:////tmp/ark.db --- offline runs and benchmarks on synthetic data
+engine_path = os.environ.get('ARKQUANT_ENGINE', engine_path)
+
+engine = sa.create_engine(engine_path) if engine_path.startswith('sqlite') else \
+    sa.create_engine(engine_path, pool_size=PoolSize, max_overflow=OVerFlow)
 
 metadata = sa.MetaData(bind=engine)
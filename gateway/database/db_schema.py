@@ -653,6 +653,13 @@ asset_db_table_names = frozenset([
     'convertible_basics'
 ])
 
+if engine.dialect.name == 'sqlite':
+    # sqlite (ARKQUANT_ENGINE) has no autoincrement of composite primary keys , id keeps its default
+    for table in metadata.tables.values():
+        if len(table.primary_key.columns) > 1:
+            for column in table.primary_key.columns:
+                column.autoincrement = False
+
 metadata.create_all(bind=engine)
 
 __all__ = [
@@ -5,12 +5,17 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
+import os
 # bcolz parallel num
 Num = 2
 
-BcolzDir = r'/Users/python/Downloads/bcolz'
+BcolzDir = os.environ.get('ARKQUANT_BCOLZ', r'/Users/python/Downloads/bcolz')
 # BcolzDir = r'E:\bcolz'
 
+# benchmark closes stored locally
+BenchmarkDir = os.environ.get('ARKQUANT_BENCHMARK',
+                              os.path.join(os.path.expanduser('~'), '.arkquant', 'benchmark'))
+
 # bcolz sacle factor
 OHLC_RATIO = 100
 
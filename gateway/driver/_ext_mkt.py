@@ -7,7 +7,7 @@ Created on Sun Feb 17 16:39:46 2019
 import pandas as pd, numpy as np, sqlalchemy as sa, datetime
 from gateway.database import engine, metadata
 from gateway.database.db_writer import init_writer
-from gateway.driver.tools import unpack_df_to_component_dict
+from util.profiling import logger
 
 
 OWNERSHIP_TYPE = {'general': np.double,
@@ -38,59 +38,69 @@ class MarketValue:
         return df
 
     def _retrieve_ownership(self):
+        """由于存在一个变动时点出现多条记录，保留最大total_assets的记录,先按照最大股本降序，保留第一个记录"""
         tbl = metadata.tables['ownership']
         sql = sa.select([tbl.c.sid, tbl.c.ex_date, tbl.c.general, tbl.c.float])
-        # sql = sa.select([tbl.c.sid, tbl.c.ex_date, tbl.c.general, tbl.c.float]).where(tbl.c.sid == '000002')
         rp = engine.execute(sql)
         frame = pd.DataFrame([[r.sid, r.ex_date, r.general, r.float] for r in rp.fetchall()],
                              columns=['sid', 'date', 'general', 'float'])
-        frame.set_index('sid', inplace=True)
         frame.replace('--', 0.0, inplace=True)
         frame = self._adjust_frame_type(frame)
-        unpack_frame = unpack_df_to_component_dict(frame)
-        return unpack_frame
+        frame['date'] = frame['date'].astype(str)
+        frame.sort_values(['sid', 'date', 'general'], ascending=[True, True, False], inplace=True)
+        frame.drop_duplicates(subset=['sid', 'date'], keep='first', inplace=True)
+        return frame
 
-    def _retrieve_array(self, sid):
+    def _retrieve_close(self):
+        """
+            close panel of all equities in one query , long format (date , sid , close)
+        """
         edate = datetime.datetime.now().strftime('%Y-%m-%d')
         sdate = '1990-01-01' if self._init else edate
         tbl = metadata.tables['equity_price']
-        sql = sa.select([tbl.c.trade_dt, tbl.c.close]).\
-            where(sa.and_(tbl.c.trade_dt.between(sdate, edate), tbl.c.sid == sid))
+        sql = sa.select([tbl.c.trade_dt, tbl.c.sid, tbl.c.close]).\
+            where(tbl.c.trade_dt.between(sdate, edate))
         rp = engine.execute(sql)
-        frame = pd.DataFrame([[r.trade_dt, r.close] for r in rp.fetchall()],
-                             columns=['date', 'close'])
+        frame = pd.DataFrame([[r.trade_dt, r.sid, r.close] for r in rp.fetchall()],
+                             columns=['date', 'sid', 'close'])
         frame = self._adjust_frame_type(frame)
-        frame.set_index('date', inplace=True)
-        return frame.iloc[:, 0]
+        frame['date'] = frame['date'].astype(str)
+        frame.drop_duplicates(subset=['sid', 'date'], inplace=True)
+        return frame
+
+    @staticmethod
+    def _as_of_join(close, ownership):
+        """
+            share counts as of each session (the latest ex_date on or before) joined onto the
+            close panel for all sids at once ; sessions before the first ex_date of a sid take
+            the first record
+        """
+        close = close.assign(ts=pd.to_datetime(close['date'])).sort_values('ts', kind='mergesort')
+        ownership = ownership.assign(ts=pd.to_datetime(ownership['date'])).sort_values('ts', kind='mergesort')
+        joined = pd.merge_asof(close, ownership.drop(columns='date'), on='ts', by='sid', direction='backward')
+        first = ownership.groupby('sid')[['general', 'float']].first()
+        head = joined['general'].isna()
+        joined.loc[head, ['general', 'float']] = first.reindex(joined.loc[head, 'sid']).values
+        return joined.dropna(subset=['general', 'float'])
 
     def calculate_mcap(self):
-        """由于存在一个变动时点出现多条记录，保留最大total_assets的记录,先按照最大股本降序，保留第一个记录"""
+        """
+            mkv --- general * close , mkv_cap --- float * close , mkv_strict --- mkv - mkv_cap ;
+            the panel is written to m_cap in one batch
+        """
         ownership = self._retrieve_ownership()
-        for sid in set(ownership):
-            print('sid', sid)
-            owner = ownership[sid]
-            owner.sort_values(by='general', ascending=False, inplace=True)
-            owner.drop_duplicates(subset='date', keep='first', inplace=True)
-            owner.set_index('date', inplace=True)
-            close = self._retrieve_array(sid)
-            print('close', close)
-            if close.empty:
-                print('%s close is empty' % sid)
-            else:
-                re_owner = owner.reindex(index=close.index)
-                re_owner.sort_index(inplace=True)
-                re_owner.fillna(method='bfill', inplace=True)
-                re_owner.fillna(method='ffill', inplace=True)
-                # 当每日更新的时候re_owner(reindex 为None) --- 需要通过最近的日期来填充
-                re_owner = re_owner.fillna({'float': owner['float'][0], 'general': owner['general'][0]})
-                print('adjust owner', re_owner)
-                mcap = re_owner.apply(lambda x: x * close)
-                mcap.loc[:, 'trade_dt'] = mcap.index
-                mcap.loc[:, 'sid'] = sid
-                mcap.loc[:, 'strict'] = mcap['general'] - mcap['float']
-                mcap.rename(columns=RENAME_COLUMNS, inplace=True)
-                print('mcap', mcap)
-                db.writer('m_cap', mcap)
+        close = self._retrieve_close()
+        if close.empty or ownership.empty:
+            logger.warning('close or ownership is empty')
+            return
+        joined = self._as_of_join(close, ownership)
+        mcap = pd.DataFrame({'trade_dt': joined['date'].values,
+                             'sid': joined['sid'].values,
+                             'general': (joined['general'] * joined['close']).values,
+                             'float': (joined['float'] * joined['close']).values})
+        mcap['strict'] = mcap['general'] - mcap['float']
+        mcap.rename(columns=RENAME_COLUMNS, inplace=True)
+        db.writer('m_cap', mcap)
 
 
 __all__ = ['MarketValue']
@@ -4,39 +4,128 @@
 Created on Sun Feb 17 16:39:46 2019
 @author: python
 """
-import datetime, pandas as pd
-from toolz import valmap
+import numpy as np, pandas as pd
 from gateway.driver.bcolz_reader import BcolzMinuteReader
 from _calendar.trading_calendar import calendar
 
+IntradayFields = ['open', 'high', 'low', 'close', 'volume']
 
-class VWAP(object):
+IntradayStats = ['open', 'high', 'low', 'close', 'vwap', 'twap', 'range', 'volume', 'minutes']
 
-    def __init__(self):
-        self._reader = BcolzMinuteReader()
 
-    @staticmethod
-    def _calculate_vwap(frame):
-        frame.loc[:, 'trade_dt'] = pd.DatetimeIndex([datetime.datetime.utcfromtimestamp(i).strftime('%Y-%m-%d')
-                                        for i in frame.index])
-        # vwap = frame.resample('D').apply(lambda x: x['close'] * x['volume'] / x['volume'].sum())
-        vwap = frame.groupby(by='trade_dt').apply(lambda x: (x['close'] * x['volume'] / x['volume'].sum()).sum())
-        return vwap
+def _to_epochs(index):
+    """
+        integer epochs (seconds) of minute index , ticker (int) or naive Timestamp
+    """
+    if np.issubdtype(index.dtype, np.integer):
+        return np.asarray(index, dtype='int64')
+    return pd.DatetimeIndex(index).values.astype('datetime64[s]').view('int64')
+
+
+def calculate_intraday_stats(sids, epochs, arrays):
+    """
+        intraday statistics of minute bars of all sids in one pass
+
+        day buckets are epochs // 86400 (tickers are local time) , bars of a sid are contiguous
+        and sorted by epoch , so (sid , day) groups are contiguous and reduced by
+        np.*.reduceat on group starts
+
+    :param sids: ndarray of sid per bar
+    :param epochs: int64 ndarray of epoch per bar
+    :param arrays: dict field -> float ndarray per bar (IntradayFields)
+    :return: DataFrame columns --- sid , trade_dt and IntradayStats
+        vwap --- sum(close * volume) / sum(volume) ; twap --- mean close ;
+        range --- high / low - 1 ; minutes --- number of bars with close
+    """
+    if not len(epochs):
+        return pd.DataFrame(columns=['sid', 'trade_dt'] + IntradayStats)
+    days = epochs // 86400
+    codes = np.unique(sids, return_inverse=True)[1]
+    boundary = np.empty(len(days), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (days[1:] != days[:-1]) | (codes[1:] != codes[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(days)) - 1
+
+    close = arrays['close'].astype(float)
+    volume = np.nan_to_num(arrays['volume'].astype(float))
+    valid = ~np.isnan(close)
+    filled = np.where(valid, close, 0.0)
+    counts = np.add.reduceat(valid.astype(float), starts)
+    volumes = np.add.reduceat(volume * valid, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vwap = np.add.reduceat(filled * volume, starts) / volumes
+        twap = np.add.reduceat(filled, starts) / counts
+        high = np.fmax.reduceat(arrays['high'].astype(float), starts)
+        low = np.fmin.reduceat(arrays['low'].astype(float), starts)
+        spread = high / low - 1
+    # days without volume fall back to twap
+    vwap = np.where(volumes > 0, vwap, twap)
+    stats = pd.DataFrame({
+        'sid': sids[starts],
+        'trade_dt': np.datetime_as_string(days[starts].astype('datetime64[D]')),
+        'open': arrays['open'].astype(float)[starts],
+        'high': high,
+        'low': low,
+        'close': close[ends],
+        'vwap': vwap,
+        'twap': twap,
+        'range': spread,
+        'volume': volumes,
+        'minutes': counts
+    })
+    return stats
 
-    def _retrieve_minutes(self, session, asset):
-        dct = self._reader.load_raw_arrays([min(session), max(session)], asset,
-                                           ['open', 'high', 'low', 'close', 'volume'])
-        vwap = valmap(self._calculate_vwap, dct)
-        return vwap
+
+def stack_minutes(frames):
+    """
+    :param frames: dict sid -> minute frame (BcolzMinuteReader.load_raw_arrays)
+    :return: sids , epochs , arrays concatenated in sid order (each sid sorted by epoch)
+    """
+    sids, epochs, arrays = [], [], {field: [] for field in IntradayFields}
+    for sid, frame in frames.items():
+        if frame.empty:
+            continue
+        frame_epochs = _to_epochs(frame.index)
+        order = np.argsort(frame_epochs, kind='mergesort')
+        sids.append(np.full(len(frame), sid, dtype=object))
+        epochs.append(frame_epochs[order])
+        for field in IntradayFields:
+            arrays[field].append(frame[field].values[order])
+    if not epochs:
+        return np.array([], dtype=object), np.array([], dtype='int64'), \
+            {field: np.array([]) for field in IntradayFields}
+    return np.concatenate(sids), np.concatenate(epochs), \
+        {field: np.concatenate(values) for field, values in arrays.items()}
+
+
+class VWAP(object):
+
+    def __init__(self, reader=None):
+        self._reader = reader if reader else BcolzMinuteReader()
+
+    def intraday_stats(self, sessions, assets):
+        """
+        :param sessions: [sdate , edate]
+        :param assets: list of Asset
+        :return: dict sid -> frame of IntradayStats indexed by trade_dt
+        """
+        frames = self._reader.load_raw_arrays([min(sessions), max(sessions)], list(assets), IntradayFields)
+        stats = calculate_intraday_stats(*stack_minutes(frames))
+        return {sid: frame.drop(columns='sid').set_index('trade_dt')
+                for sid, frame in stats.groupby('sid', sort=False)}
 
     def calculate(self, date, window, assets):
-        assets = tuple(assets)
         session = calendar.session_in_window(date, window)
         # print('session', session)
-        vwap = self._retrieve_minutes(session, assets)
+        stats = self.intraday_stats(session, assets)
+        vwap = {sid: frame['vwap'] for sid, frame in stats.items()}
         return vwap
 
 
+__all__ = ['VWAP', 'calculate_intraday_stats']
+
+
 # if __name__ == '__main__':
 #
 #     equity = Equity('600000')
@@ -8,6 +8,7 @@ Created on Tue Mar 12 15:37:47 2019
 import pandas as pd
 from toolz import valmap
 from functools import partial
+from util.profiling import logger
 
 AdjustFields = frozenset(['open', 'high', 'low', 'close', 'volume'])
 
@@ -123,7 +124,7 @@ class HistoryCompatibleAdjustments(object):
             try:
                 adjs[sid] = _calculate(sid=sid)
             except KeyError:
-                print('code: %s has not kline between session' % sid)
+                logger.debug('code: %s has not kline between session', sid)
         return adjs, data
 
 
@@ -159,15 +160,13 @@ class SlidingWindow(object):
         )
         return _array
 
-    def window_arrays(self, sessions, assets, field):
+    def _adjusted_arrays(self, sessions, assets, field):
         """
-        :param sessions: [a,b]
-        :param assets: Assets list
-        :param field: str or list
-        :return: arrays which is adjusted by divdends and rights
+        :return: adjusted arrays and qfq coef of each sid aligned with the index of its frame
         """
         adjustments, frame_mappings = self._compatible_adjustment.calculate_adjustments_in_sessions(sessions, assets)
         adjusted_fields = list(set(field) & AdjustFields)
+        coefs = {}
         if adjusted_fields:
             # 计算调整数据
             adjust_arrays = {}
@@ -184,13 +183,34 @@ class SlidingWindow(object):
                     frame[adjusted_fields] = frame.loc[:, adjusted_fields].multiply(qfq, axis=0)
                     # adjust_arrays[sid] = frame[adjusted_fields]
                     adjust_arrays[sid] = frame
+                    coefs[sid] = qfq
                 except KeyError:
                     adjust_arrays[sid] = pd.DataFrame()
         else:
             adjust_arrays = frame_mappings
 
+        return adjust_arrays, coefs
+
+    def window_arrays(self, sessions, assets, field):
+        """
+        :param sessions: [a,b]
+        :param assets: Assets list
+        :param field: str or list
+        :return: arrays which is adjusted by divdends and rights
+        """
+        adjust_arrays, _ = self._adjusted_arrays(sessions, assets, field)
         return adjust_arrays
 
+    def window_panel(self, sessions, assets, field):
+        """
+        :param sessions: [a,b] , a whole chunk of sessions plus lookback
+        :param assets: Assets list
+        :param field: str or list
+        :return: arrays adjusted to the end of sessions and their qfq coef ; a sub window ending
+                 on dt is re-based by dividing with the coef of the session after dt
+        """
+        return self._adjusted_arrays(sessions, assets, field)
+
 
 class AdjustedDailyWindow(SlidingWindow):
     """
@@ -213,6 +233,10 @@ class AdjustedDailyWindow(SlidingWindow):
         mkv = self.reader.get_mkv_value(session, assets, fields)
         return mkv
 
+    def get_mkv_panel(self, session, assets, field):
+        panel = self.reader.load_mkv_panel(session, assets, field)
+        return panel
+
 
 class AdjustedMinuteWindow(SlidingWindow):
     """
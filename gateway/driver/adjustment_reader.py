@@ -18,7 +18,10 @@ ADJUSTMENT_COLUMNS_TYPE = {
                 'sid_transfer': int,
                 'bonus': np.float64,
                 'right_bonus': int,
-                'right_price': np.float64
+                'right_price': np.float64,
+                # columns of rights keyed by ex_date
+                'rights_bonus': int,
+                'rights_price': np.float64
                         }
 
 
@@ -0,0 +1,124 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import numpy as np, pandas as pd
+
+AggregateFields = frozenset(['open', 'high', 'low', 'close', 'volume', 'amount'])
+
+
+class DailyHistoryAggregator(object):
+    """
+    Converts minute pricing data into a daily summary truncated to the `dt`
+    requested , i.e. the aggregation slides forward during the course of a day.
+    (incremental version of supplement.DailyHistoryAggregator)
+
+    minute bars of an asset are read once per session and rolled into running
+    arrays (first open , cummax high , cummin low , last close , cumsum volume
+    and amount) , so each call during the session is a searchsorted lookup.
+    raw bars are kept alongside to match orders minute by minute (minute_bars).
+    caches are flushed when the session changes.
+    """
+    def __init__(self, minute_reader):
+        self._minute_reader = minute_reader
+        self._session = None
+        # sid -> (minutes int64 , dict field -> running array , dict field -> raw array)
+        self._caches = dict()
+
+    def _prelude(self, dt):
+        session = pd.Timestamp(dt).strftime('%Y-%m-%d')
+        if session != self._session:
+            self._session = session
+            self._caches = dict()
+        return session
+
+    @staticmethod
+    def _rolling(frame):
+        minutes = pd.DatetimeIndex(frame.index).values.astype('datetime64[ns]').view('int64')
+        order = np.argsort(minutes, kind='stable')
+        minutes = minutes[order]
+        running, raw = dict(), dict()
+        for field in AggregateFields & set(frame.columns):
+            values = raw[field] = frame[field].values.astype(float)[order]
+            valid = ~np.isnan(values)
+            if field == 'open':
+                # first non-nan open of session
+                first = np.flatnonzero(valid)
+                running[field] = np.where(np.arange(len(values)) >= first[0], values[first[0]], np.nan) \
+                    if len(first) else values
+            elif field == 'high':
+                running[field] = np.fmax.accumulate(values)
+            elif field == 'low':
+                running[field] = np.fmin.accumulate(values)
+            elif field == 'close':
+                # most recent non-nan close
+                pos = np.maximum.accumulate(np.where(valid, np.arange(len(values)), -1))
+                running[field] = np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan)
+            else:
+                running[field] = np.cumsum(np.where(valid, values, 0))
+        return minutes, running, raw
+
+    def _entry(self, asset, session):
+        try:
+            return self._caches[asset.sid]
+        except KeyError:
+            frame = self._minute_reader.get_spot_value(session, asset, list(AggregateFields))
+            entry = self._caches[asset.sid] = self._rolling(frame) if len(frame) \
+                else (np.array([], dtype='int64'), dict(), dict())
+            return entry
+
+    def aggregate(self, assets, dt, fields):
+        """
+        :param assets: Asset list
+        :param dt: minute , pd.Timestamp
+        :param fields: list of OHLCV fields
+        :return: DataFrame index --- sid , columns --- fields ; nan (0 for volume , amount) if no data
+        """
+        session = self._prelude(dt)
+        dt_value = pd.Timestamp(dt).value
+        data = []
+        for asset in assets:
+            minutes, running, _ = self._entry(asset, session)
+            loc = np.searchsorted(minutes, dt_value, side='right') - 1
+            data.append([running[field][loc] if loc >= 0 and field in running else
+                         (0 if field in ('volume', 'amount') else np.nan) for field in fields])
+        return pd.DataFrame(data, index=[asset.sid for asset in assets], columns=fields)
+
+    def minute_bars(self, assets, dt, fields):
+        """
+        :param assets: Asset list
+        :param dt: minute , pd.Timestamp
+        :param fields: list of OHLCV fields
+        :return: DataFrame index --- sid , columns --- fields ; raw bar of the minute dt ,
+                 nan if the asset has no bar on dt
+        """
+        session = self._prelude(dt)
+        dt_value = pd.Timestamp(dt).value
+        data = []
+        for asset in assets:
+            minutes, _, raw = self._entry(asset, session)
+            loc = np.searchsorted(minutes, dt_value)
+            matched = loc < len(minutes) and minutes[loc] == dt_value
+            data.append([raw[field][loc] if matched and field in raw else np.nan for field in fields])
+        return pd.DataFrame(data, index=[asset.sid for asset in assets], columns=fields)
+
+    def opens(self, assets, dt):
+        return self.aggregate(assets, dt, ['open'])['open'].values
+
+    def highs(self, assets, dt):
+        return self.aggregate(assets, dt, ['high'])['high'].values
+
+    def lows(self, assets, dt):
+        return self.aggregate(assets, dt, ['low'])['low'].values
+
+    def closes(self, assets, dt):
+        return self.aggregate(assets, dt, ['close'])['close'].values
+
+    def volumes(self, assets, dt):
+        return self.aggregate(assets, dt, ['volume'])['volume'].values
+
+
+__all__ = ['DailyHistoryAggregator']
@@ -102,21 +102,42 @@ class AssetSessionReader(BarReader):
     def data_frequency(self):
         return 'daily'
 
-    def get_mkv_value(self, sessions, assets, fields):
+    def _retrieve_mkv(self, sessions, sids):
+        """
+            rows of m_cap for sids between sessions in one query
+        """
         tbl = self.metadata.tables['m_cap']
         sdate, edate = sessions
+        orm = sa.select([tbl.c.trade_dt, tbl.c.sid, tbl.c.mkv, tbl.c.mkv_cap, tbl.c.mkv_strict]).\
+            where(sa.and_(tbl.c.trade_dt.between(sdate, edate), tbl.c.sid.in_(sids)))
+        rp = self.engine.execute(orm)
+        frame = pd.DataFrame([[r.trade_dt, r.sid, r.mkv, r.mkv_cap, r.mkv_strict] for r in rp.fetchall()],
+                             columns=['trade_dt', 'sid', 'mkv', 'mkv_cap', 'mkv_strict'])
+        frame[['mkv', 'mkv_cap', 'mkv_strict']] = frame[['mkv', 'mkv_cap', 'mkv_strict']].astype(np.double)
+        return frame
+
+    def get_mkv_value(self, sessions, assets, fields):
+        frame = self._retrieve_mkv(sessions, [asset.sid for asset in assets])
+        groups = dict(list(frame.groupby('sid')))
         mkv_dct = {}
         for asset in assets:
-            orm = sa.select([tbl.c.trade_dt, tbl.c.sid, tbl.c.mkv, tbl.c.mkv_cap, tbl.c.mkv_strict]).\
-                where(sa.and_(tbl.c.trade_dt.between(sdate, edate), tbl.c.sid == asset.sid))
-            rp = self.engine.execute(orm)
-            frame = pd.DataFrame([[r.trade_dt, r.mkv, r.mkv_cap, r.mkv_strict] for r in rp.fetchall()],
-                                 columns=['trade_dt', 'mkv', 'mkv_cap', 'mkv_strict'])
-            frame.set_index('trade_dt', inplace=True)
-            frame = frame.loc[:, fields] if fields else frame
-            mkv_dct[asset.sid] = frame
+            sid_frame = groups.get(asset.sid, frame.iloc[:0])
+            sid_frame = sid_frame.drop(columns='sid').set_index('trade_dt')
+            mkv_dct[asset.sid] = sid_frame.loc[:, fields] if fields else sid_frame
         return mkv_dct
 
+    def load_mkv_panel(self, sessions, assets, field):
+        """
+            panel of market value for cap weighted universes and size factors
+        :param sessions: [sdate , edate]
+        :param assets: list of Asset
+        :param field: mkv , mkv_cap or mkv_strict
+        :return: DataFrame index --- trade_dt , columns --- sid
+        """
+        frame = self._retrieve_mkv(sessions, [asset.sid for asset in assets])
+        panel = frame.pivot_table(index='trade_dt', columns='sid', values=field, aggfunc='last')
+        return panel.reindex(columns=[asset.sid for asset in assets])
+
     def get_spot_value(self, dt, asset, fields):
         """
             retrieve asset data  on dt
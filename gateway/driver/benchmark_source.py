@@ -5,18 +5,114 @@ Created on Thu Nov  1 11:27:02 2018
 
 @author: hengxinliu
 """
-import pandas as pd, json, numpy as np
+import pandas as pd, json, numpy as np, os
 from gateway.driver.tools import _parse_url
 from gateway.spider.url import BENCHMARK_URL
-from gateway.driver import lookup_benchmark
+from gateway.driver import lookup_benchmark, BenchmarkDir
+from util.paths import ensure_directory, last_modified_time, update_modified_time
+from util.profiling import logger
 
 
-class BenchmarkSource(object):
+class BenchmarkStore(object):
+    """
+        benchmark closes persisted locally --- one npz file (trade_dt , close columns) per benchmark
+        plus the symbol mappings of index ; closes are kept in memory once loaded , so that
+        every backtest in a process (e.g. sweep) shares them
+    """
+    _closes = dict()
+
+    def __init__(self, root=BenchmarkDir):
+        self.root = root
+        ensure_directory(root)
+
+    def _path(self, name):
+        return os.path.join(self.root, '%s.npz' % name)
+
+    def is_fresh(self, name):
+        """
+            updated today --- no need to request again
+        """
+        path = self._path(name)
+        if not os.path.exists(path):
+            return False
+        tz = 'Asia/Shanghai'
+        return last_modified_time(path).tz_convert(tz).date() == pd.Timestamp.now(tz).date()
 
+    def load(self, name):
+        """
+        :return: pd.Series close indexed by trade_dt ('%Y-%m-%d') , empty if not stored
+        """
+        try:
+            return self._closes[name]
+        except KeyError:
+            path = self._path(name)
+            if os.path.exists(path):
+                with np.load(path) as arrays:
+                    close = pd.Series(arrays['close'], index=arrays['trade_dt'].astype(str))
+                self._closes[name] = close
+            else:
+                close = pd.Series(dtype='float64')
+            return close
+
+    def save(self, name, close):
+        close = close[~close.index.duplicated(keep='last')].sort_index()
+        path = self._path(name)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, trade_dt=np.array(close.index.tolist(), dtype='U10'), close=close.values.astype('float64'))
+        # atomic replace in case of concurrent workers
+        os.replace(tmp, path)
+        self._closes[name] = close
+
+    def update(self, name, fetch):
+        """
+            incremental update --- fetch(start_date) returns closes since start_date ('%Y-%m-%d' or None)
+        """
+        stored = self.load(name)
+        start = stored.index[-1] if len(stored) else None
+        recent = fetch(start)
+        if recent is not None and len(recent):
+            # overlapped session overwritten by recent
+            close = pd.concat([stored[~stored.index.isin(recent.index)], recent])
+            self.save(name, close)
+        elif os.path.exists(self._path(name)):
+            update_modified_time(self._path(name))
+        return self.load(name)
+
+    def load_mappings(self):
+        path = os.path.join(self.root, 'symbols.json')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    def save_mappings(self, mappings):
+        with open(os.path.join(self.root, 'symbols.json'), 'w', encoding='utf-8') as f:
+            json.dump(mappings, f, ensure_ascii=False)
+
+
+class BenchmarkSource(object):
+    """
+        returns of benchmark served from BenchmarkStore ; request network only when stored
+        closes do not cover sessions and were not updated today (refresh forces update)
+    """
     def __init__(self,
-                 sessions):
+                 sessions,
+                 store=None,
+                 refresh=False):
         self.sessions = sessions
-        self.symbol_mappings = self._initialize_symbols()
+        self.store = store or BenchmarkStore()
+        self.refresh = refresh
+        self._symbol_mappings = None
+
+    @property
+    def symbol_mappings(self):
+        if self._symbol_mappings is None:
+            mappings = self.store.load_mappings()
+            if mappings is None:
+                mappings = self._initialize_symbols()
+                self.store.save_mappings(mappings)
+            self._symbol_mappings = mappings
+        return self._symbol_mappings
 
     @staticmethod
     def _initialize_symbols():
@@ -25,7 +121,8 @@ class BenchmarkSource(object):
         index_mappings = {item['f14']: item['f12'] for item in data['data']['diff']}
         return index_mappings
 
-    def _compute_session_returns(self, returns):
+    def _compute_session_returns(self, close):
+        returns = close / close.shift(1) - 1
         daily_returns = returns.reindex(self.sessions).fillna(0)
         return daily_returns
 
@@ -37,12 +134,14 @@ class BenchmarkSource(object):
             symbol = self.symbol_mappings[symbol]
         return symbol
 
-    def _calculate_returns(self, sid):
+    @staticmethod
+    def _fetch_closes(sid, start=None):
         """
             date --- 19900101
         """
         symbol = '1.' + sid if sid.startswith('0') else '0.' + sid
-        url = BENCHMARK_URL['kline'].format(symbol, '30000101')
+        beg = start.replace('-', '') if start else '19900101'
+        url = BENCHMARK_URL['kline'].format(symbol, beg, '30000101')
         obj = _parse_url(url, bs=False)
         data = json.loads(obj)
         raw = data['data']
@@ -52,20 +151,14 @@ class BenchmarkSource(object):
                                                'turnover', 'volume', 'amount'])
             kline.set_index('trade_dt', inplace=True)
             kline.sort_index(inplace=True)
-            close = kline['close'].astype(np.float)
-            returns = close / close.shift(1) - 1
-            daily_returns = self._compute_session_returns(returns)
-            return daily_returns
+            return kline['close'].astype('float64')
 
-    def _calculate_alternative_returns(self, index_name):
+    @staticmethod
+    def _fetch_alternative_closes(index, start=None):
         """
             dt --- 1990-01-01
         """
-        try:
-            index = lookup_benchmark[index_name]
-        except KeyError:
-            raise ValueError
-        url = BENCHMARK_URL['periphera_kline'] % (index, '3000-01-01')
+        url = BENCHMARK_URL['periphera_kline'] % (index, start or '1990-01-01', '3000-01-01')
         text = _parse_url(url, bs=False, encoding='utf-8')
         raw = json.loads(text)
         kline = pd.DataFrame(raw['data'][index]['day'], columns=[
@@ -73,10 +166,31 @@ class BenchmarkSource(object):
                                     'high', 'low', 'turnover'])
         kline.set_index('trade_dt', inplace=True)
         kline.sort_index(inplace=True)
-        kline = kline.astype('float64')
-        returns = kline['close'] / kline['close'].shift(1) - 1
-        daily_returns = self._compute_session_returns(returns)
-        return daily_returns
+        return kline['close'].astype('float64')
+
+    def _load_closes(self, name, fetch):
+        close = self.store.load(name)
+        covered = len(close) and close.index[-1] >= max(self.sessions)
+        if self.refresh or not (covered or self.store.is_fresh(name)):
+            try:
+                close = self.store.update(name, fetch)
+            except Exception as e:
+                if not len(close):
+                    raise ValueError('benchmark %s is neither stored nor downloaded due to %s' % (name, e))
+                logger.warning('benchmark %s served from store since update failed : %s', name, e)
+        return close
+
+    def _calculate_returns(self, sid):
+        close = self._load_closes(sid, lambda start: self._fetch_closes(sid, start))
+        return self._compute_session_returns(close)
+
+    def _calculate_alternative_returns(self, index_name):
+        try:
+            index = lookup_benchmark[index_name]
+        except KeyError:
+            raise ValueError
+        close = self._load_closes(index, lambda start: self._fetch_alternative_closes(index, start))
+        return self._compute_session_returns(close)
 
     def calculate_returns(self, proxy_name):
         if proxy_name in set(lookup_benchmark):
@@ -87,4 +201,4 @@ class BenchmarkSource(object):
         return returns
 
 
-__all__ = ['BenchmarkSource']
+__all__ = ['BenchmarkStore', 'BenchmarkSource']
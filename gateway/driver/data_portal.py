@@ -12,6 +12,9 @@ from gateway.driver.resample import Freq
 from gateway.driver.bar_reader import AssetSessionReader
 from gateway.driver.bcolz_reader import BcolzMinuteReader
 from gateway.driver.adjustment_reader import SQLiteAdjustmentReader
+from gateway.driver.aggregator import DailyHistoryAggregator
+from gateway.driver._ext_vwap import VWAP
+from gateway.driver.panel_resample import PanelResampler
 from gateway.driver.history import (
     HistoryDailyLoader,
     HistoryMinuteLoader
@@ -52,13 +55,51 @@ class DataPortal(object):
             'daily': _history_daily_loader,
             'minute': _history_minute_loader,
         }
+        # partial daily bar of current session in minute mode
+        self._daily_aggregator = DailyHistoryAggregator(_minute_reader)
+        # vwap / twap / range kernel over minute bars
+        self._intraday = VWAP(_minute_reader)
+        # minute / daily bars -> n minutes , daily , weekly , monthly bars
+        self._resampler = PanelResampler()
         self.freq_rule = Freq()
         self._extra_source = None
+        # gateway.driver.session_context.SessionContext of the simulating session
+        self._session_context = None
+        # util.cache.ResultCache of history windows and panels across runs
+        self._result_cache = None
+
+    @property
+    def result_cache(self):
+        return self._result_cache
+
+    def set_result_cache(self, cache):
+        """
+        :param cache: util.cache.ResultCache or None (disabled)
+        """
+        self._result_cache = cache
 
     @property
     def adjustment_reader(self):
         return self._adjustment_reader
 
+    def enter_session(self, context):
+        """
+            set SessionContext shared by models during the session , None to leave
+        """
+        self._session_context = context
+
+    def get_session_context(self, dt):
+        """
+        :param dt: str or pd.Timestamp
+        :return: SessionContext of dt or None
+        """
+        context = self._session_context
+        if context is not None:
+            dt = dt.strftime('%Y-%m-%d') if isinstance(dt, pd.Timestamp) else dt
+            if context.session == dt:
+                return context
+        return None
+
     def get_dividends(self, assets, trading_day):
         """
         splits --- divdends
@@ -105,25 +146,123 @@ class DataPortal(object):
         mkv = self._history_loader['daily'].get_mkv_value(sessions, assets, fields)
         return mkv
 
+    def get_mkv_panel(self, sessions, assets, field='mkv_cap'):
+        """
+        Market value of assets over sessions in one query.
+
+        Parameters
+        ----------
+        sessions : [start_date, end_date]
+        assets : list of Asset
+        field : mkv (general) , mkv_cap (float) or mkv_strict
+
+        Returns
+        -------
+        DataFrame index --- trade_dt , columns --- sid
+        """
+        panel = self._history_loader['daily'].get_mkv_panel(sessions, assets, field)
+        return panel
+
     def get_spot_value(self, dts, asset, frequency, field):
         spot_value = self._history_loader[frequency].get_spot_value(dts, asset, field)
         return spot_value
 
+    def get_current_daily_bar(self, assets, dt, fields):
+        """
+        Daily bar of the session rolled up from minute bars until dt , intended
+        for the last slot of daily history in minute mode.
+
+        Returns
+        -------
+        DataFrame index --- sid , columns --- fields
+        """
+        return self._daily_aggregator.aggregate(assets, dt, fields)
+
+    def get_minute_bars(self, assets, dt, fields):
+        """
+        Raw minute bars of assets on the minute dt , intended for matching orders
+        minute by minute.
+
+        Returns
+        -------
+        DataFrame index --- sid , columns --- fields (nan if no bar on dt)
+        """
+        return self._daily_aggregator.minute_bars(assets, dt, fields)
+
+    def get_session_bars(self, assets, dt, fields):
+        """
+        Raw daily bars of assets on dt in one query.
+
+        Returns
+        -------
+        dict sid -> frame (empty or one row)
+        """
+        history = self._history_loader['daily']
+        return history.adjust_window.array([dt, dt], assets, fields)
+
+    def get_intraday_stats(self, assets, dt, window=1):
+        """
+        Intraday statistics (open , high , low , close , vwap , twap , range , volume , minutes)
+        computed from minute bars of all assets in one pass.
+
+        Parameters
+        ----------
+        assets : list of Asset
+        dt : str , the last session (included)
+        window : int , number of sessions
+
+        Returns
+        -------
+        dict sid -> frame indexed by trade_dt
+        """
+        sdate = self._history_loader['daily'].trading_calendar.dt_window_size(dt, - abs(window))
+        return self._intraday.intraday_stats([sdate, dt], assets)
+
+    def get_resampled_bars(self, assets, sessions, frequency, fields=None):
+        """
+        Raw bars of assets over sessions resampled to frequency in one pass , n minutes and
+        daily bars from minute bars , weekly and monthly bars from daily bars.
+
+        Parameters
+        ----------
+        assets : list of Asset
+        sessions : [start_date, end_date]
+        frequency : '<n>min' , 'daily' , 'weekly' or 'monthly'
+        fields : list of OHLCV fields , default all
+
+        Returns
+        -------
+        dict sid -> frame indexed by bar label
+        """
+        fields = list(fields) if fields else list(self.OHLCV_FIELDS)
+        if not set(fields).issubset(self.OHLCV_FIELDS):
+            raise ValueError("Invalid field: {0}".format(fields))
+        source = 'daily' if frequency in ('weekly', 'monthly') else 'minute'
+        history = self._history_loader[source]
+        frames = history.adjust_window.array([min(sessions), max(sessions)], assets, fields)
+        return self._resampler.resample(frames, frequency, fields)
+
     def get_stack_value(self, tbl, dt, length, frequency):
         stack = self._history_loader[frequency].get_stack_value(tbl, dt, length)
         return stack
 
+    def get_pre_close(self, asset, dt):
+        """
+            adjusted close of the session before dt (ex-right reference price) , the same
+            definition as SessionContext.get_pre_close
+        """
+        session = dt.strftime('%Y-%m-%d') if isinstance(dt, pd.Timestamp) else dt
+        close = self.get_history_window([asset], session, -2, ['close'], 'daily')[asset.sid]['close']
+        close = close[close.index < session]
+        return close.iloc[-1]
+
     def get_open_pct(self, asset, dt):
-        if asset.asset_type == 'equity':
-            # 存在0.1%误差
-            spot_value = self.get_spot_value(dt, asset, 'daily', ['open', 'high', 'low', 'close', 'pct'])
-            preclose = (spot_value['high'] - spot_value['low']) * 100 / spot_value['pct']
-            open_pct = spot_value['open'] / preclose - 1
-        else:
-            spot_value = self.get_spot_value(dt, asset, 'daily', ['open', 'close'])
-            pre_value = self.get_history_window([asset], dt, -1, ['close'], 'daily')
-            preclose = pre_value[asset.sid]['close'].iloc[-1]
-            open_pct = spot_value['open'] / preclose - 1
+        """
+        :return: open_pct (raw open of dt over pre_close) , pre_close
+        """
+        preclose = self.get_pre_close(asset, dt)
+        spot_value = self.get_spot_value(dt, asset, 'daily', ['open'])
+        open_pct = spot_value['open'] / preclose - 1
         return open_pct, preclose
 
     def get_window(self,
@@ -177,7 +316,8 @@ class DataPortal(object):
         assets : list of zipline.data.Asset objects
             The asset whose data is desired.
 
-        end_date : history date(not include)
+        end_date : history date(not include) ; a minute Timestamp (minute mode) ends the
+            daily window with the partial bar of its session until the minute
 
         bar_count: int
             The number of bars desired.
@@ -207,10 +347,78 @@ class DataPortal(object):
             raise ValueError(
                 "abs (bar_count) must be >= 1, but got {}".format(bar_count)
             )
+        if data_frequency == 'daily' and isinstance(end_date, pd.Timestamp) \
+                and end_date != end_date.normalize():
+            return self._intraday_history_window(assets, end_date, bar_count, fields)
         history = self._history_loader[data_frequency]
-        history_window_arrays = history.history(assets, fields, end_date, bar_count)
+        if self._result_cache is None:
+            return history.history(assets, fields, end_date, bar_count)
+        history_window_arrays = self._result_cache.fetch(
+            'history_window',
+            lambda: history.history(assets, fields, end_date, bar_count),
+            sids=sorted(asset.sid for asset in assets),
+            end_date=end_date,
+            bar_count=bar_count,
+            fields=list(fields),
+            frequency=data_frequency)
+        return history_window_arrays
+
+    def _intraday_history_window(self, assets, dt, bar_count, fields):
+        """
+            daily window on a minute dt (minute mode) --- completed sessions plus the partial
+            bar of the session rolled up to dt by DailyHistoryAggregator as the last slot
+        """
+        session = dt.strftime('%Y-%m-%d')
+        window = self.get_history_window(assets, session, bar_count + 1, fields, 'daily') \
+            if bar_count < -1 else dict()
+        partial = self._daily_aggregator.aggregate(assets, dt, fields)
+        history_window_arrays = dict()
+        for asset in assets:
+            current = partial.loc[[asset.sid]].set_axis([session])
+            frame = window.get(asset.sid)
+            if isinstance(frame, pd.Series):
+                # window of one session is a spot value
+                calendar = self._history_loader['daily'].trading_calendar
+                frame = frame.to_frame(calendar.dt_window_size(session, -1)).T
+            history_window_arrays[asset.sid] = current if frame is None or not len(frame) \
+                else pd.concat([frame.reindex(columns=fields), current])
         return history_window_arrays
 
+    def get_history_panel(self,
+                          assets,
+                          sessions,
+                          field,
+                          data_frequency):
+        """
+        Public API method that returns the adjusted arrays of assets over a whole
+        range of sessions in one load , intended for precomputing pipelines by chunk.
+
+        Parameters
+        ----------
+        assets : list of Asset objects
+        sessions : [start_date, end_date]
+        field : list of OHLCV fields
+        data_frequency : daily or minute
+
+        Returns
+        -------
+        (dict sid -> adjusted frame , dict sid -> qfq coef series aligned with frame)
+        """
+        fields = field if isinstance(field, (set, list)) else [field]
+        if not set(fields).issubset(self.OHLCV_FIELDS):
+            raise ValueError("Invalid field: {0}".format(field))
+        history = self._history_loader[data_frequency]
+        if self._result_cache is None:
+            return history.panel(assets, fields, sessions)
+        panel = self._result_cache.fetch(
+            'history_panel',
+            lambda: dict(zip(['arrays', 'coefs'], history.panel(assets, fields, sessions))),
+            sids=sorted(asset.sid for asset in assets),
+            sessions=list(sessions),
+            fields=list(fields),
+            frequency=data_frequency)
+        return panel['arrays'], panel['coefs']
+
     def handle_extra_source(self):
         """
             extra data source
@@ -224,7 +432,7 @@ class DataPortal(object):
             by_month :param delta: int ,the number day of month (max -- 31) which is trading_day
         """
         method_name = '%s_rules' % freq
-        samples = getattr(self.freq_rule, method_name)(args, kwargs)
+        samples = getattr(self.freq_rule, method_name)(kwargs if freq == 'minute' else args)
         return samples
 
     @staticmethod
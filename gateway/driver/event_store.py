@@ -0,0 +1,121 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import numpy as np, pandas as pd
+from util.profiling import logger, tracer
+
+EventStart = '1990-01-01'
+EventEnd = '3000-01-01'
+
+
+class EventStore(object):
+    """
+        columnar event store of a fundamental reader (massive , release , holder , ownership ,
+        margin) sorted by (sid , declared_date) with an as-of index
+
+        1 build --- all rows of reader are loaded once (reader.load_events) , columns are kept as
+                    arrays sorted by (sid , declared_date) and the offsets of each sid are indexed
+        2 query --- events of sids in [sdate , dt] are two searchsorted on the declared_date of
+                    the sid block and a slice
+        3 refresh --- spiders only append rows whose declared_date is beyond the deadline of
+                      table (gateway.spider.events) , so rows from the latest declared_date are
+                      queried and merged ; refresh is called by query when dt is beyond the
+                      watermark and not checked yet , and by the event spider after it writes
+                      (rows of a date already checked are only picked up by that refresh)
+
+        readers without sid (margin) are stored as a single block
+    """
+    def __init__(self, reader):
+        self._reader = reader
+        self._frame = None
+        # the latest dt checked against reader beyond watermark
+        self._checked = EventStart
+        self._keyed = True
+        self._dates = np.array([], dtype=str)
+        self._columns = dict()
+        self._offsets = dict()
+
+    @property
+    def loaded(self):
+        return self._frame is not None
+
+    @property
+    def watermark(self):
+        """the latest declared_date in store"""
+        return self._dates.max() if len(self._dates) else EventStart
+
+    def _build(self, frame):
+        frame = frame.copy()
+        frame['declared_date'] = frame['declared_date'].astype(str)
+        self._keyed = 'sid' in frame.columns
+        keys = ['sid', 'declared_date'] if self._keyed else ['declared_date']
+        frame = frame.drop_duplicates(ignore_index=True)
+        frame = frame.sort_values(keys, kind='mergesort', ignore_index=True)
+        self._frame = frame
+        self._dates = frame['declared_date'].values.astype(str)
+        fields = [col for col in frame.columns if col not in keys]
+        self._columns = {field: frame[field].values for field in fields}
+        if self._keyed:
+            sids = frame['sid'].values.astype(str)
+            uniques, starts = np.unique(sids, return_index=True)
+            ends = np.append(starts[1:], len(sids))
+            self._offsets = dict(zip(uniques, zip(starts, ends)))
+        else:
+            self._offsets = {None: (0, len(frame))}
+
+    def refresh(self):
+        """
+            merge rows from the latest declared_date (inclusive , duplicates are dropped)
+        """
+        with tracer.span('event_store.refresh'):
+            if self._frame is None:
+                self._build(self._reader.load_events([EventStart, EventEnd]))
+            else:
+                increment = self._reader.load_events([self.watermark, EventEnd])
+                if not increment.empty:
+                    self._build(pd.concat([self._frame, increment], ignore_index=True))
+        logger.debug('event store refreshed to %s', self.watermark)
+
+    def _slice(self, key, sdate, edate):
+        start, end = self._offsets[key]
+        dates = self._dates[start: end]
+        lo = start + dates.searchsorted(sdate, side='left')
+        hi = start + dates.searchsorted(edate, side='right')
+        return lo, hi
+
+    def _to_frame(self, lo, hi, fields):
+        fields = fields if fields else list(self._columns)
+        frame = pd.DataFrame({field: self._columns[field][lo: hi] for field in fields},
+                             index=pd.Index(self._dates[lo: hi], name='declared_date'))
+        return frame
+
+    def load_raw_arrays(self, dts, assets, fields=None):
+        """
+            same as reader.load_raw_arrays
+        :param dts: [sdate , edate]
+        :param assets: list of Asset (ignored by readers without sid)
+        :return: dict sid -> frame indexed by declared_date (sids without events are omitted) ,
+                 frame for readers without sid
+        """
+        sdate, edate = dts
+        if self._frame is None or edate > max(self.watermark, self._checked):
+            self.refresh()
+            self._checked = max(edate, self._checked)
+        if not self._keyed:
+            lo, hi = self._slice(None, sdate, edate)
+            return self._to_frame(lo, hi, fields)
+        arrays = dict()
+        for asset in assets:
+            if asset.sid not in self._offsets:
+                continue
+            lo, hi = self._slice(asset.sid, sdate, edate)
+            if hi > lo:
+                arrays[asset.sid] = self._to_frame(lo, hi, fields)
+        return arrays
+
+
+__all__ = ['EventStore']
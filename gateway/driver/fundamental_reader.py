@@ -39,9 +39,10 @@ class MassiveSessionReader(BarReader):
         massive_frame.drop_duplicates(inplace=True, ignore_index=True)
         return massive_frame
 
-    def load_raw_arrays(self, dts, assets, fields=None):
-        sids = [a.sid for a in assets]
-        # 获取数据
+    def load_events(self, dts):
+        """
+            rows of sessions , columns --- sid , declared_date and event fields
+        """
         table = self.metadata.tables['massive']
         sql = select([table.c.declared_date,
                       table.c.sid,
@@ -54,8 +55,14 @@ class MassiveSessionReader(BarReader):
         frame = pd.DataFrame(self.engine.execute(sql).fetchall(),
                              columns=['declared_date', 'sid', 'bid_price', 'discount',
                                       'bid_volume', 'buyer', 'seller', 'cjeltszb'])
+        frame.drop_duplicates(inplace=True, ignore_index=True)
+        return frame
+
+    def load_raw_arrays(self, dts, assets, fields=None):
+        sids = [a.sid for a in assets]
+        # 获取数据
+        frame = self.load_events(dts)
         frame.set_index('sid', inplace=True)
-        frame.drop_duplicates(inplace=True)
         frame_dct = unpack_df_to_component_dict(frame, 'declared_date')
         frame_dct = valmap(lambda x: x.loc[:, fields] if fields else x, frame_dct)
         massive_frame = keyfilter(lambda x: x in sids, frame_dct)
@@ -82,8 +89,7 @@ class ReleaseSessionReader(BarReader):
         release_frame.drop_duplicates(inplace=True, ignore_index=True)
         return release_frame
 
-    def load_raw_arrays(self, dts, assets, fields=None):
-        sids = [a.sid for a in assets]
+    def load_events(self, dts):
         table = self.metadata.tables['unfreeze']
         sql = select([table.c.sid,
                       table.c.declared_date,
@@ -93,8 +99,13 @@ class ReleaseSessionReader(BarReader):
         frame = pd.DataFrame(self.engine.execute(sql).fetchall(),
                              columns=['sid', 'declared_date',
                                       'release_type', 'zb'])
+        frame.drop_duplicates(inplace=True, ignore_index=True)
+        return frame
+
+    def load_raw_arrays(self, dts, assets, fields=None):
+        sids = [a.sid for a in assets]
+        frame = self.load_events(dts)
         frame.set_index('sid', inplace=True)
-        frame.drop_duplicates(inplace=True)
         frame_dct = unpack_df_to_component_dict(frame, 'declared_date')
         frame_dct = valmap(lambda x: x.loc[:, fields] if fields else x, frame_dct)
         release_frame = keyfilter(lambda x: x in sids, frame_dct)
@@ -128,9 +139,8 @@ class HolderSessionReader(BarReader):
         holder_frame.drop_duplicates(inplace=True, ignore_index=True)
         return holder_frame
 
-    def load_raw_arrays(self, dts, assets, fields=None):
+    def load_events(self, dts):
         """股东持仓变动"""
-        sids = [a.sid for a in assets]
         table = self.metadata.tables['holder']
         sql = select([table.c.sid,
                       table.c.declared_date,
@@ -145,8 +155,14 @@ class HolderSessionReader(BarReader):
         frame = pd.DataFrame(self.engine.execute(sql).fetchall(),
                              columns=['sid', 'declared_date', '股东', '方式', '变动股本',
                                       '总持仓', '占总股本比', '总流通股', '占流通比'])
+        frame.drop_duplicates(inplace=True, ignore_index=True)
+        return frame
+
+    def load_raw_arrays(self, dts, assets, fields=None):
+        """股东持仓变动"""
+        sids = [a.sid for a in assets]
+        frame = self.load_events(dts)
         frame.set_index('sid', inplace=True)
-        frame.drop_duplicates(inplace=True)
         frame_dct = unpack_df_to_component_dict(frame, 'declared_date')
         frame_dct = valmap(lambda x: x.loc[:, fields] if fields else x, frame_dct)
         holder_frame = keyfilter(lambda x: x in sids, frame_dct)
@@ -184,8 +200,7 @@ class OwnershipSessionReader(BarReader):
         ownership_frame.drop_duplicates(inplace=True, ignore_index=True)
         return ownership_frame
 
-    def load_raw_arrays(self, dts, assets, fields=None):
-        sids = [a.sid for a in assets]
+    def load_events(self, dts):
         table = self.metadata.tables['ownership']
         ins = sa.select([table.c.sid,
                          table.c.declared_date,
@@ -197,8 +212,13 @@ class OwnershipSessionReader(BarReader):
         frame = pd.DataFrame(self.engine.execute(ins).fetchall(),
                              columns=['sid', 'declared_date', 'ex_date', 'general',
                                       'float', 'manager', 'strict'])
+        frame.drop_duplicates(inplace=True, ignore_index=True)
+        return frame
+
+    def load_raw_arrays(self, dts, assets, fields=None):
+        sids = [a.sid for a in assets]
+        frame = self.load_events(dts)
         frame.set_index('sid', inplace=True)
-        frame.drop_duplicates(inplace=True)
         frame_dct = unpack_df_to_component_dict(frame, 'declared_date')
         frame_dct = valmap(lambda x: x.loc[:, fields] if fields else x, frame_dct)
         ownership_frame = keyfilter(lambda x: x in sids, frame_dct)
@@ -217,7 +237,7 @@ class MarginSessionReader(BarReader):
     def get_spot_value(self, dt, asset, fields=None):
         raise NotImplementedError('get_values is deprescated ,use load_raw_arrays method')
 
-    def load_raw_arrays(self, dts, assets, fields=None):
+    def load_events(self, dts):
         table = self.metadata.tables['margin']
         ins = sa.select([table.c.declared_date,
                          table.c.rzye,
@@ -226,8 +246,12 @@ class MarginSessionReader(BarReader):
             where(table.c.declared_date.between(dts[0], dts[1]))
         frame = pd.DataFrame(self.engine.execute(ins).fetchall(),
                              columns=['declared_date', 'rzye', 'rzyezb', 'rqye'])
+        frame.drop_duplicates(inplace=True, ignore_index=True)
+        return frame
+
+    def load_raw_arrays(self, dts, assets, fields=None):
+        frame = self.load_events(dts)
         frame.set_index('declared_date', inplace=True)
-        frame.drop_duplicates(inplace=True)
         return frame
 
 
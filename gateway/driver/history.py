@@ -69,6 +69,20 @@ class HistoryLoader(object):
         sliding_window = valmap(lambda x: x.reindex(columns=fields), adjust_arrays)
         return sliding_window
 
+    def panel(self, assets, field, sessions):
+        """
+        Adjusted arrays of a whole range of sessions loaded at once , with the
+        qfq coef of each sid used to re-base sub windows (see SlidingWindow.window_panel)
+        """
+        adjust_arrays, coefs = self.adjust_window.window_panel(
+            sessions,
+            assets,
+            list(DefaultFields)
+        )
+        from toolz import valmap
+        adjust_arrays = valmap(lambda x: x.reindex(columns=field), adjust_arrays)
+        return adjust_arrays, coefs
+
     def window(self, assets, field, dts, window):
         if window == -1:
             frame = dict()
@@ -137,6 +151,10 @@ class HistoryDailyLoader(HistoryLoader):
         mkv = self.adjust_window.get_mkv_value(session, assets, fields)
         return mkv
 
+    def get_mkv_panel(self, session, assets, field):
+        panel = self.adjust_window.get_mkv_panel(session, assets, field)
+        return panel
+
     def window(self, assets, field, dts, window):
         daily_window = super().window(assets, field, dts, window)
         return daily_window
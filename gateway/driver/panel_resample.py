@@ -0,0 +1,179 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import re, numpy as np, pandas as pd
+from _calendar.trading_calendar import calendar
+
+ResampleFields = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+# minute of day of the session edges (09:30 open , 11:30 - 13:00 recess , 15:00 close)
+SessionOpen = 570
+RecessStart = 690
+RecessEnd = 780
+SessionMinutes = 240
+
+
+def _to_epochs(index):
+    """
+        integer epochs (seconds) of naive Timestamp or '%Y-%m-%d' index
+    """
+    return pd.DatetimeIndex(index).values.astype('datetime64[s]').view('int64')
+
+
+def _parse_frequency(frequency):
+    """
+    :param frequency: '<n>min' , 'daily' , 'weekly' or 'monthly'
+    :return: (rule , n)
+    """
+    if frequency in ('daily', 'weekly', 'monthly'):
+        return frequency, 1
+    matched = re.fullmatch(r'(\d+)\s*(m|min|minute)', frequency)
+    if not matched or not 0 < int(matched.group(1)) <= SessionMinutes:
+        raise ValueError('unknown frequency : %r' % frequency)
+    return 'minute', int(matched.group(1))
+
+
+def stack_bars(frames, fields):
+    """
+    :param frames: dict sid -> bar frame indexed by minute or session
+    :return: sids , epochs , arrays concatenated in sid order (each sid sorted by epoch)
+    """
+    sids, epochs, arrays = [], [], {field: [] for field in fields}
+    for sid, frame in frames.items():
+        if frame.empty:
+            continue
+        frame_epochs = _to_epochs(frame.index)
+        order = np.argsort(frame_epochs, kind='mergesort')
+        sids.append(np.full(len(frame), sid, dtype=object))
+        epochs.append(frame_epochs[order])
+        for field in fields:
+            arrays[field].append(frame[field].values.astype(float)[order])
+    if not epochs:
+        return np.array([], dtype=object), np.array([], dtype='int64'), \
+            {field: np.array([]) for field in fields}
+    return np.concatenate(sids), np.concatenate(epochs), \
+        {field: np.concatenate(values) for field, values in arrays.items()}
+
+
+class PanelResampler(object):
+    """
+        resample minute or daily bars of all assets at once (instead of streaming bars through
+        gateway.driver.resampler.Resampler)
+
+        1 bucket --- each bar is keyed by (sid , bucket) :
+            minute  --- session minute // n , edges are aligned to the session open and recess
+                        (30min --- 10:00 ... 11:30 , 13:30 ... 15:00) , labeled by the right edge
+            daily   --- session of bar
+            weekly  --- ISO week of trading sessions , labeled by its last trading session
+            monthly --- month of trading sessions , labeled by its last trading session
+        2 reduce --- bars are sorted by (sid , epoch) so buckets are contiguous and reduced with
+                     np.*.reduceat on bucket starts : open first , high fmax , low fmin ,
+                     close last , volume and amount add
+    """
+    def __init__(self, trading_calendar=None):
+        self._calendar = trading_calendar or calendar
+        self._buckets = dict()
+
+    def _session_buckets(self, rule):
+        """
+        :return: days of trading sessions , bucket position of each session , bucket labels
+        """
+        try:
+            return self._buckets[rule]
+        except KeyError:
+            sessions = pd.DatetimeIndex(self._calendar.all_sessions)
+            days = sessions.values.astype('datetime64[D]').view('int64')
+            if rule == 'weekly':
+                iso = sessions.isocalendar()
+                keys = iso['year'].values.astype('int64') * 100 + iso['week'].values.astype('int64')
+            elif rule == 'monthly':
+                keys = sessions.year.values * 100 + sessions.month.values
+            else:
+                keys = days
+            change = np.empty(len(keys), dtype=bool)
+            change[:1] = True
+            change[1:] = keys[1:] != keys[:-1]
+            positions = np.cumsum(change) - 1
+            ends = np.append(np.flatnonzero(change)[1:], len(keys)) - 1
+            labels = np.asarray(sessions.strftime('%Y-%m-%d'))[ends]
+            entry = self._buckets[rule] = (days, positions, labels)
+            return entry
+
+    @staticmethod
+    def _minute_buckets(epochs, n):
+        """
+            bucket of session minutes (bars are labeled by their close , 09:31 -> 1 , 15:00 -> 240)
+        """
+        minutes = (epochs % 86400) // 60
+        offset = np.where(minutes >= RecessEnd, minutes - RecessEnd + RecessStart - SessionOpen,
+                          minutes - SessionOpen)
+        # call auction bar (09:30) joins the first bucket
+        slots = np.clip(offset - 1, 0, SessionMinutes - 1) // n
+        days = epochs // 86400
+        edges = np.minimum((slots + 1) * n, SessionMinutes)
+        edges = np.where(edges > RecessStart - SessionOpen, edges - (RecessStart - SessionOpen) + RecessEnd,
+                         edges + SessionOpen)
+        labels = (days * 86400 + edges * 60).astype('datetime64[s]').astype('datetime64[ns]')
+        return days * (SessionMinutes + 1) + slots, labels
+
+    def _bucketize(self, rule, n, epochs):
+        if rule == 'minute':
+            return self._minute_buckets(epochs, n)
+        days, positions, labels = self._session_buckets(rule)
+        loc = np.clip(days.searchsorted(epochs // 86400, side='right') - 1, 0, len(days) - 1)
+        buckets = positions[loc]
+        return buckets, labels[buckets]
+
+    def resample(self, frames, frequency, fields=None):
+        """
+        :param frames: dict sid -> bars (minute bars indexed by naive Timestamp or daily bars
+                       indexed by session)
+        :param frequency: '<n>min' , 'daily' , 'weekly' or 'monthly'
+        :param fields: OHLCV fields , default all ResampleFields of frames
+        :return: dict sid -> resampled frame indexed by label (Timestamp for minute frequency ,
+                 '%Y-%m-%d' otherwise)
+        """
+        rule, n = _parse_frequency(frequency)
+        if fields is None:
+            columns = set().union(*[frame.columns for frame in frames.values()]) if frames else set()
+            fields = [field for field in ResampleFields if field in columns]
+        sids, epochs, arrays = stack_bars(frames, fields)
+        if not len(epochs):
+            return dict()
+        buckets, labels = self._bucketize(rule, n, epochs)
+        codes = np.unique(sids, return_inverse=True)[1]
+        boundary = np.empty(len(epochs), dtype=bool)
+        boundary[0] = True
+        boundary[1:] = (buckets[1:] != buckets[:-1]) | (codes[1:] != codes[:-1])
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(epochs)) - 1
+
+        out = dict()
+        for field in fields:
+            values = arrays[field]
+            if field == 'open':
+                out[field] = values[starts]
+            elif field == 'high':
+                out[field] = np.fmax.reduceat(values, starts)
+            elif field == 'low':
+                out[field] = np.fmin.reduceat(values, starts)
+            elif field == 'close':
+                out[field] = values[ends]
+            else:
+                out[field] = np.add.reduceat(np.nan_to_num(values), starts)
+        index = pd.DatetimeIndex(labels[starts]) if rule == 'minute' else pd.Index(labels[starts])
+        resampled = pd.DataFrame(out, index=index, columns=fields)
+        group_sids = sids[starts]
+        bounds = np.append(np.flatnonzero(group_sids[1:] != group_sids[:-1]) + 1, len(group_sids))
+        bars, lo = dict(), 0
+        for hi in bounds:
+            bars[group_sids[lo]] = resampled.iloc[lo: hi]
+            lo = hi
+        return bars
+
+
+__all__ = ['PanelResampler', 'ResampleFields']
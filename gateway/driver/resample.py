@@ -7,6 +7,7 @@ Created on Tue Mar 12 15:37:47 2019
 """
 import pandas as pd
 from _calendar.trading_calendar import calendar
+from util.events import NthTradingDayOfWeek, NthTradingDayOfMonth
 
 __all__ = ['Freq']
 
@@ -14,45 +15,40 @@ __all__ = ['Freq']
 class Freq(object):
     """
         every_day week_start week_end month_start month_end (specific trading day)
-        # grouped_by_sid = source_df.groupby(["sid"])
-        # group_names = grouped_by_sid.groups.keys()
-        # group_dict = {}
-        # for group_name in group_names:
-        #     group_dict[group_name] = grouped_by_sid.get_group(group_name)
-        # for col_name in df.columns.difference(['sid'])
+
+        rules are compiled over all sessions once (util.events) and cached by td_delta
     """
     def __init__(self):
-        self.sessions = [pd.Timestamp(s) for s in calendar.all_sessions]
+        self.sessions = pd.DatetimeIndex(calendar.all_sessions)
+        self._cache = dict()
+
+    def _compiled(self, rule, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            mask, _ = rule.compile(self.sessions)
+            samples = self._cache[key] = frozenset(self.sessions[mask])
+            return samples
 
     def minute_rules(self, kwargs):
         """
         :return:specific ticker , e,g --- 9:30,10:30
         """
-        minutes = [session + pd.Timedelta(hours=kwargs['hour'], minutes=kwargs['minute']) for session in self.sessions]
-        return minutes
+        minutes = self.sessions + pd.Timedelta(hours=kwargs['hour'], minutes=kwargs['minute'])
+        return list(minutes)
 
     def week_rules(self, td_delta):
         """
-        Group by ISO year (0) and week (1) --- isocalendar return iso_year iso_week number  iso week day
-        :param td_delta: number
+        nth trading day of ISO week
+        :param td_delta: number (negative counts from the end of week)
         """
-        return set(
-            pd.Series(data=self.sessions, index=self.sessions)
-            .groupby(lambda x: x.isocalendar()[0:2])
-            .nth(td_delta)
-            # .astype(np.int64)
-        )
+        return set(self._compiled(NthTradingDayOfWeek(td_delta), ('week', td_delta)))
 
     def month_rules(self, td_delta):
         """
-        :param td_delta: number
+        :param td_delta: number (negative counts from the end of month)
         """
-        return set(
-            pd.Series(data=self.sessions, index=self.sessions)
-            .groupby([lambda x: x.year, lambda x: x.month])
-            .nth(td_delta)
-            # .astype(np.int64)
-        )
+        return set(self._compiled(NthTradingDayOfMonth(td_delta), ('month', td_delta)))
 
 
 # if __name__ == '__main__':
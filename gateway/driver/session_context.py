@@ -0,0 +1,125 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import pandas as pd
+from gateway.driver.data_portal import portal
+from gateway.driver.history import DefaultFields
+from _calendar.trading_calendar import calendar
+from util.profiling import tracer
+
+SessionFields = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+class SessionContext(object):
+    """
+        market data of a session shared by engine (PricingLoader) , allocation (Turtle) ,
+        division , uncover , execution style , slippage , trading controls and position tracker ,
+        each datum of the union of mask and positions is loaded once a day
+
+        1 panel --- adjusted OHLCV window ending on session , loaded with the longest window
+                    requested and sliced for shorter ones (qfq coef depends on the end only)
+        2 bars --- raw bar of session
+        3 pre_close --- adjusted close of the previous session (ex-right reference price) ,
+                        open_pct and limit prices derive from it
+        4 minutes --- minute kline of session per asset
+
+        assets missing from the context are loaded on demand and kept
+    """
+    def __init__(self, session, assets=()):
+        self.session = session
+        self.assets = set(assets)
+        self._window = 0
+        self._panel = dict()
+        self._bars = dict()
+        self._minutes = dict()
+
+    def __contains__(self, asset):
+        return asset in self.assets
+
+    def extend(self, assets):
+        self.assets.update(assets)
+
+    def _load_panel(self, assets, window):
+        with tracer.span('context.load_panel'):
+            panel = portal.get_history_window(assets, self.session, - window, list(DefaultFields), 'daily')
+        self._panel.update({asset.sid: panel.get(asset.sid, pd.DataFrame()) for asset in assets})
+
+    def history(self, assets, window, fields):
+        """
+            same as portal.get_history_window(assets, session, window, fields, 'daily')
+        :return: dict sid -> adjusted frame
+        """
+        window = abs(window)
+        self.extend(assets)
+        if window > self._window:
+            # reload all assets with the longer window
+            self._window = window
+            self._panel = dict()
+        missing = [asset for asset in self.assets if asset.sid not in self._panel]
+        if missing:
+            self._load_panel(missing, self._window)
+        sdate = calendar.dt_window_size(self.session, - window)
+        history = dict()
+        for asset in assets:
+            frame = self._panel[asset.sid]
+            history[asset.sid] = frame[frame.index >= sdate].reindex(columns=fields) \
+                if not frame.empty else frame
+        return history
+
+    def _load_bars(self, assets):
+        with tracer.span('context.load_bars'):
+            bars = portal.get_session_bars(assets, self.session, SessionFields)
+        self._bars.update({asset.sid: bars.get(asset.sid, pd.DataFrame()) for asset in assets})
+
+    def get_spot_value(self, asset, field):
+        """
+            raw bar of session , same as portal.get_spot_value(session, asset, 'daily', field)
+        """
+        if asset.sid not in self._bars:
+            self.extend([asset])
+            # bars of all known assets are loaded in one query
+            self._load_bars([a for a in self.assets if a.sid not in self._bars])
+        frame = self._bars[asset.sid]
+        if frame.empty:
+            return frame
+        return frame.iloc[-1][field]
+
+    def get_pre_close(self, asset):
+        """
+            same as portal.get_pre_close(asset, session)
+        """
+        close = self.history([asset], 2, ['close'])[asset.sid]['close']
+        close = close[close.index < self.session]
+        return close.iloc[-1]
+
+    def get_open_pct(self, asset):
+        """
+            same as portal.get_open_pct(asset, session)
+        :return: open_pct , pre_close
+        """
+        pre_close = self.get_pre_close(asset)
+        open_pct = self.get_spot_value(asset, 'open') / pre_close - 1
+        return open_pct, pre_close
+
+    def get_limit_prices(self, asset):
+        """
+        :return: upper and bottom price of session limited by restricted_change
+        """
+        pre_close = self.get_pre_close(asset)
+        restricted = asset.restricted_change(self.session)
+        return pre_close * (1 + restricted), pre_close * (1 - restricted)
+
+    def get_minutes(self, asset, fields):
+        """
+            minute kline of session , same as portal.get_spot_value(session, asset, 'minute', fields)
+        """
+        if asset.sid not in self._minutes:
+            self._minutes[asset.sid] = portal.get_spot_value(self.session, asset, 'minute', SessionFields)
+        return self._minutes[asset.sid].reindex(columns=fields)
+
+
+__all__ = ['SessionContext']
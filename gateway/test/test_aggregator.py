@@ -0,0 +1,130 @@
+"""
+DailyHistoryAggregator against pandas resample of the minutes up to dt.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gateway.driver.aggregator import DailyHistoryAggregator
+
+Aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                'volume': 'sum', 'amount': 'sum'}
+
+Fields = list(Aggregations)
+
+Sessions = ['2020-01-02', '2020-01-03']
+
+
+def session_minutes(session):
+    day = pd.Timestamp(session)
+    morning = pd.date_range(day + pd.Timedelta('09:31:00'), day + pd.Timedelta('11:30:00'), freq='min')
+    afternoon = pd.date_range(day + pd.Timedelta('13:01:00'), day + pd.Timedelta('15:00:00'), freq='min')
+    return morning.append(afternoon)
+
+
+def random_minutes(session, seed):
+    """
+        minute bars with nan holes (suspended minutes) and a few missing rows , rows shuffled
+    """
+    rng = np.random.RandomState(seed)
+    index = session_minutes(session)
+    close = 10 + np.cumsum(rng.normal(0, 0.02, len(index)))
+    frame = pd.DataFrame({'open': close + rng.normal(0, 0.01, len(index)),
+                          'high': close + 0.05,
+                          'low': close - 0.05,
+                          'close': close,
+                          'volume': rng.randint(100, 1000, len(index)).astype(float)}, index=index)
+    frame['amount'] = frame['volume'] * frame['close']
+    # the first minutes are suspended
+    frame.iloc[:3] = np.nan
+    frame.iloc[rng.choice(len(index), 20, replace=False)] = np.nan
+    frame = frame.drop(index[rng.choice(len(index), 10, replace=False)])
+    return frame.iloc[rng.permutation(len(frame))]
+
+
+class FakeMinuteReader(object):
+    """
+        minute reader serving frames keyed by (sid , session) , reads are counted
+    """
+    def __init__(self, frames):
+        self.frames = frames
+        self.reads = 0
+
+    def get_spot_value(self, dt, asset, fields):
+        self.reads += 1
+        try:
+            return self.frames[asset.sid, dt].loc[:, fields]
+        except KeyError:
+            return pd.DataFrame(columns=fields)
+
+
+@pytest.fixture
+def market():
+    assets = [SimpleNamespace(sid='600000'), SimpleNamespace(sid='000001'), SimpleNamespace(sid='300750')]
+    frames = {(asset.sid, session): random_minutes(session, seed)
+              for seed, (asset, session) in enumerate((asset, session) for session in Sessions
+                                                      for asset in assets[:2])}
+    return assets, frames
+
+
+def expected_aggregate(frame, dt, fields):
+    window = frame.sort_index().loc[:dt]
+    if window.empty:
+        return pd.Series([0 if field in ('volume', 'amount') else np.nan for field in fields], index=fields)
+    return window.resample('D').agg(Aggregations).iloc[0][fields]
+
+
+def test_aggregate_matches_resample_up_to_dt(market):
+    assets, frames = market
+    reader = FakeMinuteReader(frames)
+    aggregator = DailyHistoryAggregator(reader)
+    for session in Sessions:
+        minutes = session_minutes(session)
+        # lunch break minutes are not bars of the session
+        dts = list(minutes[::7]) + [pd.Timestamp(session) + pd.Timedelta('12:00:00'), minutes[-1]]
+        for dt in dts:
+            result = aggregator.aggregate(assets, dt, Fields)
+            assert list(result.index) == [asset.sid for asset in assets]
+            for asset in assets[:2]:
+                expected = expected_aggregate(frames[asset.sid, session], dt, Fields)
+                np.testing.assert_allclose(result.loc[asset.sid].values.astype(float),
+                                           expected.values.astype(float), equal_nan=True)
+            # no minutes of the asset
+            assert np.isnan(result.loc['300750', ['open', 'high', 'low', 'close']].values.astype(float)).all()
+            assert (result.loc['300750', ['volume', 'amount']] == 0).all()
+    # minutes are read once per asset and session
+    assert reader.reads == len(assets) * len(Sessions)
+
+
+def test_minute_bars_are_raw_bars_of_dt(market):
+    assets, frames = market
+    aggregator = DailyHistoryAggregator(FakeMinuteReader(frames))
+    session = Sessions[0]
+    for dt in list(session_minutes(session)) + [pd.Timestamp(session) + pd.Timedelta('12:00:00')]:
+        bars = aggregator.minute_bars(assets, dt, Fields)
+        for asset in assets:
+            frame = frames.get((asset.sid, session))
+            if frame is not None and dt in frame.index:
+                expected = frame.loc[dt, Fields].values.astype(float)
+            else:
+                # missing row , lunch break or no minutes of the asset
+                expected = np.full(len(Fields), np.nan)
+            np.testing.assert_allclose(bars.loc[asset.sid].values.astype(float), expected, equal_nan=True)
+
+
+def test_shortcuts_and_session_change(market):
+    assets, frames = market
+    aggregator = DailyHistoryAggregator(FakeMinuteReader(frames))
+    first = pd.Timestamp(Sessions[0]) + pd.Timedelta('14:00:00')
+    second = pd.Timestamp(Sessions[1]) + pd.Timedelta('10:00:00')
+    aggregator.closes(assets, first)
+    # caches of the first session are flushed
+    closes = aggregator.closes(assets[:2], second)
+    expected = [expected_aggregate(frames[asset.sid, Sessions[1]], second, ['close'])['close']
+                for asset in assets[:2]]
+    np.testing.assert_allclose(closes, expected)
+    np.testing.assert_allclose(aggregator.volumes(assets[:2], second),
+                               [frames[asset.sid, Sessions[1]].sort_index().loc[:second, 'volume'].sum()
+                                for asset in assets[:2]])
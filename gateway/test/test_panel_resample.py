@@ -0,0 +1,149 @@
+"""
+PanelResampler against pandas resample / groupby references.
+"""
+import os
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# weekdays without the spring festival , the week of 2020-01-27 has no session
+Sessions = [session for session in pd.bdate_range('2019-12-23', '2020-03-06').strftime('%Y-%m-%d')
+            if not '2020-01-24' <= session <= '2020-01-31']
+
+# the calendar of module import is read offline from a sessions file
+_sessions_path = os.path.join(tempfile.mkdtemp(), 'sessions.txt')
+np.savetxt(_sessions_path, Sessions, fmt='%s')
+os.environ.setdefault('ARKQUANT_SESSIONS', _sessions_path)
+
+try:
+    from gateway.driver.panel_resample import PanelResampler
+except ImportError as e:
+    pytest.skip('panel_resample is not importable : %s' % e, allow_module_level=True)
+
+Aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                'volume': 'sum', 'amount': 'sum'}
+
+
+def session_minutes(session):
+    """
+        minute labels of session , 09:30 call auction then 09:31 - 11:30 , 13:01 - 15:00
+    """
+    day = pd.Timestamp(session)
+    morning = pd.date_range(day + pd.Timedelta('09:30:00'), day + pd.Timedelta('11:30:00'), freq='min')
+    afternoon = pd.date_range(day + pd.Timedelta('13:01:00'), day + pd.Timedelta('15:00:00'), freq='min')
+    return morning.append(afternoon).astype('datetime64[ns]')
+
+
+def random_bars(index, seed):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(index))))
+    opens = close * (1 + rng.normal(0, 1e-3, len(index)))
+    return pd.DataFrame({
+        'open': opens,
+        'high': np.maximum(opens, close) * (1 + rng.uniform(0, 1e-3, len(index))),
+        'low': np.minimum(opens, close) * (1 - rng.uniform(0, 1e-3, len(index))),
+        'close': close,
+        'volume': rng.integers(100, 10000, len(index)).astype(float),
+        'amount': rng.uniform(1e3, 1e5, len(index)),
+    }, index=index)
+
+
+@pytest.fixture
+def resampler():
+    return PanelResampler(trading_calendar=SimpleNamespace(all_sessions=Sessions))
+
+
+@pytest.fixture
+def minute_frames():
+    index = session_minutes(Sessions[0])
+    for session in Sessions[1: 3]:
+        index = index.append(session_minutes(session))
+    return {'600000': random_bars(index, 0), '000001': random_bars(index, 1)}
+
+
+@pytest.fixture
+def daily_frames():
+    index = pd.Index(Sessions)
+    return {'600000': random_bars(index, 2), '000001': random_bars(index, 3)}
+
+
+def reference_minutes(frame, n):
+    """
+        groupby reference --- n consecutive trading minutes of a session , labeled by the last
+        minute of the bucket , call auction joins the first bucket
+    """
+    frames = []
+    for _, day in frame.groupby(frame.index.normalize()):
+        slots = np.maximum(np.arange(len(day)) - 1, 0) // n
+        minutes = day.index[1:]
+        labels = minutes[np.minimum((slots + 1) * n, len(minutes)) - 1]
+        frames.append(day.groupby(labels).agg(Aggregations))
+    expected = pd.concat(frames)
+    expected.index = expected.index.astype('datetime64[ns]')
+    return expected
+
+
+def test_30min_matches_pandas_resample(resampler, minute_frames):
+    bars = resampler.resample(minute_frames, '30min')
+    assert set(bars) == set(minute_frames)
+    for sid, frame in minute_frames.items():
+        # call auction bar joins the first bucket
+        shifted = frame.rename(index=lambda dt: dt + pd.Timedelta(minutes=1)
+                               if dt.strftime('%H:%M') == '09:30' else dt)
+        expected = shifted.resample('30min', closed='right', label='right').agg(Aggregations)
+        expected = expected[shifted['close'].resample('30min', closed='right', label='right').count() > 0]
+        expected.index = expected.index.astype('datetime64[ns]')
+        assert len(bars[sid]) == 8 * 3
+        pd.testing.assert_frame_equal(bars[sid], expected, check_freq=False, check_names=False)
+
+
+@pytest.mark.parametrize('frequency', ['1min', '7min', '60min', '240min'])
+def test_minutes_match_groupby(resampler, minute_frames, frequency):
+    n = int(frequency[:-3])
+    bars = resampler.resample(minute_frames, frequency)
+    for sid, frame in minute_frames.items():
+        expected = reference_minutes(frame, n)
+        pd.testing.assert_frame_equal(bars[sid], expected, check_freq=False, check_names=False)
+
+
+def test_daily_from_minutes(resampler, minute_frames):
+    bars = resampler.resample(minute_frames, 'daily', ['open', 'close', 'volume'])
+    for sid, frame in minute_frames.items():
+        expected = frame.groupby(frame.index.strftime('%Y-%m-%d')).agg(Aggregations)
+        pd.testing.assert_frame_equal(bars[sid], expected[['open', 'close', 'volume']],
+                                      check_names=False)
+
+
+@pytest.mark.parametrize('frequency', ['weekly', 'monthly'])
+def test_sessions_match_groupby(resampler, daily_frames, frequency):
+    bars = resampler.resample(daily_frames, frequency)
+    for sid, frame in daily_frames.items():
+        sessions = pd.DatetimeIndex(frame.index)
+        if frequency == 'weekly':
+            iso = sessions.isocalendar()
+            keys = (iso['year'] * 100 + iso['week']).values
+        else:
+            keys = sessions.year * 100 + sessions.month
+        # buckets are labeled by their last trading session
+        labels = pd.Series(frame.index, index=frame.index).groupby(keys).transform('max')
+        expected = frame.groupby(labels.values).agg(Aggregations)
+        pd.testing.assert_frame_equal(bars[sid], expected, check_names=False)
+
+
+def test_weekly_label_is_last_session_before_holiday(resampler, daily_frames):
+    bars = resampler.resample(daily_frames, 'weekly')
+    labels = list(bars['600000'].index)
+    # 2020-01-24 is a holiday , the week ends on 2020-01-23 ; the next week has no session
+    assert '2020-01-23' in labels
+    assert not any('2020-01-24' <= label <= '2020-02-02' for label in labels)
+
+
+def test_empty_and_unknown_frequency(resampler, daily_frames):
+    assert resampler.resample({}, 'weekly') == {}
+    with pytest.raises(ValueError):
+        resampler.resample(daily_frames, 'quarterly')
+    with pytest.raises(ValueError):
+        resampler.resample(daily_frames, '241min')
@@ -9,6 +9,7 @@ import numpy as np, operator as op
 from toolz import groupby, valmap
 from itertools import chain
 from metric.exposure import alpha_beta_aligned
+from util.profiling import logger
 
 
 class SessionField(object):
@@ -177,7 +178,7 @@ class HitRate(object):
                           sessions):
         closed = ledger.position_tracker.record_closed_position
         closed_positions = groupby(lambda x: x.name, list(chain(*closed.values())))
-        print('closed_positions', closed_positions)
+        logger.debug('closed_positions %s', closed_positions)
         win_rate = valmap(lambda x: len([ele for ele in x if ele.cost_basis > 0]) / len(x), closed_positions)
         # packet['cumulative_risk_metrics']['hitRate'] = win_rate
         packet['hitRate'] = win_rate
@@ -44,7 +44,7 @@ class Parallel(object):
             for jb in iterable:
                 result.append(jb[0](*jb[1], **jb[2]))
         else:
-            with ProcessPoolExecutor(max_worker=self.n_jobs) as pool:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
                 for jb in iterable:
                     future_result = pool.submit(jb[0], *jb[1], **jb[2])
                     future_result.add_done_callback(when_done)
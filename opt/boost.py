@@ -5,9 +5,16 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-import redis
+from util.cache import RedisStore, ResultCache
 
 
-r = redis.Redis(host='localhost', port=6379)
-r.set('test', 'test_value')
-print('get', r['test'])
+def redis_cache(host='localhost', port=6379, db=0, version='', expire=None):
+    """
+        ResultCache on redis shared by the workers of a sweep (see util.cache)
+    """
+    import redis
+    client = redis.Redis(host=host, port=port, db=db)
+    return ResultCache(RedisStore(client, expire=expire), version=version)
+
+
+__all__ = ['redis_cache']
@@ -5,9 +5,175 @@ Created on Sun Feb 17 16:11:34 2019
 
 @author: python
 """
+import multiprocessing
+import numpy as np, pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from gateway.driver.data_portal import portal
+from metric.analyzers import sharpe_ratio
+from opt.grid import ParameterGrid
+from util.profiling import logger, tracer
+
+
+def _returns(result):
+    """
+        daily returns of a backtest result --- Series , frame with returns column or
+        VectorizedBacktest.run output
+    """
+    if isinstance(result, dict):
+        result = result['stats']
+    if isinstance(result, pd.DataFrame):
+        result = result['returns']
+    return result
+
+
+def _sharpe(returns):
+    return float(sharpe_ratio(np.asarray(returns, dtype=float), None))
+
+
+def _evaluate(evaluate, objective, cache, loc, params, sessions):
+    """
+        job of train fold (module level to be pickled into workers)
+    """
+    if cache is not None:
+        # workers share market data through the cache instead of reloading
+        portal.set_result_cache(cache)
+    returns = _returns(evaluate(params, sessions))
+    return loc, objective(returns), returns
 
 
 class Generalize(object):
     """
-        测试参数的泛化性能, 防止参数过度优化
-    """
\ No newline at end of file
+        测试参数的泛化性能, 防止参数过度优化 --- walk forward validation
+
+        1 folds --- sessions are split into rolling (or anchored) train / test folds ,
+                    test folds follow each other so the out of sample curve is continuous
+        2 train --- ParameterGrid is evaluated on the train fold in parallel , the params of
+                    best objective (sharpe by default) are picked
+        3 test --- the picked params are evaluated on the test fold , out of sample returns
+                   are stitched into one equity curve
+        4 efficiency --- out of sample / in sample objective per fold , far below 1 means the
+                         params are over fitted
+
+        the first params of each fold run in the main process to warm cache
+        (util.cache.ResultCache , set on portal) , the other N x M backtests of the fold load
+        market data from it , windows a worker loads are written to the same store and reused by
+        the other workers and the test folds of main process
+
+        Parameters
+        ----------
+        evaluate : callable(params , sessions) -> daily returns (Series , frame with returns
+                   or VectorizedBacktest.run output) , module level to be pickled into workers
+        param_grid : dict or list of dict (see ParameterGrid)
+        train_size : int , number of sessions of train fold
+        test_size : int , number of sessions of test fold
+        anchored : bool , train folds start from the first session (expanding) if True
+        objective : callable(returns) -> float , the larger the better
+        n_jobs : int , processes , cpu count if <= 0
+        cache : util.cache.ResultCache , optional
+    """
+    def __init__(self,
+                 evaluate,
+                 param_grid,
+                 train_size,
+                 test_size,
+                 anchored=False,
+                 objective=None,
+                 n_jobs=1,
+                 cache=None):
+        self.evaluate = evaluate
+        self.grid = list(ParameterGrid(param_grid))
+        self.train_size = train_size
+        self.test_size = test_size
+        self.anchored = anchored
+        self.objective = objective or _sharpe
+        self.n_jobs = n_jobs
+        self.cache = cache
+
+    def split(self, sessions):
+        """
+        :param sessions: list of sessions
+        :return: list of (train sessions , test sessions)
+        """
+        sessions = list(sessions)
+        folds = []
+        start = 0
+        while start + self.train_size + self.test_size <= len(sessions):
+            train_start = 0 if self.anchored else start
+            train = sessions[train_start: start + self.train_size]
+            test = sessions[start + self.train_size: start + self.train_size + self.test_size]
+            folds.append((train, test))
+            start += self.test_size
+        if not folds:
+            raise ValueError('sessions (%d) are shorter than train_size + test_size' % len(sessions))
+        return folds
+
+    def _train(self, sessions):
+        """
+        :return: objective of each params in grid
+
+            results are collected in the main process so a failed backtest raises instead of
+            leaving a nan score
+        """
+        scores = np.full(len(self.grid), np.nan)
+        loc, score, _ = _evaluate(self.evaluate, self.objective, self.cache, 0, self.grid[0], sessions)
+        scores[loc] = score
+        args = [(self.evaluate, self.objective, self.cache, loc, params, sessions)
+                for loc, params in enumerate(self.grid) if loc]
+        n_jobs = self.n_jobs if self.n_jobs > 0 else multiprocessing.cpu_count()
+        if n_jobs == 1 or not args:
+            results = [_evaluate(*arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                futures = [pool.submit(_evaluate, *arg) for arg in args]
+                results = [future.result() for future in futures]
+        for loc, score, _ in results:
+            scores[loc] = score
+        return scores
+
+    def run(self, sessions):
+        """
+        :param sessions: list of sessions
+        :return: dict folds (per fold sessions , best params , in / out of sample objective) ,
+                 returns and equity (stitched out of sample) , efficiency
+        """
+        previous = portal.result_cache
+        if self.cache is not None:
+            portal.set_result_cache(self.cache)
+        try:
+            records, oos = [], []
+            for train, test in self.split(sessions):
+                with tracer.span('generalize.train'):
+                    scores = self._train(train)
+                if np.isnan(scores).all():
+                    raise ValueError('objective of all params is nan on train fold %s - %s'
+                                     % (train[0], train[-1]))
+                best = int(np.nanargmax(scores))
+                with tracer.span('generalize.test'):
+                    _, oos_score, returns = _evaluate(self.evaluate, self.objective, self.cache,
+                                                      best, self.grid[best], test)
+                logger.debug('fold %s - %s best params %s', test[0], test[-1], self.grid[best])
+                oos.append(returns)
+                records.append({
+                    'train_start': train[0],
+                    'train_end': train[-1],
+                    'test_start': test[0],
+                    'test_end': test[-1],
+                    'params': self.grid[best],
+                    'is_score': scores[best],
+                    'oos_score': oos_score
+                })
+        finally:
+            portal.set_result_cache(previous)
+        folds = pd.DataFrame(records)
+        returns = pd.concat(oos)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            efficiency = (folds['oos_score'] / folds['is_score']).replace([np.inf, -np.inf], np.nan)
+        return {
+            'folds': folds,
+            'returns': returns,
+            'equity': (1 + returns).cumprod(),
+            'efficiency': efficiency.mean()
+        }
+
+
+__all__ = ['Generalize']
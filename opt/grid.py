@@ -6,7 +6,7 @@ Created on Sun Feb 17 16:11:34 2019
 @author: python
 """
 import operator
-from collections import Mapping
+from collections.abc import Mapping
 from functools import reduce, partial
 from itertools import product
 
@@ -5,10 +5,83 @@ Created on Sun Feb 17 16:11:34 2019
 
 @author: python
 """
+import numpy as np, pandas as pd
 from contextlib import contextmanager
 from enum import Enum
 
 
+class EOrderSameRule(Enum):
+    """对order_pd中对order判断为是否相同使用的规则"""
+
+    """order有相同的symbol和买入日期就认为是相同"""
+    ORDER_SAME_BD = 0
+    """order有相同的symbol, 买入日期，和卖出日期，即不考虑价格，只要日期相同就相同"""
+    ORDER_SAME_BSD = 1
+    """order有相同的symbol, 买入日期，相同的买入价格，即单子买入时刻都相同"""
+    ORDER_SAME_BDP = 2
+    """order有相同的symbol, 买入日期, 买入价格, 并且相同的卖出日期和价格才认为是相同，即买入卖出时刻都相同"""
+    ORDER_SAME_BSPD = 3
+
+
+# columns of order identical under each rule
+SameRuleColumns = {
+    EOrderSameRule.ORDER_SAME_BD: ['symbol', 'buy_date'],
+    EOrderSameRule.ORDER_SAME_BSD: ['symbol', 'buy_date', 'sell_date'],
+    EOrderSameRule.ORDER_SAME_BDP: ['symbol', 'buy_date', 'buy_price'],
+    EOrderSameRule.ORDER_SAME_BSPD: ['symbol', 'buy_date', 'sell_date', 'buy_price', 'sell_price'],
+}
+
+
+def order_keys(orders_pd, same_rule):
+    """
+    将order按same_rule编码为uint64 hash key, 相同的order对应相同的key
+
+    :param orders_pd: 回测结果生成的交易订单构成的pd.DataFrame对象
+    :param same_rule: order判断为是否相同使用的规则
+    :return: np.uint64 array aligned with orders_pd
+    """
+    try:
+        columns = SameRuleColumns[same_rule]
+    except KeyError:
+        raise TypeError('same_rule type is {}!!'.format(same_rule))
+    if orders_pd.empty:
+        return np.array([], dtype=np.uint64)
+    # dtypes are normalized so that equal orders of different runs hash equally
+    frame = pd.DataFrame({col: orders_pd[col].astype(float) if col.endswith('price')
+                          else orders_pd[col].astype(str) for col in columns})
+    return pd.util.hash_pandas_object(frame, index=False).values
+
+
+def order_metrics(orders_pd):
+    """
+    交易结果的胜率和盈亏 --- profit (sell_price - buy_price) * amount , profit_cg (sell_price / buy_price - 1)
+    , 已有profit / profit_cg列时直接使用, 未卖出的order不计入
+    """
+    if 'sell_price' in orders_pd.columns:
+        orders_pd = orders_pd[orders_pd['sell_price'].notna()]
+    if orders_pd.empty:
+        return {'win_rate': np.nan, 'gains_mean': np.nan, 'losses_mean': np.nan,
+                'sum_profit': 0.0, 'sum_profit_cg': 0.0}
+    if 'profit_cg' in orders_pd.columns:
+        profit_cg = orders_pd['profit_cg'].astype(float)
+    else:
+        profit_cg = orders_pd['sell_price'] / orders_pd['buy_price'] - 1
+    if 'profit' in orders_pd.columns:
+        profit = orders_pd['profit'].astype(float)
+    else:
+        profit = orders_pd['sell_price'] - orders_pd['buy_price']
+        if 'amount' in orders_pd.columns:
+            profit = profit * orders_pd['amount']
+    gains, losses = profit_cg[profit_cg > 0], profit_cg[profit_cg < 0]
+    return {
+        'win_rate': len(gains) / len(profit_cg),
+        'gains_mean': gains.mean() if len(gains) else np.nan,
+        'losses_mean': losses.mean() if len(losses) else np.nan,
+        'sum_profit': profit.sum(),
+        'sum_profit_cg': profit_cg.sum()
+    }
+
+
 class TradeSimilarity(object):
     """
         计算交易策略的相关性思路：研究不同交易策略的对应的订单集合
@@ -25,7 +98,7 @@ class TradeSimilarity(object):
                 lt = order1 < order2 # order1唯一的交易数量是否小于order2
     """
 
-    def __init__(self, orders_pd, same_rule):
+    def __init__(self, orders_pd, same_rule=EOrderSameRule.ORDER_SAME_BSPD):
         """
         初始化函数需要pd.DataFrame对象，暂时未做类型检测
         :param orders_pd: 回测结果生成的交易订单构成的pd.DataFrame对象
@@ -36,13 +109,28 @@ class TradeSimilarity(object):
         self.orders_pd = orders_pd.copy()
         self.same_rule = same_rule
         # 并集, 交集, 差集运算结果存储
+        self.op = None
         self.op_result = None
         self.last_op_metrics = {}
+        self._keys = None
+
+    @property
+    def keys(self):
+        """order hash key (see order_keys) , 延迟计算并缓存"""
+        if self._keys is None:
+            self._keys = order_keys(self.orders_pd, self.same_rule)
+        return self._keys
+
+    def _other_keys(self, other):
+        if isinstance(other, TradeSimilarity) and other.same_rule == self.same_rule:
+            return other.keys, other.orders_pd
+        orders_pd = other.orders_pd if isinstance(other, TradeSimilarity) else other
+        return order_keys(orders_pd, self.same_rule), orders_pd
 
     @contextmanager
     def proxy_work(self, orders_pd):
         """
-        传人需要比较的orders_pd，构造ABuOrderPdProxy对象，返回使用者，
+        传人需要比较的orders_pd，构造TradeSimilarity对象，返回使用者，
         对op_result进行统一分析
         :param orders_pd: 回测结果生成的交易订单构成的pd.DataFrame对象
         :return:
@@ -53,36 +141,70 @@ class TradeSimilarity(object):
                 self.last_op_metrics['sum_profit_cg'] = self.op_result['profit_cg'].sum()
         """
         # 运算集结果重置
+        self.op = None
+        self.op_result = None
+        self.last_op_metrics = {}
+        other = TradeSimilarity(orders_pd, self.same_rule)
+        yield self, other
+        # 最后一次运算的结果(两个对象中任意一个执行的运算)
+        proxy = self if self.op_result is not None or other.op_result is None else other
+        if proxy.op_result is not None:
+            self.op = proxy.op
+            self.op_result = proxy.op_result
+            self.last_op_metrics = order_metrics(self.op_result)
 
     def __and__(self, other):
         """ & 操作符的重载，计算两个交易集的交集"""
-        # self.op = 'intersection(order1 & order2)'
+        self.op = 'intersection(order1 & order2)'
+        other_keys, _ = self._other_keys(other)
+        self.op_result = self.orders_pd[np.isin(self.keys, other_keys)]
+        return self.op_result
 
     def __or__(self, other):
         """ | 操作符的重载，计算两个交易集的并集"""
-        # self.op = 'union(order1 | order2)'
+        self.op = 'union(order1 | order2)'
+        other_keys, other_pd = self._other_keys(other)
+        self.op_result = pd.concat([self.orders_pd, other_pd[~np.isin(other_keys, self.keys)]])
+        return self.op_result
 
     def __sub__(self, other):
         """ - 操作符的重载，计算两个交易集的差集"""
+        self.op = 'difference(order1 - order2)'
+        other_keys, _ = self._other_keys(other)
+        self.op_result = self.orders_pd[~np.isin(self.keys, other_keys)]
+        return self.op_result
 
     def __eq__(self, other):
         """ == 操作符的重载，计算两个交易集的是否相同"""
+        other_keys, _ = self._other_keys(other)
+        return np.array_equal(np.unique(self.keys), np.unique(other_keys))
+
+    def _sizes(self, other):
+        """唯一的交易数量 --- (self , other)"""
+        other_keys, _ = self._other_keys(other)
+        return np.unique(self.keys).size, np.unique(other_keys).size
 
     def __gt__(self, other):
-        """ > 操作符的重载，计算两个交易集的大小, 类被total_ordering装饰，可以支持lt等操作符"""
+        """ > 操作符的重载，比较两个交易集唯一的交易数量"""
+        size, other_size = self._sizes(other)
+        return size > other_size
 
+    def __ge__(self, other):
+        """ >= 操作符的重载，比较两个交易集唯一的交易数量"""
+        size, other_size = self._sizes(other)
+        return size >= other_size
 
-class EOrderSameRule(Enum):
-    """对order_pd中对order判断为是否相同使用的规则"""
+    def __lt__(self, other):
+        """ < 操作符的重载，比较两个交易集唯一的交易数量"""
+        size, other_size = self._sizes(other)
+        return size < other_size
 
-    """order有相同的symbol和买入日期就认为是相同"""
-    ORDER_SAME_BD = 0
-    """order有相同的symbol, 买入日期，和卖出日期，即不考虑价格，只要日期相同就相同"""
-    ORDER_SAME_BSD = 1
-    """order有相同的symbol, 买入日期，相同的买入价格，即单子买入时刻都相同"""
-    ORDER_SAME_BDP = 2
-    """order有相同的symbol, 买入日期, 买入价格, 并且相同的卖出日期和价格才认为是相同，即买入卖出时刻都相同"""
-    ORDER_SAME_BSPD = 3
+    def __le__(self, other):
+        """ <= 操作符的重载，比较两个交易集唯一的交易数量"""
+        size, other_size = self._sizes(other)
+        return size <= other_size
+
+    __hash__ = None
 
 
 def _same_pd(order, other_orders_pd, same_rule):
@@ -94,30 +216,13 @@ def _same_pd(order, other_orders_pd, same_rule):
     :param same_rule: order判断为是否相同使用的规则
     :return: 从orders_pd和other_orders_pd中返回相同的df
     """
-    symbol = order.symbol
-    buy_day = order['buy_date']
-    buy_price = order['buy_price']
-
-    sell_day = order['sell_date']
-    sell_price = order['sell_price']
-
-    if same_rule == EOrderSameRule.ORDER_SAME_BD:
-        # 只根据买入时间和买入symbol确定是否相同，即认为在相同的交易日买入相同的股票，两笔交易就一样，忽略其它所有order中的因素
-        same_pd = other_orders_pd[(other_orders_pd['symbol'] == symbol) & (other_orders_pd['buy_date'] == buy_day)]
-    elif same_rule == EOrderSameRule.ORDER_SAME_BSD:
-        # 根据买入时间，卖出时间和买入symbol确定是否相同
-        same_pd = other_orders_pd[(other_orders_pd['symbol'] == symbol) & (other_orders_pd['buy_date'] == buy_day)
-                                  & (other_orders_pd['sell_date'] == sell_day)]
-    elif same_rule == EOrderSameRule.ORDER_SAME_BDP:
-        # 根据买入时间，买入价格和买入symbol确定是否相同
-        same_pd = other_orders_pd[(other_orders_pd['symbol'] == symbol) & (other_orders_pd['buy_date'] == buy_day)
-                                  & (other_orders_pd['buy_price'] == buy_price)]
-    elif same_rule == EOrderSameRule.ORDER_SAME_BSPD:
-        # 根据买入时间，卖出时间, 买入价格和卖出价格和买入symbol确定是否相同
-        same_pd = other_orders_pd[(other_orders_pd['symbol'] == symbol) & (other_orders_pd['buy_date'] == buy_day)
-                                  & (other_orders_pd['sell_date'] == sell_day)
-                                  & (other_orders_pd['buy_price'] == buy_price)
-                                  & (other_orders_pd['sell_price'] == sell_price)]
-    else:
-        raise TypeError('same_rule type is {}!!'.format(same_rule))
-    return same_pd
+    key = order_keys(order.to_frame().T, same_rule)
+    return other_orders_pd[np.isin(order_keys(other_orders_pd, same_rule), key)]
+
+
+__all__ = [
+    'TradeSimilarity',
+    'EOrderSameRule',
+    'order_keys',
+    'order_metrics'
+]
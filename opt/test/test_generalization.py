@@ -0,0 +1,101 @@
+"""
+Walk forward validation of Generalize with a stub backtest.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    from gateway.driver.data_portal import portal
+    from opt.generalization import Generalize
+except ImportError as e:
+    pytest.skip('generalization is not importable : %s' % e, allow_module_level=True)
+
+from util.cache import DiskStore, ResultCache
+
+Sessions = list(pd.bdate_range('2020-01-01', periods=30).strftime('%Y-%m-%d'))
+
+
+def evaluate(params, sessions):
+    """
+        daily returns of drift , trend params gain more in January and lose afterwards
+    """
+    index = pd.Index(sessions)
+    sign = np.where(index < '2020-02-01', 1.5, -3.0) if params['trend'] else 1.0
+    return pd.Series(params['drift'] * sign, index=index)
+
+
+def evaluate_cached(params, sessions):
+    """
+        market data of params and sessions are loaded through the result cache of portal
+    """
+    window = portal.result_cache.fetch('window', lambda: evaluate(params, sessions),
+                                       params=params, sessions=sessions)
+    return {'stats': pd.DataFrame({'returns': window})}
+
+
+def failing(params, sessions):
+    if params['drift'] > 0.002:
+        raise RuntimeError('backtest failed')
+    return evaluate(params, sessions)
+
+
+def total_return(returns):
+    return float(returns.sum())
+
+
+Grid = {'drift': [0.001, 0.003], 'trend': [False, True]}
+
+
+def test_split_rolling_and_anchored():
+    rolling = Generalize(evaluate, Grid, train_size=10, test_size=5).split(Sessions)
+    assert len(rolling) == 4
+    for loc, (train, test) in enumerate(rolling):
+        assert train == Sessions[loc * 5: loc * 5 + 10]
+        assert test == Sessions[loc * 5 + 10: loc * 5 + 15]
+
+    anchored = Generalize(evaluate, Grid, train_size=10, test_size=5, anchored=True).split(Sessions)
+    assert [test for _, test in anchored] == [test for _, test in rolling]
+    for loc, (train, _) in enumerate(anchored):
+        assert train == Sessions[: loc * 5 + 10]
+
+    with pytest.raises(ValueError):
+        Generalize(evaluate, Grid, train_size=25, test_size=10).split(Sessions)
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_best_params_and_stitched_returns(n_jobs):
+    result = Generalize(evaluate, Grid, train_size=10, test_size=5,
+                        objective=total_return, n_jobs=n_jobs).run(Sessions)
+    folds = result['folds']
+    # trend params lead while train folds are in January , the last one ends in February
+    assert list(folds['params']) == [{'drift': 0.003, 'trend': True}] * 3 + [{'drift': 0.003, 'trend': False}]
+    assert np.allclose(folds['is_score'], [0.045, 0.045, 0.045, 0.03])
+
+    returns = result['returns']
+    assert list(returns.index) == Sessions[10:]
+    expected = pd.concat([evaluate(params, Sessions[10 + 5 * loc: 15 + 5 * loc])
+                          for loc, params in enumerate(folds['params'])])
+    pd.testing.assert_series_equal(returns, expected)
+    pd.testing.assert_series_equal(result['equity'], (1 + expected).cumprod())
+    assert np.allclose(folds['oos_score'], [returns.iloc[5 * loc: 5 * loc + 5].sum() for loc in range(4)])
+
+
+def test_worker_results_are_shared_through_cache(tmp_path):
+    cache = ResultCache(DiskStore(str(tmp_path)), version='test')
+    generalize = Generalize(evaluate_cached, Grid, train_size=10, test_size=5,
+                            objective=total_return, n_jobs=2, cache=cache)
+    generalize.run(Sessions)
+    assert portal.result_cache is None
+    # windows of params evaluated in workers are visible to the main process
+    for train, _ in generalize.split(Sessions):
+        for params in generalize.grid[1:]:
+            pd.testing.assert_series_equal(cache.get('window', params=params, sessions=train),
+                                           evaluate(params, train))
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_failed_backtest_raises(n_jobs):
+    with pytest.raises(RuntimeError):
+        Generalize(failing, Grid, train_size=10, test_size=5,
+                   objective=total_return, n_jobs=n_jobs).run(Sessions)
@@ -0,0 +1,63 @@
+"""
+TradeSimilarity set algebra and ordering on hashed order keys.
+"""
+import numpy as np
+import pandas as pd
+
+from opt.similarity import EOrderSameRule, TradeSimilarity, order_keys
+
+
+def orders(symbols, buy_dates, buy_price=10.0, sell_price=11.0):
+    return pd.DataFrame({
+        'symbol': symbols,
+        'buy_date': buy_dates,
+        'sell_date': ['2020-02-03'] * len(symbols),
+        'buy_price': [buy_price] * len(symbols),
+        'sell_price': [sell_price] * len(symbols),
+    })
+
+
+def test_order_keys_follow_same_rule():
+    left = orders(['600000', '600000'], ['2020-01-02', '2020-01-02'], buy_price=10.0)
+    right = orders(['600000'], ['2020-01-02'], buy_price=10.5)
+    bd = EOrderSameRule.ORDER_SAME_BD
+    bspd = EOrderSameRule.ORDER_SAME_BSPD
+    assert order_keys(left, bd)[0] == order_keys(left, bd)[1]
+    assert order_keys(left, bd)[0] == order_keys(right, bd)[0]
+    assert order_keys(left, bspd)[0] != order_keys(right, bspd)[0]
+
+
+def test_set_operations_and_metrics():
+    first = orders(['600000', '000001', '000002'], ['2020-01-02'] * 3)
+    second = orders(['000001', '000002', '300750'], ['2020-01-02'] * 3)
+    order1, order2 = TradeSimilarity(first), TradeSimilarity(second)
+    assert list((order1 & order2)['symbol']) == ['000001', '000002']
+    assert list((order1 | order2)['symbol']) == ['600000', '000001', '000002', '300750']
+    assert list((order1 - order2)['symbol']) == ['600000']
+    assert list((order2 - order1)['symbol']) == ['300750']
+
+    with TradeSimilarity(first).proxy_work(second) as (order1, order2):
+        order2 - order1
+    assert order1.op == 'difference(order1 - order2)'
+    assert list(order1.op_result['symbol']) == ['300750']
+    assert order1.last_op_metrics['win_rate'] == 1.0
+    assert np.isclose(order1.last_op_metrics['sum_profit_cg'], 0.1)
+
+
+def test_ordering_of_disjoint_equal_sized_sets():
+    first = TradeSimilarity(orders(['600000', '000001'], ['2020-01-02'] * 2))
+    second = TradeSimilarity(orders(['000002', '300750'], ['2020-01-02'] * 2))
+    assert not first == second
+    assert not first < second and not second < first
+    assert not first > second and not second > first
+    assert first <= second and second <= first
+    assert first >= second and second >= first
+
+
+def test_ordering_counts_unique_trades():
+    # duplicated order counts once
+    first = TradeSimilarity(orders(['600000', '600000', '000001'], ['2020-01-02'] * 3))
+    second = TradeSimilarity(orders(['600000', '000001', '000002'], ['2020-01-02'] * 3))
+    assert first < second and second > first
+    assert not first >= second
+    assert first == TradeSimilarity(orders(['000001', '600000'], ['2020-01-02'] * 2))
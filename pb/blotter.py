@@ -8,8 +8,9 @@ Created on Tue Mar 12 15:37:47 2019
 import numpy as np
 from gateway.driver.data_portal import portal
 from finance.order import Order, PriceOrder, TickerOrder, transfer_to_order
-from finance.transaction import create_transaction
+from finance.transaction import create_transactions
 from util.dt_utilty import locate_pos
+from util.profiling import logger, tracer
 
 
 class SimulationBlotter(object):
@@ -33,35 +34,16 @@ class SimulationBlotter(object):
         self.slippage = slippage_model
         self.execution = execution_model
 
-    def _trigger_check(self, order, dts):
-        """
-            trigger orders checked by execution_style and slippage_style
-        """
-        if order:
-            assert isinstance(order, Order), 'unsolved order type'
-            asset = order.asset
-            price = order.price
-            # 基于订单的设置的上下线过滤订单
-            upper = 1 + self.execution.get_limit_ratio(asset, dts)
-            bottom = 1 - self.execution.get_stop_ratio(asset, dts)
-            # avoid asset price reach price restriction
-            if bottom < price < upper:
-                # 计算滑价系数
-                slippage = self.slippage.calculate_slippage_factor(asset, dts)
-                # print('slippage', self.slippage.basis_points)
-                # print('commission', self.commission.base_cost)
-                order.price = price * (1+slippage)
-                return order
-            return False
-        else:
-            return False
-
     def _validate(self, order, dts):
         # fulfill the missing attr of PriceOrder and TickerOrder
         asset = order.asset
         price = order.price
         direction = np.sign(order.amount)
-        minutes = portal.get_spot_value(dts, asset, 'minute', ['close'])
+        context = portal.get_session_context(dts)
+        if context is not None:
+            minutes = context.get_minutes(asset, ['close'])
+        else:
+            minutes = portal.get_spot_value(dts, asset, 'minute', ['close'])
         # print('minutes price', minutes)
         if isinstance(order, PriceOrder):
             # print('blotter order', order)
@@ -78,21 +60,59 @@ class SimulationBlotter(object):
             new_order = order
         else:
             raise ValueError
-        trigger_order = self._trigger_check(new_order, dts)
-        # print('trigger_order', trigger_order)
-        return trigger_order
+        return new_order
+
+    def _trigger_check(self, orders, dts):
+        """
+            trigger orders checked by execution_style and slippage_style in one batch
+        :return: triggered orders with slippage price , costs of orders
+        """
+        assets = [order.asset for order in orders]
+        prices = np.array([order.price for order in orders], dtype=float)
+        # 基于订单的设置的上下线过滤订单 , avoid asset price reach price restriction
+        mask = self.execution.trigger_mask(assets, prices, dts)
+        triggered = [order for order, flag in zip(orders, mask) if flag]
+        if not triggered:
+            return [], np.array([])
+        assets = [order.asset for order in triggered]
+        # 计算滑价系数
+        slippage = self.slippage.calculate_slippage_factors(assets, dts)
+        prices = prices[mask] * (1 + slippage)
+        for order, price in zip(triggered, prices):
+            order.price = price
+        costs = self.commission.calculate_costs([asset.sid for asset in assets],
+                                                prices,
+                                                np.array([order.amount for order in triggered]),
+                                                [order.created_dt for order in triggered])
+        return triggered, costs
 
     def create_bulk_transactions(self, orders, dts):
+        tracer.count('blotter.orders', len(orders))
         try:
-            trigger_orders = [self._validate(order, dts) for order in orders]
-            trigger_orders = [order for order in trigger_orders if order]
-            print('trigger_orders', trigger_orders)
-            # create txn
-            transactions = [create_transaction(order_obj, self.commission) for order_obj in trigger_orders]
+            with tracer.span('blotter.create_bulk_transactions'):
+                new_orders = [self._validate(order, dts) for order in orders]
+                new_orders = [order for order in new_orders if order]
+                trigger_orders, costs = self._trigger_check(new_orders, dts) if new_orders else ([], [])
+                logger.debug('trigger_orders %s', trigger_orders)
+                # create txn
+                transactions = create_transactions(trigger_orders, costs)
         except IndexError:
-            print('orders either null or can not be triggered')
+            logger.debug('orders either null or can not be triggered')
             transactions = []
+        tracer.count('blotter.transactions', len(transactions))
         return transactions
 
+    def create_minute_transactions(self, orders, dts):
+        """
+            minute mode --- orders already priced by the bar of their minute skip _validate
+        :return: triggered orders , transactions of triggered orders
+        """
+        tracer.count('blotter.orders', len(orders))
+        with tracer.span('blotter.create_minute_transactions'):
+            trigger_orders, costs = self._trigger_check(orders, dts) if orders else ([], [])
+            transactions = create_transactions(trigger_orders, costs)
+        tracer.count('blotter.transactions', len(transactions))
+        return trigger_orders, transactions
+
 
 __all__ = ['SimulationBlotter']
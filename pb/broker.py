@@ -5,6 +5,11 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
+import numpy as np, pandas as pd
+from gateway.driver.data_portal import portal
+from finance.order import Order, PriceOrder
+from gateway.driver.session_context import SessionContext
+from util.profiling import logger, tracer
 
 
 class Broker(object):
@@ -30,13 +35,22 @@ class Broker(object):
         self.engine = engine
         self.generator = generator
         self.capital_model = allocation_model
+        # minute mode --- orders of session sorted by created_dt , matched minute by minute
+        self._pending = []
+        self._pending_dts = np.array([], dtype='int64')
+        self._cursor = 0
+        # due orders without a bar (or not reaching their price) wait for the next minute
+        self._waiting = []
+        # id(short order) -> asset of dual ; (due minute , asset , capital) of long legs
+        self._duals = dict()
+        self._legs = []
 
     def implement_capital(self, positives, capital, portfolio, dts):
         """基于资金买入对应仓位"""
         txn_mappings = dict()
         if positives:
             allocation = self.capital_model.compute(positives, capital, dts)
-            print('allocation', allocation)
+            logger.debug('allocation %s', allocation)
             for asset, available in allocation.items():
                 txn_mappings[asset] = self.generator.yield_capital(asset, available, portfolio, dts)
                 # print('txn_mappings', txn_mappings)
@@ -72,23 +86,150 @@ class Broker(object):
                 for k, v in txn_mappings.items():
                     ledger.process_transaction(v)
 
-    def implement_broke(self, ledger, dts):
+    def _create_transactions(self, ledger, dts):
         """建立执行计划"""
         capital = ledger.portfolio.portfolio_cash
-        positives, negatives, duals = self.engine.execute_algorithm(ledger, dts)
-        print('engine output positives, negatives, dual :', positives, negatives, duals)
+        # market data of session shared by engine , allocation , division , blotter and ledger
+        portal.enter_session(SessionContext(dts, ledger.positions))
+        with tracer.span('engine.execute_algorithm'):
+            positives, negatives, duals = self.engine.execute_algorithm(ledger, dts)
+        logger.debug('engine output positives %s, negatives %s, dual %s', positives, negatives, duals)
         portfolio = ledger.portfolio
         # 直接买入
-        call_transactions = self.implement_capital(positives, capital, portfolio, dts)
-        print('call_transactions', call_transactions)
+        with tracer.span('broker.implement_capital'):
+            call_transactions = self.implement_capital(positives, capital, portfolio, dts)
+        logger.debug('call_transactions %s', call_transactions)
         # 直接卖出
-        put_transactions = self.implement_position(negatives, portfolio, dts)
-        print('put_transactions', put_transactions)
+        with tracer.span('broker.implement_position'):
+            put_transactions = self.implement_position(negatives, portfolio, dts)
+        logger.debug('put_transactions %s', put_transactions)
         # 卖出 --- 买入
-        dual_transactions = self.implement_duals(duals, portfolio, dts)
-        print('dual_transactions', dual_transactions)
+        with tracer.span('broker.implement_duals'):
+            dual_transactions = self.implement_duals(duals, portfolio, dts)
+        logger.debug('dual_transactions %s', dual_transactions)
+        return [call_transactions, put_transactions, dual_transactions]
+
+    def implement_broke(self, ledger, dts):
+        """建立执行计划"""
+        iterable = self._create_transactions(ledger, dts)
         # portfolio的资金使用效率评估引擎撮合的的效率 --- 并行执行成交
-        self.multi_broking(ledger, [call_transactions, put_transactions, dual_transactions])
+        with tracer.span('ledger.process_transaction'):
+            self.multi_broking(ledger, iterable)
+
+    def _create_orders(self, ledger, dts):
+        """
+            minute mode --- orders of session , matched later against the bar of each minute
+        """
+        capital = ledger.portfolio.portfolio_cash
+        portal.enter_session(SessionContext(dts, ledger.positions))
+        with tracer.span('engine.execute_algorithm'):
+            positives, negatives, duals = self.engine.execute_algorithm(ledger, dts)
+        logger.debug('engine output positives %s, negatives %s, dual %s', positives, negatives, duals)
+        portfolio = ledger.portfolio
+        orders = []
+        if positives:
+            allocation = self.capital_model.compute(positives, capital, dts)
+            logger.debug('allocation %s', allocation)
+            for asset, available in allocation.items():
+                orders.extend(self.generator.capital_orders(asset, available, portfolio, dts))
+        for p in negatives or []:
+            orders.extend(self.generator.position_orders(p, portfolio, dts))
+        for p, asset in duals or []:
+            # long leg is created once the short leg is filled
+            short_orders = self.generator.position_orders(p, portfolio, dts)
+            self._duals.update((id(order), asset) for order in short_orders)
+            orders.extend(short_orders)
+        return orders
 
+    def schedule_broke(self, ledger, dts):
+        """
+            minute mode --- create orders of session at session start , orders are matched
+            against the bar of each minute from their created_dt on (process_minute)
+        """
+        orders = self._create_orders(ledger, dts)
+        # price orders without created_dt are due from the open
+        created = [pd.Timestamp(order.created_dt if order.created_dt is not None else dts).value
+                   for order in orders]
+        loc = np.argsort(created, kind='stable')
+        self._pending = [orders[i] for i in loc]
+        self._pending_dts = np.array(created, dtype='int64')[loc]
+        self._cursor = 0
+
+    def _match(self, orders, bars, dt):
+        """
+            price due orders by the bar of dt --- ticker orders fill at close , price orders
+            fill at their price once the bar reaches it ; the others wait
+        :return: filled orders , waiting orders
+        """
+        filled, waiting = [], []
+        for order in orders:
+            bar = bars.loc[order.asset.sid]
+            if np.isnan(bar['close']):
+                waiting.append(order)
+            elif isinstance(order, PriceOrder):
+                reached = bar['low'] <= order.price if order.amount > 0 else bar['high'] >= order.price
+                if reached:
+                    filled.append((order, Order(order.asset, order.price, order.amount, dt)))
+                else:
+                    waiting.append(order)
+            else:
+                filled.append((order, Order(order.asset, bar['close'], order.amount, dt)))
+        return filled, waiting
+
+    def process_minute(self, ledger, dt):
+        """
+            match pending orders created on or before dt against the bar of dt and process
+            their transactions in one batch
+        """
+        dt = pd.Timestamp(dt)
+        end = np.searchsorted(self._pending_dts, dt.value, side='right')
+        due = self._waiting + self._pending[self._cursor: end]
+        self._cursor = end
+        legs = [leg for leg in self._legs if leg[0] <= dt.value]
+        if not due and not legs:
+            return
+        proxy = {order.asset.sid: order.asset for order in due}
+        proxy.update((asset.sid, asset) for _, asset, _ in legs)
+        assets = list(proxy.values())
+        bars = portal.get_minute_bars(assets, dt, ['high', 'low', 'close'])
+        filled, self._waiting = self._match(due, bars, dt)
+        self._legs = [leg for leg in self._legs if leg[0] > dt.value]
+        for leg in legs:
+            price = bars.loc[leg[1].sid, 'close']
+            if np.isnan(price):
+                self._legs.append(leg)
+                continue
+            order = self.generator.interactive_order(leg[1], leg[2], price, dt)
+            if order is not None:
+                filled.append((None, order))
+        if not filled:
+            return
+        session = dt.strftime('%Y-%m-%d')
+        sources = {id(order): source for source, order in filled}
+        triggered, transactions = self.generator.blotter.create_minute_transactions(
+            [order for _, order in filled], session)
+        if transactions:
+            ledger.process_transaction(transactions)
+        delay = pd.Timedelta(minutes=int(self.generator.delay or 0)).value
+        for order, txn in zip(triggered, transactions):
+            source = sources[id(order)]
+            asset = self._duals.pop(id(source), None) if source is not None else None
+            if asset is not None:
+                self._legs.append((dt.value + delay, asset, abs(txn.amount) * txn.price))
+
+    def flush_pending(self, ledger):
+        """
+            session end --- orders not filled until the close (e.g. circuit breaker , no bar or
+            price not reached) expire as in the daily mode
+        """
+        expired = len(self._waiting) + len(self._pending) - self._cursor + len(self._legs)
+        if expired:
+            logger.debug('%d orders expired at session end', expired)
+        self._pending = []
+        self._pending_dts = np.array([], dtype='int64')
+        self._cursor = 0
+        self._waiting = []
+        self._duals = dict()
+        self._legs = []
 
 __all__ = ['Broker']
@@ -9,6 +9,7 @@ import numpy as np, copy
 from gateway.driver.data_portal import portal
 from finance.order import PriceOrder, TickerOrder
 from finance.control import UnionControl
+from util.profiling import logger
 
 
 class Division(object):
@@ -23,8 +24,13 @@ class Division(object):
 
     def _calculate_division_data(self, asset, dts, amount_only=False):
         tick_size = asset.tick_size
-        open_change, pre_close = portal.get_open_pct(asset, dts)
-        ensure_price = pre_close * (1 + asset.restricted_change(dts))
+        context = portal.get_session_context(dts)
+        if context is not None:
+            open_change, pre_close = context.get_open_pct(asset)
+            ensure_price, _ = context.get_limit_prices(asset)
+        else:
+            open_change, pre_close = portal.get_open_pct(asset, dts)
+            ensure_price = pre_close * (1 + asset.restricted_change(dts))
         # ensure amount at least 1 , base_amount(单位股数）
         # base_amount = max(tick_size, np.ceil(self.base_capital / ensure_price))
         base_amount = tick_size if tick_size * ensure_price >= self.base_capital else \
@@ -100,12 +106,12 @@ class Division(object):
         asset = position.asset
         amount = - copy.copy(position.amount)
         per_amount = self._calculate_division_data(asset, dts, amount_only=True)
-        print('position per amount', per_amount)
+        logger.debug('position per amount %s', per_amount)
         control_amount = self.trade_controls.validate(asset, amount, portfolio, dts)
-        print('position control_amount', control_amount)
+        logger.debug('position control_amount %s', control_amount)
         iterables = self.underneath_func.create_iterables(asset, control_amount, per_amount, dts)
         position_orders = self._simulate_iterator(asset, iterables)
-        print('position_orders', position_orders)
+        logger.debug('position_orders %s', position_orders)
         return position_orders
 
 
@@ -8,6 +8,7 @@ Created on Tue Mar 12 15:37:47 2019
 import numpy as np, pandas as pd
 from gateway.driver.data_portal import portal
 from finance.order import Order
+from util.profiling import logger
 
 
 class Generator(object):
@@ -22,15 +23,30 @@ class Generator(object):
         self.blotter = blotter
         self.division_model = division_model
 
+    def capital_orders(self, asset, capital, portfolio, dts):
+        return self.division_model.divided_by_capital(asset, capital, portfolio, dts)
+
+    def position_orders(self, position, portfolio, dts):
+        return self.division_model.divided_by_position(position, portfolio, dts)
+
+    def interactive_order(self, asset, capital, price, dt):
+        """
+            minute mode --- long leg of dual on the minute dt , amount bought by the capital of
+            the filled short leg at the price of the minute
+        """
+        tick_size = asset.tick_size
+        amount = tick_size * np.floor(capital / price / tick_size)
+        return Order(asset, price, amount, dt) if amount >= tick_size else None
+
     def yield_capital(self, asset, capital, portfolio, dts):
-        capital_orders = self.division_model.divided_by_capital(asset, capital, portfolio, dts)
+        capital_orders = self.capital_orders(asset, capital, portfolio, dts)
         # print('generator capital_orders', capital_orders)
         capital_transactions = self.blotter.create_bulk_transactions(capital_orders, dts)
         # print('capital_transactions', capital_transactions)
         return capital_transactions
 
     def yield_position(self, position, portfolio, dts):
-        holding_orders = self.division_model.divided_by_position(position, portfolio, dts)
+        holding_orders = self.position_orders(position, portfolio, dts)
         # print('holding_orders', holding_orders)
         holding_transactions = self.blotter.create_bulk_transactions(holding_orders, dts)
         # print('holding_transactions', holding_transactions)
@@ -62,7 +78,7 @@ class Generator(object):
         short_transactions = self.yield_position(position, portfolio, dts)
         # 按照时间去排序
         short_transactions = sorted(short_transactions, key=lambda x: x.created_dt)
-        print('dual sorted short_transactions', short_transactions)
+        logger.debug('dual sorted short_transactions %s', short_transactions)
         short_prices = np.array([txn.price for txn in short_transactions])
         # 由于position transaction (amount 为负）
         short_amount = np.array([abs(txn.amount) for txn in short_transactions])
@@ -70,19 +86,23 @@ class Generator(object):
         tickers = [pd.Timedelta(minutes=int(self.delay)) + txn.created_dt for txn in short_transactions]
         tickers = [ticker for ticker in tickers if ticker.hour < 15]
         # 根据ticker价格比值
-        minutes = portal.get_spot_value(dts, asset, 'minute', ['close'])
+        context = portal.get_session_context(dts)
+        if context is not None:
+            minutes = context.get_minutes(asset, ['close'])
+        else:
+            minutes = portal.get_spot_value(dts, asset, 'minute', ['close'])
         ticker_prices = np.array([minutes['close'][ticker] for ticker in tickers])
         # 模拟买入订单数量
         tick_size = asset.tick_size
         ratio = short_prices[:len(tickers)] / ticker_prices
         ratio_amount = ratio * short_amount[:len(tickers)]
         ticker_amount = [tick_size * np.floor(amount / tick_size) for amount in ratio_amount]
-        print('ticker_amount', ticker_amount)
+        logger.debug('ticker_amount %s', ticker_amount)
         # 生成对应的买入订单
         orders = [Order(asset, *args) for args in zip(ticker_prices, ticker_amount, tickers)]
-        print('dual orders', orders)
+        logger.debug('dual orders %s', orders)
         long_transactions = self.blotter.create_bulk_transactions(orders, dts)
-        print('dual long_transactions', long_transactions)
+        logger.debug('dual long_transactions %s', long_transactions)
         return short_transactions, long_transactions
 
 
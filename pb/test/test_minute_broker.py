@@ -0,0 +1,223 @@
+"""
+Minute mode of Broker (schedule_broke / process_minute / flush_pending) and
+SimulationBlotter.create_minute_transactions against a fake minute reader.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    import pb.broker as broker_module
+    from pb.blotter import SimulationBlotter
+    from pb.generator import Generator
+    from finance.order import Order, PriceOrder, TickerOrder
+except ImportError as e:
+    pytest.skip('broker is not importable : %s' % e, allow_module_level=True)
+
+from gateway.driver.aggregator import DailyHistoryAggregator
+
+Session = '2020-01-02'
+
+Minutes = pd.date_range(Session + ' 09:31', Session + ' 09:40', freq='min')
+
+A = SimpleNamespace(sid='600000', tick_size=100)
+B = SimpleNamespace(sid='000001', tick_size=100)
+
+
+def minute(hhmm):
+    return pd.Timestamp('%s %s' % (Session, hhmm))
+
+
+def bars(closes):
+    closes = np.round(np.asarray(closes, dtype=float), 2)
+    index = pd.date_range(Session + ' 09:31', periods=len(closes), freq='min')
+    return pd.DataFrame({'open': closes, 'high': closes + 0.1, 'low': closes - 0.1, 'close': closes,
+                         'volume': 1000.0, 'amount': closes * 1000}, index=index)
+
+
+class FakeMinuteReader(object):
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def get_spot_value(self, dt, asset, fields):
+        return self.frames[asset.sid].loc[:, fields]
+
+
+class FakePortal(object):
+    """
+        minute bars of portal served by DailyHistoryAggregator over the fake reader
+    """
+    def __init__(self, frames):
+        self._aggregator = DailyHistoryAggregator(FakeMinuteReader(frames))
+
+    def enter_session(self, context):
+        pass
+
+    def get_minute_bars(self, assets, dt, fields):
+        return self._aggregator.minute_bars(assets, dt, fields)
+
+
+class FakeEngine(object):
+
+    def __init__(self, negatives=None, duals=None):
+        self.outputs = ([], negatives or [], duals or [])
+
+    def execute_algorithm(self, ledger, dts):
+        return self.outputs
+
+
+class FakeDivision(object):
+    """
+        orders of positions are given up front
+    """
+    def __init__(self, orders):
+        self.orders = orders
+
+    def divided_by_position(self, position, portfolio, dts):
+        return self.orders[position.asset.sid]
+
+
+class FakeLedger(object):
+
+    def __init__(self):
+        self.portfolio = SimpleNamespace(portfolio_cash=1e6)
+        self.positions = dict()
+        self.transactions = []
+
+    def process_transaction(self, transactions):
+        self.transactions.extend(transactions)
+
+
+class AllTriggered(object):
+
+    def __init__(self, rejected=()):
+        self.rejected = rejected
+
+    def trigger_mask(self, assets, prices, dts):
+        return np.array([asset.sid not in self.rejected for asset in assets])
+
+
+class FixedSlippage(object):
+
+    def __init__(self, factor=0.0):
+        self.factor = factor
+
+    def calculate_slippage_factors(self, assets, dts):
+        return np.full(len(assets), self.factor)
+
+
+class RateCommission(object):
+
+    def calculate_costs(self, sids, prices, amounts, dts):
+        return np.abs(prices * amounts) * 0.001
+
+
+def make_broker(monkeypatch, frames, orders, negatives=None, duals=None, delay=0, rejected=()):
+    monkeypatch.setattr(broker_module, 'portal', FakePortal(frames))
+    blotter = SimulationBlotter(RateCommission(), FixedSlippage(), AllTriggered(rejected))
+    generator = Generator(delay, blotter, FakeDivision(orders))
+    broker = broker_module.Broker(FakeEngine(negatives, duals), generator, None)
+    ledger = FakeLedger()
+    broker.schedule_broke(ledger, Session)
+    return broker, ledger
+
+
+def run_minutes(broker, ledger, minutes=Minutes):
+    """
+    :return: transactions processed on each minute
+    """
+    processed = dict()
+    for dt in minutes:
+        before = len(ledger.transactions)
+        broker.process_minute(ledger, dt)
+        processed[dt] = ledger.transactions[before:]
+    return processed
+
+
+def position(asset):
+    return SimpleNamespace(asset=asset, amount=1000)
+
+
+def test_price_orders_fill_once_the_bar_reaches_their_price(monkeypatch):
+    # high of A reaches 10.5 at 09:34 , low of B reaches 9.7 at 09:36
+    frames = {'600000': bars([10.0, 10.1, 10.2, 10.45, 10.6, 10.3]),
+              '000001': bars([10.0, 10.0, 9.9, 9.9, 9.85, 9.75, 9.6])}
+    sell = PriceOrder(A, -300, 10.5)
+    buy = PriceOrder(B, 200, 9.7)
+    broker, ledger = make_broker(monkeypatch, frames, {'600000': [sell], '000001': [buy]},
+                                 negatives=[position(A), position(B)])
+    processed = run_minutes(broker, ledger)
+    filled = {dt: txns for dt, txns in processed.items() if txns}
+    assert list(filled) == [minute('09:34'), minute('09:36')]
+    txn, = filled[minute('09:34')]
+    assert (txn.asset, txn.amount, txn.price, txn.created_dt) == (A, -300, 10.5, minute('09:34'))
+    assert txn.cost == pytest.approx(300 * 10.5 * 0.001)
+    txn, = filled[minute('09:36')]
+    assert (txn.asset, txn.amount, txn.price, txn.created_dt) == (B, 200, 9.7, minute('09:36'))
+
+
+def test_dual_long_leg_follows_the_short_fill_after_delay(monkeypatch):
+    frames = {'600000': bars([10.0, 10.2, 10.4, 10.6, 10.8, 11.0, 11.2, 11.4, 11.6, 11.8]),
+              '000001': bars([5.0, 5.1, 5.2, 5.3, 5.4, 5.5, 5.6, 5.7, 5.8, 5.9])}
+    short = TickerOrder(A, -1000, minute('09:32'))
+    broker, ledger = make_broker(monkeypatch, frames, {'600000': [short]},
+                                 duals=[(position(A), B)], delay=3)
+    processed = run_minutes(broker, ledger)
+    filled = {dt: txns for dt, txns in processed.items() if txns}
+    assert list(filled) == [minute('09:32'), minute('09:35')]
+    txn, = filled[minute('09:32')]
+    assert (txn.asset, txn.amount, txn.price) == (A, -1000, 10.2)
+    # capital of the short fill buys B at the close of 09:35 , floored to tick size
+    txn, = filled[minute('09:35')]
+    assert (txn.asset, txn.price, txn.created_dt) == (B, 5.4, minute('09:35'))
+    assert txn.amount == 100 * np.floor(1000 * 10.2 / 5.4 / 100)
+
+
+def test_orders_without_bar_wait_for_the_next_minute(monkeypatch):
+    frames = {'600000': bars([10.0, 10.1, 10.2, 10.3, 10.4]),
+              '000001': bars([8.0, 8.1, 8.2, 8.3, 8.4])}
+    # B is suspended on 09:32 (no row) and 09:33 (nan bar)
+    frames['000001'] = frames['000001'].drop(minute('09:32'))
+    frames['000001'].loc[minute('09:33')] = np.nan
+    orders = {'600000': [TickerOrder(A, -100, minute('09:32'))],
+              '000001': [TickerOrder(B, -200, minute('09:32'))]}
+    broker, ledger = make_broker(monkeypatch, frames, orders, negatives=[position(A), position(B)])
+    processed = run_minutes(broker, ledger)
+    assert [(txn.asset, txn.price) for txn in processed[minute('09:32')]] == [(A, 10.1)]
+    assert processed[minute('09:33')] == []
+    txn, = processed[minute('09:34')]
+    assert (txn.asset, txn.amount, txn.price, txn.created_dt) == (B, -200, 8.3, minute('09:34'))
+
+
+def test_unfilled_orders_and_legs_expire_at_session_end(monkeypatch):
+    # bars go on after 09:40 (the close of the test session) , B reaches 6.0 there
+    frames = {'600000': bars(np.arange(10.0, 12.0, 0.1)),
+              '000001': bars([5.0] * 10 + [6.5] * 10)}
+    # price never reached , short filled on the last minute with the long leg due after the close
+    unreached = PriceOrder(B, -100, 6.0)
+    short = TickerOrder(A, -500, minute('09:40'))
+    broker, ledger = make_broker(monkeypatch, frames, {'600000': [short], '000001': [unreached]},
+                                 negatives=[position(B)], duals=[(position(A), B)], delay=5)
+    processed = run_minutes(broker, ledger)
+    assert [(txn.asset, txn.amount) for txns in processed.values() for txn in txns] == [(A, -500)]
+    broker.flush_pending(ledger)
+    # neither the waiting order nor the long leg survive the session end
+    run_minutes(broker, ledger, pd.date_range(Session + ' 09:41', Session + ' 09:50', freq='min'))
+    assert len(ledger.transactions) == 1
+
+
+def test_create_minute_transactions_triggers_with_slippage_and_costs():
+    blotter = SimulationBlotter(RateCommission(), FixedSlippage(0.01), AllTriggered(rejected={'000001'}))
+    orders = [Order(A, 10.0, 300, minute('09:31')), Order(B, 5.0, -200, minute('09:31')),
+              Order(A, 12.0, -100, minute('09:32'))]
+    triggered, transactions = blotter.create_minute_transactions(orders, Session)
+    # B is rejected by the execution model
+    assert triggered == [orders[0], orders[2]]
+    assert [(txn.asset, txn.amount, txn.created_dt) for txn in transactions] == \
+        [(A, 300, minute('09:31')), (A, -100, minute('09:32'))]
+    np.testing.assert_allclose([txn.price for txn in transactions], [10.1, 12.12])
+    np.testing.assert_allclose([txn.cost for txn in transactions], [300 * 10.1 * 0.001, 100 * 12.12 * 0.001])
+    assert blotter.create_minute_transactions([], Session) == ([], [])
@@ -9,6 +9,7 @@ import numpy as np, pandas as pd
 from itertools import chain
 from abc import ABC, abstractmethod
 from gateway.driver.data_portal import portal
+from util.profiling import logger
 
 
 class BaseUncover(ABC):
@@ -61,16 +62,21 @@ class SimpleUncover(BaseUncover):
     @staticmethod
     def _uncover_by_price(size, asset, dts):
         # 模拟价格分布
-        restricted_change = asset.restricted_change(dts)
-        open_pct, pre_close = portal.get_open_pct(asset, dts)
-        print('open_pct, pre_close', open_pct, pre_close)
+        context = portal.get_session_context(dts)
+        if context is not None:
+            restricted_change = asset.restricted_change(context.session)
+            open_pct, pre_close = context.get_open_pct(asset)
+        else:
+            restricted_change = asset.restricted_change(dts)
+            open_pct, pre_close = portal.get_open_pct(asset, dts)
+        logger.debug('open_pct, pre_close %s %s', open_pct, pre_close)
         dist = 1 + np.random.uniform(- 2 * abs(open_pct), abs(open_pct) * 2, size) if size > 0 else \
             np.array([1 + open_pct])
-        print('dist', dist)
+        logger.debug('dist %s', dist)
         clip_pct = np.clip(dist, (1 - restricted_change), (1 + restricted_change))
         # print('clip_pct', clip_pct)
         sim_prices = clip_pct * pre_close
-        print('sim_prices', sim_prices)
+        logger.debug('sim_prices %s', sim_prices)
         return sim_prices
 
     @staticmethod
@@ -108,14 +114,14 @@ class SimpleUncover(BaseUncover):
                 for r in random_idx:
                     amount_array[r] += tick_size
             except IndexError:
-                print('abundant is less than asset tick size')
+                logger.debug('abundant is less than asset tick size')
                 pass
         else:
             random_idx = np.random.randint(0, size, abundant)
             for r in random_idx:
                 amount_array[r] += 1
         amount_array = amount_array * sign
-        print('_underneath amount array', amount_array)
+        logger.debug('_underneath amount array %s', amount_array)
         return amount_array, size
 
     def create_iterables(self, asset, amount, per_amount, dt):
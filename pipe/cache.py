@@ -0,0 +1,122 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+
+
+class TermCache(object):
+    """
+        LRU cache of term results shared by all pipelines of an engine
+        key --- (term, session, mask hash) ; Term instances are interned via Term._term_cache
+        so identical terms in different pipelines (or ump pickers) hit the same entry ;
+        a key being computed is registered as a future , concurrent callers wait on it instead
+        of computing the term again
+
+    Parameters
+    ----------
+    maxsize : int
+        max number of entries, least recently used entry is evicted first
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        # pipelines may run in a thread pool
+        self._lock = Lock()
+        self._pending = dict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def mask_hash(mask):
+        # order of mask is irrelevant --- set operations in pipeline shuffle assets
+        return hash(frozenset(getattr(asset, 'sid', asset) for asset in mask))
+
+    def get(self, key):
+        with self._lock:
+            value = self._cache[key]
+            self._cache.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def get_or_compute(self, key, func, *args):
+        with self._lock:
+            try:
+                value = self._cache[key]
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return value
+            except KeyError:
+                future = self._pending.get(key)
+                owner = future is None
+                if owner:
+                    self.misses += 1
+                    future = self._pending[key] = Future()
+                else:
+                    self.hits += 1
+        if not owner:
+            return future.result()
+        try:
+            value = func(*args)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        self.set(key, value)
+        with self._lock:
+            del self._pending[key]
+        future.set_result(value)
+        return value
+
+    def compute_term(self, term, session, metadata, mask):
+        """
+            term output on session with mask
+        """
+        key = (term, session, self.mask_hash(mask))
+        return self.get_or_compute(key, term.compute, metadata, mask, session, self)
+
+    def score_term(self, term, session, metadata, mask):
+        """
+            score vector of term on session over mask (inputs of Expression) ; scores are kept
+            by sid since mask order differs between pipelines
+        """
+        key = (term, session, self.mask_hash(mask), 'scores')
+        sids = [getattr(asset, 'sid', asset) for asset in mask]
+        scores = self.get_or_compute(key, self._sid_scores, term, session, metadata, mask, sids)
+        return np.array([scores[sid] for sid in sids], dtype=float)
+
+    def _sid_scores(self, term, session, metadata, mask, sids):
+        return dict(zip(sids, term.scores(metadata, mask, session, self)))
+
+    def withdraw_term(self, term, session, sid, feed):
+        """
+            ump vote of term on session for sid
+        """
+        key = (term, session, sid)
+        return self.get_or_compute(key, term.withdraw, feed)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+
+__all__ = ['TermCache']
@@ -5,19 +5,103 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-from toolz import keyfilter
+import multiprocessing
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from toolz import keyfilter, valfilter
 from functools import partial
 from itertools import chain
 from abc import ABC, abstractmethod
 from pipe.loader.loader import PricingLoader
+from pipe.cache import TermCache
+from _calendar.trading_calendar import calendar
 from finance.restrictions import UnionRestrictions
 from gateway.asset.finder import asset_finder
+from util.profiling import tracer
+
+
+# state of workers of the process executor , set by _init_shared_state when a worker is forked
+# --- metadata (chunk panel or session metadata) is shared copy-on-write instead of being
+# pickled into tasks
+_shared_state = dict()
+
+
+def _init_shared_state(pipelines, final, cache_size, panel=None, universes=None,
+                       metadata=None, mask=None):
+    _shared_state.update(pipelines=pipelines, final=final, panel=panel, universes=universes,
+                         metadata=metadata, mask=mask, term_cache=TermCache(cache_size))
+
+
+def _run_shared_pipeline(index, metadata, mask, session):
+    """
+        run pipeline in a worker ; return sid of output asset since asset
+        objects are compared by identity in the parent process
+    """
+    pipeline = _shared_state['pipelines'][index]
+    out = pipeline.to_execution_plan(metadata, mask, _shared_state['final'], session,
+                                     _shared_state['term_cache'])
+    return out.sid if out else None
+
+
+def _run_forked_pipeline(index, session):
+    """
+        run pipeline on the session metadata inherited by the worker
+    """
+    return _run_shared_pipeline(index, _shared_state['metadata'], _shared_state['mask'], session)
+
+
+def _run_shared_session(session):
+    """
+        run all pipelines on a session of the chunk panel inherited by the worker
+    """
+    universe = _shared_state['universes'][session]
+    metadata = _shared_state['panel'].session_arrays(session, universe)
+    mask = [asset for asset in universe if asset.sid in metadata]
+    outputs = []
+    for index, pipeline in enumerate(_shared_state['pipelines']):
+        sid = _run_shared_pipeline(index, metadata, mask, session)
+        if sid:
+            outputs.append((sid, pipeline.name))
+    return outputs
 
 
 class Engine(ABC):
     """
         engine process should be automatic without much manual interface
     """
+    # TermCache shared by pipelines , None means no memoization
+    term_cache = None
+    # None (serial) , 'thread' or 'process'
+    executor = None
+    max_workers = None
+    _pipeline_pool = None
+    _term_pool = None
+    # sessions of a precompute chunk , None means loading metadata session by session
+    chunk_size = None
+    _chunk_ranges = ()
+    _chunk_panel = None
+    _chunk_assets = None
+    _chunk_universes = None
+    _precomputed = None
+
+    def _init_executor(self, executor, max_workers):
+        """
+            thread --- pipelines , terms of the same layer and ump positions run in thread pools
+                       (numpy / pandas heavy terms release GIL)
+            process --- pipelines run in forked workers (python heavy terms) , the pool lives
+                        for a precompute chunk (sessions of chunk are spread over workers which
+                        inherit the chunk panel) or for a session (session by session mode ,
+                        workers inherit the metadata of session and tasks carry pipeline indices
+                        only) ; each worker memoizes terms in its own TermCache
+        """
+        assert executor in (None, 'thread', 'process'), 'executor must be None, thread or process'
+        self.executor = executor
+        self.max_workers = max_workers
+        if executor:
+            # separate pools , pipeline tasks wait on term tasks
+            self._pipeline_pool = ThreadPoolExecutor(max_workers)
+            self._term_pool = ThreadPoolExecutor(max_workers)
+
     @staticmethod
     def _init_loader(pipelines):
         pipelines = pipelines if isinstance(pipelines, list) else [pipelines]
@@ -48,7 +132,8 @@ class Engine(ABC):
         # print('positions mask', set(ledger.positions))
         mask = set(universe_mask) | set(ledger.positions)
         # print('mask', mask)
-        metadata = self._get_loader.load_pipeline_arrays(dts, mask, 'daily')
+        with tracer.span('pipeline.load'):
+            metadata = self._get_loader.load_pipeline_arrays(dts, mask, 'daily')
         # print('engine metadata sids', set(metadata))
         # 过滤没有数据的sid
         from toolz import valfilter
@@ -59,6 +144,113 @@ class Engine(ABC):
         # print('engine mask', engine_mask)
         return metadata, engine_mask
 
+    def initialize_chunks(self, sessions):
+        """
+            split the sessions of simulation into chunks (calendar.compute_range_chunks) ,
+            metadata of a chunk is loaded once and pipelines are computed for all of its sessions
+        """
+        assert self.chunk_size, 'chunk_size must be set to precompute pipelines'
+        start, end = sessions[0], sessions[-1]
+        # compute_range_chunks excludes end_date
+        chunks = list(calendar.compute_range_chunks(start, end, self.chunk_size))
+        if chunks:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks = [(start, end)]
+        self._chunk_ranges = chunks
+        self._chunk_panel = None
+        self._precomputed = dict()
+
+    def _locate_chunk(self, dts):
+        firsts = [first for first, _ in self._chunk_ranges]
+        loc = bisect_right(firsts, dts) - 1
+        if loc < 0 or dts > self._chunk_ranges[loc][1]:
+            raise ValueError('%s is out of precompute chunks' % dts)
+        return self._chunk_ranges[loc]
+
+    def _precompute_chunk(self, first, last):
+        """
+            load the panel of chunk once and run pipelines on each session , outputs are stored
+            as (sid, pipeline name) since assets tagged by source_id are shared across sessions
+        """
+        sessions = list(calendar.session_in_range(first, last)) + [last]
+        universes = {session: self._calculate_universe(session) for session in sessions}
+        universe = set(chain(*universes.values()))
+        with tracer.span('pipeline.load_chunk'):
+            self._chunk_panel = self._get_loader.load_chunk_arrays([first, last], universe, 'daily')
+        proxy = {asset.sid: asset for asset in universe}
+        self._chunk_universes = {session: {asset.sid for asset in assets}
+                                 for session, assets in universes.items()}
+        self._precomputed = dict()
+        if self.executor == 'process':
+            with self._fork_pool(self._chunk_panel, universes) as pool:
+                outputs = pool.map(_run_shared_session, sessions)
+                self._precomputed.update(zip(sessions, outputs))
+            return proxy
+        for session in sessions:
+            metadata = self._chunk_panel.session_arrays(session, universes[session])
+            mask = [asset for asset in universes[session] if asset.sid in metadata]
+            pipes = self.run_pipeline(metadata, mask, session)
+            self._precomputed[session] = [(r.sid, r.tag) for r in pipes]
+        return proxy
+
+    def _load_precomputed(self, ledger, dts):
+        """
+            pipeline outputs of dts and metadata of positions sliced from the chunk panel ;
+            positions join the pipeline mask as in the session by session mode , so pipelines
+            are run again on dts if a position is out of the precomputed universe
+        """
+        assert self._chunk_ranges, 'initialize_chunks must be called before precompute mode'
+        if dts not in self._precomputed:
+            first, last = self._locate_chunk(dts)
+            self._chunk_assets = self._precompute_chunk(first, last)
+        precomputed = self._precomputed.pop(dts)
+        holdings = set(ledger.positions)
+        universe = self._chunk_universes[dts]
+        outside = [asset for asset in holdings if asset.sid not in universe]
+        if outside:
+            assets = set(self._chunk_assets[sid] for sid in universe) | holdings
+        else:
+            assets = holdings
+        metadata = self._chunk_panel.session_arrays(dts, assets)
+        # positions out of the universe of chunk
+        extra = [asset for asset in holdings if asset.sid not in self._chunk_panel]
+        if extra:
+            arrays = self._get_loader.load_pipeline_arrays(dts, extra, 'daily')
+            metadata.update(valfilter(lambda x: not x.empty, arrays))
+        if outside:
+            mask = [asset for asset in assets if asset.sid in metadata]
+            pipes = self.run_pipeline(metadata, mask, dts)
+        else:
+            pipes = [self._chunk_assets[sid].source_id(tag) for sid, tag in precomputed]
+        return pipes, metadata
+
+    def compute_selections(self, sessions):
+        """
+            pipeline outputs of sessions regardless of ledger (no positions , no ump) , e.g. the
+            selection matrix of trade.vectorized.VectorizedBacktest
+        :param sessions: list of %Y-%m-%d
+        :return: dict session -> assets tagged by pipeline name
+        """
+        selections = dict()
+        if self.chunk_size:
+            self.initialize_chunks(sessions)
+            for session in sessions:
+                if session not in self._precomputed:
+                    first, last = self._locate_chunk(session)
+                    self._chunk_assets = self._precompute_chunk(first, last)
+                selections[session] = [self._chunk_assets[sid].source_id(tag)
+                                       for sid, tag in self._precomputed.pop(session)]
+        else:
+            for session in sessions:
+                universe = self._calculate_universe(session)
+                with tracer.span('pipeline.load'):
+                    metadata = self._get_loader.load_pipeline_arrays(session, universe, 'daily')
+                metadata = valfilter(lambda x: not x.empty, metadata)
+                mask = [asset for asset in universe if asset.sid in metadata]
+                selections[session] = self.run_pipeline(metadata, mask, session)
+        return selections
+
     def _split_positions(self, ledger, dts):
         """
         Register a Pipeline default for pipe on every day.
@@ -91,46 +283,76 @@ class Engine(ABC):
         # print('traded_positions', traded_positions)
         return traded_positions, remove_positions
 
-    def _run_pipeline(self, pipeline, metadata, mask):
+    def _run_pipeline(self, pipeline, metadata, mask, dts=None):
         """
         ----------
         pipe : zipline.pipe.Pipeline
             The pipe to run.
         """
-        out = pipeline.to_execution_plan(metadata, mask, self.final)
+        out = pipeline.to_execution_plan(metadata, mask, self.final, dts, self.term_cache,
+                                         self._term_pool)
         return out
 
-    def run_pipeline(self, pipeline_metadata, mask):
+    def _fork_pool(self, panel=None, universes=None, metadata=None, mask=None, workers=None):
+        """
+            process pool whose workers are forked with pipelines (and the chunk panel or the
+            metadata of session)
+        """
+        context = multiprocessing.get_context('fork')
+        max_workers = self.max_workers or multiprocessing.cpu_count()
+        return ProcessPoolExecutor(min(max_workers, workers or max_workers),
+                                   mp_context=context,
+                                   initializer=_init_shared_state,
+                                   initargs=(self.pipelines, self.final, self.term_cache.maxsize,
+                                             panel, universes, metadata, mask))
+
+    def _run_process_pipelines(self, metadata, mask, dts=None):
+        """
+            session by session mode --- workers are forked with the metadata of session , so it
+            is shared copy-on-write once per session instead of being pickled for each pipeline
+        """
+        n = len(self.pipelines)
+        with self._fork_pool(metadata=metadata, mask=mask, workers=n) as pool:
+            sids = list(pool.map(_run_forked_pipeline, range(n), [dts] * n))
+        proxy = {asset.sid: asset for asset in mask}
+        results = [proxy[sid].source_id(pipeline.name) if sid else None
+                   for sid, pipeline in zip(sids, self.pipelines)]
+        return results
+
+    def run_pipeline(self, pipeline_metadata, mask, dts=None):
         """
         Compute values for  pipelines on a specific date.
         Parameters
         ----------
         pipeline_metadata : cache data for pipe
         mask : default asset list
+        dts : session , key of term_cache shared by pipelines
         ----------
         return --- assets which tag by pipeline name
         """
         _partial_func = partial(self._run_pipeline,
                                 mask=mask,
-                                metadata=pipeline_metadata)
-
-        results = []
-        for pipeline in self.pipelines:
-            out = _partial_func(pipeline)
-            # print('out', out)
-            results.append(out)
+                                metadata=pipeline_metadata,
+                                dts=dts)
+
+        if self.executor == 'process' and len(self.pipelines) > 1:
+            results = self._run_process_pipelines(pipeline_metadata, mask, dts)
+        elif self.executor and len(self.pipelines) > 1:
+            # map keeps the order of pipelines
+            results = list(self._pipeline_pool.map(_partial_func, self.pipelines))
+        else:
+            results = [_partial_func(pipeline) for pipeline in self.pipelines]
         results = [r for r in results if r]
         # print('run pipeline output', results)
         return results
 
-    @staticmethod
-    def _run_ump(pipeline, position, metadata):
+    def _run_ump(self, pipeline, position, metadata, dts=None):
         # print('ump_picker', pipeline.ump_terms)
         # output --- bool or position
-        result = pipeline.to_withdraw_plan(position, metadata)
+        result = pipeline.to_withdraw_plan(position, metadata, dts, self.term_cache)
         return result
 
-    def run_ump(self, metadata, positions):
+    def run_ump(self, metadata, positions, dts=None):
         """
             umps --- based on different asset type --- (symbols , etf , bond)
                     to determine withdraw strategy
@@ -139,18 +361,18 @@ class Engine(ABC):
         output = []
         if positions:
             # print('ump positions', positions)
-            _ump_func = partial(self._run_ump, metadata=metadata)
+            _ump_func = partial(self._run_ump, metadata=metadata, dts=dts)
             # proxy -- positions : pipeline
             proxy_position = {p.asset.tag: p for p in positions}
             # print('proxy_position', proxy_position)
             proxy_pipeline = {pipe.name: pipe for pipe in self.pipelines}
             # print('proxy_pipeline', proxy_pipeline)
-            for proxy in proxy_position:
-                res = _ump_func(
-                    proxy_pipeline[proxy],
-                    proxy_position[proxy]
-                )
-                output.append(res)
+            pipes = [proxy_pipeline[proxy] for proxy in proxy_position]
+            if self._term_pool is not None:
+                output = list(self._term_pool.map(_ump_func, pipes, proxy_position.values()))
+            else:
+                output = [_ump_func(pipe, position)
+                          for pipe, position in zip(pipes, proxy_position.values())]
             # ump position
             output = [r for r in output if r]
         # print('run ump result', output)
@@ -160,17 +382,31 @@ class Engine(ABC):
         """
             calculate pipelines and ump
         """
-        metadata, default_mask = self._initialize_metadata(ledger, dts)
-        traded_positions, removed_positions = self._split_positions(ledger, dts)
-        # 执行算法逻辑
-        pipes = self.run_pipeline(metadata, default_mask)
+        if self.chunk_size:
+            pipes, metadata = self._load_precomputed(ledger, dts)
+            traded_positions, removed_positions = self._split_positions(ledger, dts)
+        else:
+            metadata, default_mask = self._initialize_metadata(ledger, dts)
+            traded_positions, removed_positions = self._split_positions(ledger, dts)
+            # 执行算法逻辑
+            pipes = self.run_pipeline(metadata, default_mask, dts)
         # 剔除righted positions, violate_positions, expired_positions
-        ump_positions = self.run_ump(metadata, traded_positions)
+        ump_positions = self.run_ump(metadata, traded_positions, dts)
         ump_positions = set(ump_positions) | removed_positions
         # print('ump_positions', ump_positions)
         # yield self.resolve_conflicts(pipes, ump_positions, ledger.positions)
         return self.resolve_conflicts(pipes, ump_positions, ledger.positions)
 
+    def close(self):
+        """
+            shut down the pools of executor
+        """
+        for attr in ('_pipeline_pool', '_term_pool'):
+            pool = getattr(self, attr)
+            if pool is not None:
+                pool.shutdown(wait=True)
+                setattr(self, attr, None)
+
     @staticmethod
     @abstractmethod
     def resolve_conflicts(calls, puts, holding):
@@ -243,7 +479,8 @@ class SimplePipelineEngine(Engine):
     __slots__ = [
         'disallowed_righted',
         'disallowed_violation',
-        'restricted_rules'
+        'restricted_rules',
+        'term_cache'
     ]
 
     def __init__(self,
@@ -251,12 +488,21 @@ class SimplePipelineEngine(Engine):
                  final_model,
                  restrictions,
                  disallow_righted=True,
-                 disallow_violation=True):
+                 disallow_violation=True,
+                 cache_size=4096,
+                 executor=None,
+                 max_workers=None,
+                 chunk_size=None):
         self.disallowed_righted = disallow_righted
         self.disallowed_violation = disallow_violation
         self.restricted_rules = UnionRestrictions(restrictions)
         self.final = final_model
         self.pipelines, self._get_loader = self._init_loader(pipelines)
+        # term outputs shared by all pipelines and ump pickers
+        self.term_cache = TermCache(cache_size)
+        self._init_executor(executor, max_workers)
+        # e.g. 126 --- pipelines are precomputed by chunk , see initialize_chunks
+        self.chunk_size = chunk_size
 
     @staticmethod
     def resolve_conflicts(calls, puts, holdings):
@@ -0,0 +1,140 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import numexpr, numpy as np
+from numexpr.necompiler import getExprNames
+from pipe.domain import Domain
+from pipe.term import Term, NotSpecific
+
+
+class Expression(Term):
+    """
+        Term binding to a numexpr expression over the score vectors of terms
+        e.g. Expression('(cross_score - break_score) / atr',
+                        {'cross_score': cross_term, 'break_score': break_term, 'atr': atr_term},
+                        {'threshold': 0, 'final': True, 'withdraw': 'cross_score & break_score'})
+
+        1 inputs --- name : term (or expression) , scores of inputs are evaluated on the mask
+                     of expression in one numexpr pass ; scores are memoized by TermCache so
+                     inputs shared by expressions (or pipelines) are computed once per session
+        2 mask --- intersection of dependencies outputs as other terms ; inputs are not
+                   dependencies unless passed explicitly
+        3 outputs --- assets whose value above threshold , sorted by value if final
+        4 withdraw --- boolean params['withdraw'] evaluated over the withdraw votes
+                       (short_signal) of inputs , e.g. 'cross | break_' withdraws if any input
+                       votes ; defaults to all inputs voting (as UmpPickers) , expr is a score
+                       not a vote
+        5 interned by _term_cache via (expr, inputs, params, dependencies)
+    """
+    def __new__(cls,
+                expr,
+                inputs,
+                params=None,
+                dependencies=NotSpecific):
+        p = cls._hash_params(params or {})
+        binds = tuple(sorted(inputs.items(), key=lambda x: x[0]))
+        identity = cls._static_identity((expr, binds), p, dependencies)
+        try:
+            return cls._term_cache[identity]
+        except KeyError:
+            new_instance = cls._term_cache[identity] = \
+                object.__new__(cls)._init(expr, binds, p, dependencies)
+            return new_instance
+
+    def _init(self, expr, binds, p, dependencies):
+        self._expr = expr
+        self.inputs = dict(binds)
+        self.params = dict(p)
+        self._validate()
+        del self._subclass_called_validate
+        # fields and window needed by inputs
+        fields = set()
+        for term in self.inputs.values():
+            fields |= set(term.domain.domain_field)
+        window = max(term.domain.domain_window for term in self.inputs.values())
+        self.domain = Domain(list(fields), window)
+        self.dependencies = [dependencies] if isinstance(dependencies, Term) or dependencies == NotSpecific \
+            else dependencies
+        return self
+
+    def _validate(self):
+        """
+            Ensure that variables of expression are bound to inputs
+        """
+        variable_names, _unused = getExprNames(self._expr, {})
+        if 'withdraw' in self.params:
+            variable_names = set(variable_names) | set(getExprNames(self.params['withdraw'], {})[0])
+        unbound = set(variable_names) - set(self.inputs) - {'inf'}
+        if unbound:
+            raise ValueError('%r of expression are not bound to inputs' % sorted(unbound))
+        self._validate_withdraw()
+        super(Expression, self)._validate()
+
+    def _validate_withdraw(self):
+        """
+            Ensure that withdraw expression combines the votes of inputs into a vote
+        """
+        votes = {name: np.array([False]) for name in self.inputs}
+        try:
+            dtype = numexpr.evaluate(self.withdraw_expr, local_dict=votes).dtype
+        except (TypeError, ValueError, NotImplementedError) as e:
+            raise ValueError('withdraw %r is not boolean : %s' % (self.withdraw_expr, e))
+        if dtype != np.bool_:
+            raise ValueError('withdraw %r is not boolean but %s' % (self.withdraw_expr, dtype))
+
+    @property
+    def withdraw_expr(self):
+        return self.params.get('withdraw', ' & '.join(sorted(self.inputs)))
+
+    @property
+    def final(self):
+        return self.params.get('final', False)
+
+    def _evaluate(self, local_dict):
+        # numexpr evaluates the whole universe in one multithreaded pass
+        return numexpr.evaluate(self._expr,
+                                local_dict=local_dict,
+                                global_dict={'inf': np.inf})
+
+    def evaluate(self, feed):
+        local_dict = {name: np.array([term.evaluate(feed)], dtype=float)
+                      for name, term in self.inputs.items()}
+        return self._evaluate(local_dict)[0]
+
+    def scores(self, metadata, mask, session=None, cache=None):
+        if cache is None or session is None:
+            local_dict = {name: term.scores(metadata, mask) for name, term in self.inputs.items()}
+        else:
+            local_dict = {name: cache.score_term(term, session, metadata, mask)
+                          for name, term in self.inputs.items()}
+        return self._evaluate(local_dict).astype(float)
+
+    def compute(self, metadata, mask, session=None, cache=None):
+        if not mask:
+            return self.postprocess([])
+        values = self.scores(metadata, mask, session, cache)
+        # nan never passes threshold
+        keep = np.flatnonzero(values > self.params.get('threshold', 0))
+        if self.final:
+            keep = keep[np.argsort(-values[keep], kind='stable')]
+        output = [mask[i] for i in keep]
+        return self.postprocess(output)
+
+    def _compute(self, meta, mask):
+        return self.compute(meta, mask)
+
+    def withdraw(self, feed):
+        # boolean expression over the ump votes of inputs
+        local_dict = {name: np.array([bool(term.withdraw(feed))]) for name, term in self.inputs.items()}
+        signal = numexpr.evaluate(self.withdraw_expr, local_dict=local_dict)[0]
+        return bool(signal)
+
+    def __repr__(self):
+        return "{type}({expr})".format(type=type(self).__name__, expr=self._expr)
+
+
+__all__ = ['Expression']
@@ -96,6 +96,24 @@ class TermGraph(object):
             self.graph.remove_node(node)
         return nodes
 
+    def layers(self):
+        """
+        Compile graph into layers ordered as decref_dependencies would remove
+        them, without mutating the graph --- terms in a layer are independent.
+
+        Return
+        ------
+        list of term lists
+        """
+        graph = self.graph.copy()
+        layers = []
+        while len(graph):
+            refcounts = dict(graph.in_degree())
+            nodes = list(valfilter(lambda x: x == 0, refcounts))
+            graph.remove_nodes_from(nodes)
+            layers.append(nodes)
+        return layers
+
     def draw(self):
         # plt.subplot(121)
         # nx.draw(self.graph)
@@ -13,13 +13,15 @@ from gateway.driver.fundamental_reader import (
                         GrossSessionReader,
                         MarginSessionReader
                                             )
+from gateway.driver.event_store import EventStore
 
 
+# event readers backed by as-of indexed stores , gross is scraped and read directly
 EVENT = {
-        'massive': MassiveSessionReader(),
-        'release': ReleaseSessionReader(),
-        'holder': HolderSessionReader(),
-        'ownership': OwnershipSessionReader(),
+        'massive': EventStore(MassiveSessionReader()),
+        'release': EventStore(ReleaseSessionReader()),
+        'holder': EventStore(HolderSessionReader()),
+        'ownership': EventStore(OwnershipSessionReader()),
         'gross': GrossSessionReader(),
-        'margin': MarginSessionReader()
+        'margin': EventStore(MarginSessionReader())
         }
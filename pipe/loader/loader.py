@@ -6,6 +6,7 @@ Created on Tue Mar 12 15:37:47 2019
 @author: python
 """
 from pipe.loader.base import PipelineLoader
+from gateway.driver.adjustArray import AdjustFields
 from _calendar.trading_calendar import calendar
 from pipe.loader import EVENT
 from gateway.driver.data_portal import portal
@@ -29,6 +30,9 @@ class PricingLoader(PipelineLoader):
         # print('loader fields', fields)
         window = - self.scale * abs(self.pipeline_domain.domain_window)
         # print('loader window', window)
+        context = portal.get_session_context(dts) if data_frequency == 'daily' else None
+        if context is not None:
+            return context.history(assets, window, fields)
         adjust_kline = portal.get_history_window(assets,
                                                  dts,
                                                  window,
@@ -38,6 +42,53 @@ class PricingLoader(PipelineLoader):
         # print('adjust_kline', set(adjust_kline))
         return adjust_kline
 
+    def load_chunk_arrays(self, sessions, assets, data_frequency):
+        """
+            load adjusted arrays of a chunk of sessions plus the lookback of pipeline domain at once
+        """
+        fields = list(self.pipeline_domain.domain_field)
+        window = - self.scale * abs(self.pipeline_domain.domain_window)
+        sdate = calendar.dt_window_size(sessions[0], window)
+        adjust_kline, coefs = portal.get_history_panel(assets,
+                                                       [sdate, sessions[-1]],
+                                                       fields,
+                                                       data_frequency)
+        return ChunkPanel(adjust_kline, coefs, window)
+
+
+class ChunkPanel(object):
+    """
+        adjusted arrays of a chunk which are sliced into the window of each session ;
+        arrays are adjusted to the end of chunk , so a window ending on dts is re-based by
+        the qfq coef of the session after dts to equal the arrays loaded on dts
+    """
+    def __init__(self, arrays, coefs, window):
+        self.arrays = {sid: frame.sort_index() for sid, frame in arrays.items() if not frame.empty}
+        self.coefs = coefs
+        self.window = window
+
+    def __contains__(self, sid):
+        return sid in self.arrays
+
+    def session_arrays(self, dts, assets):
+        sdate = calendar.dt_window_size(dts, self.window)
+        session_kline = dict()
+        for asset in assets:
+            try:
+                frame = self.arrays[asset.sid]
+            except KeyError:
+                continue
+            start = frame.index.searchsorted(sdate)
+            end = frame.index.searchsorted(dts, side='right')
+            window_frame = frame.iloc[start: end]
+            coef = self.coefs.get(asset.sid)
+            if coef is not None and end < len(coef):
+                window_frame = window_frame.copy()
+                adjusted_fields = list(AdjustFields & set(window_frame.columns))
+                window_frame[adjusted_fields] = window_frame[adjusted_fields] / coef.iloc[end]
+            session_kline[asset.sid] = window_frame
+        return session_kline
+
 
 class EventLoader(PipelineLoader):
     """
@@ -74,7 +125,7 @@ class EventLoader(PipelineLoader):
         return event_mappings
 
 
-__all__ = ['PricingLoader', 'EventLoader']
+__all__ = ['PricingLoader', 'ChunkPanel', 'EventLoader']
 
 
 # if __name__ == '__main__':
@@ -8,10 +8,11 @@ Created on Tue Mar 12 15:37:47 2019
 import uuid
 from collections import OrderedDict
 from toolz import keyfilter
-from functools import reduce
+from functools import reduce, partial
 from pipe.term import Term, NotSpecific
 from pipe.graph import TermGraph
 from pipe.ump import UmpPickers
+from util.profiling import logger, tracer
 
 
 class Pipeline(object):
@@ -21,11 +22,12 @@ class Pipeline(object):
         b. withdraw logic of pipe --- instance of ump_picker
         c. pipe --- ump_picker
     """
-    __slots__ = ['_terms_store', '_name', '_workspace', '_ump']
+    __slots__ = ['_terms_store', '_name', '_workspace', '_ump', '_layers']
 
     def __init__(self, terms, ump_picker=None):
         self._terms_store = [terms] if isinstance(terms, Term) else terms
         self._workspace = OrderedDict()
+        self._layers = None
         self._ump = UmpPickers(ump_picker) if ump_picker else UmpPickers(terms)
         self._name = str(uuid.uuid4())
 
@@ -56,6 +58,15 @@ class Pipeline(object):
         graph = TermGraph(self._terms_store)
         return graph
 
+    @property
+    def layers(self):
+        """
+        TermGraph compiled once into layers, recompiled after terms change
+        """
+        if self._layers is None:
+            self._layers = self._init_graph().layers()
+        return self._layers
+
     def __add__(self, term):
         if not isinstance(term, Term):
             raise TypeError(
@@ -66,6 +77,7 @@ class Pipeline(object):
         # if term in self._graph.nodes:
         #     raise Exception('term object already exists in pipe')
         self._terms_store.append(term)
+        self._layers = None
         return self
 
     def __sub__(self, term):
@@ -73,6 +85,7 @@ class Pipeline(object):
             self._terms_store.remove(term)
         except Exception as e:
             raise TypeError(e)
+        self._layers = None
         return self
 
     def _combine_term_dependence(self, term, default_mask):
@@ -136,25 +149,50 @@ class Pipeline(object):
         try:
             final_out = final.resolve_final(outputs)
         except IndexError:
-            print('list index out of range means no pipeline out')
+            logger.debug('pipeline %s has no output', self.name)
             final_out = None
         return final_out
 
-    def to_execution_plan(self, metadata, mask, final):
+    @staticmethod
+    def _compute_term(node, node_mask, metadata, session, cache):
+        with tracer.span('pipeline.compute_term'):
+            if cache is None or session is None:
+                return node.compute(metadata, node_mask)
+            return cache.compute_term(node, session, metadata, node_mask)
+
+    def _compute_layers(self, metadata, mask, session, cache, executor=None):
+        """
+            compute compiled layers , term outputs are shared through cache
+            (term, session, mask) across pipelines ; terms of the same layer are
+            independent and computed concurrently when executor is given
+        """
+        for layer in self.layers:
+            node_masks = [list(self._combine_term_dependence(node, mask)) for node in layer]
+            func = partial(self._compute_term, metadata=metadata, session=session, cache=cache)
+            if executor is not None and len(layer) > 1:
+                outputs = list(executor.map(func, layer, node_masks))
+            else:
+                outputs = [func(node, node_mask) for node, node_mask in zip(layer, node_masks)]
+            # workspace keeps the layer order whatever the completion order
+            for node, output in zip(layer, outputs):
+                self._workspace[node] = output
+
+    def to_execution_plan(self, metadata, mask, final, session=None, cache=None, executor=None):
         """
             to execute pipe logic
+            session , cache : TermCache used to memoize term outputs of session
+            executor : concurrent.futures executor for terms of the same layer
         """
-        term_graph = self._init_graph()
-        self._decref_dependence(term_graph, metadata, mask)
+        self._compute_layers(metadata, mask, session, cache, executor)
         result = self.compute_eager_pipeline(final)
         self._workspace = OrderedDict()
         return result
 
-    def to_withdraw_plan(self, position, metadata):
+    def to_withdraw_plan(self, position, metadata, session=None, cache=None):
         """
             to execute ump_picker logic
         """
-        out = self._ump.evaluate(position, metadata)
+        out = self._ump.evaluate(position, metadata, session, cache)
         return out
 
 
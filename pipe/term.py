@@ -5,10 +5,11 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-import glob, os
+import numpy as np
 from toolz import valmap
 from weakref import WeakValueDictionary
 from pipe.domain import infer_domain
+from strat.registry import registry
 
 
 class NotSpecific(Exception):
@@ -39,10 +40,8 @@ class Term(object):
     """
     default_type = (tuple,)
     _term_cache = WeakValueDictionary()
-    namespace = dict()
-    # base_dir = os.path.join(os.path.split(os.getcwd())[0], 'strat')
-    base_dir = '/Users/python/Library/Mobile Documents/com~apple~CloudDocs/ArkQuant/strat'
-    # base_dir = os.path.join(os.path.split(os.path.abspath('__file__'))[0], 'strat')
+    # script name -> signal class , modules of strat are imported once
+    registry = registry
 
     def __new__(cls,
                 script,
@@ -83,13 +82,8 @@ class Term(object):
             don't want to call __init__ again.
         """
         params = dict(p)
-        # 解析信号文件并获取类对象
-        # print('base_dir', self.base_dir)
-        file = glob.glob(os.path.join(self.base_dir, '%s.py' % script))[0]
-        # print(file)
-        with open(file, 'r') as f:
-            exec(f.read(), self.namespace)
-        logic = self.namespace[script.capitalize()]
+        # 获取信号类对象
+        logic = self.registry.get(script)
         try:
             self.signal = logic(params)
             self._validate()
@@ -145,15 +139,28 @@ class Term(object):
         validate_output = self.postprocess(output)
         return validate_output
 
-    def compute(self, metadata, mask):
+    def compute(self, metadata, mask, session=None, cache=None):
         """
             1. subclass should implement when _verify_asset_finder is True
             2. self.postprocess()
+            session , cache --- TermCache of engine for terms built on other terms (Expression)
         """
         output = self._compute(metadata, mask)
         # print('term output', output)
         return output
 
+    def evaluate(self, feed):
+        """
+            raw score of signal on the feed of an asset
+        """
+        return self.signal._run_signal(feed)
+
+    def scores(self, metadata, mask, session=None, cache=None):
+        """
+            score vector over mask , intended for pipe.expression.Expression
+        """
+        return np.array([self.evaluate(metadata[m.sid]) for m in mask], dtype=float)
+
     def withdraw(self, feed):
         signal = self.signal.short_signal(feed)
         return signal
@@ -33,16 +33,20 @@ class UmpPickers(object):
     def pickers(self):
         return self._poll_pickers
 
-    def _evaluate_for_position(self, position, metadata):
+    def _evaluate_for_position(self, position, metadata, session=None, cache=None):
         # withdraw --- return bool
-        votes = [picker.withdraw(metadata[position.asset.sid])
-                 for picker in self.pickers]
+        sid = position.asset.sid
+        if cache is None or session is None:
+            votes = [picker.withdraw(metadata[sid]) for picker in self.pickers]
+        else:
+            votes = [cache.withdraw_term(picker, session, sid, metadata[sid])
+                     for picker in self.pickers]
         if np.all(votes):
             return position
         return False
 
-    def evaluate(self, position, metadata):
-        vote = self._evaluate_for_position(position, metadata)
+    def evaluate(self, position, metadata, session=None, cache=None):
+        vote = self._evaluate_for_position(position, metadata, session, cache)
         return vote
 
 
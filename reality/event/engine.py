@@ -2,11 +2,13 @@
 Event-driven framework of vn.py framework.
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from queue import Empty, Queue
-from threading import Thread
-from time import sleep
-from typing import Any, Callable, List
+from threading import Lock, Thread
+from time import sleep, perf_counter
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
 
 EVENT_TIMER = "eTimer"
 
@@ -18,15 +20,22 @@ class Event:
     object which contains the real data.
     """
 
+    __slots__ = ("type", "data", "time")
+
     def __init__(self, type: str, data: Any = None):
         """"""
         self.type: str = type
         self.data: Any = data
+        # perf_counter when put into engine queue
+        self.time: float = 0.0
 
 
 # Defines handler function to be used in event engine.
 HandlerType = Callable[[Event], None]
 
+# Defines batch handler function receiving all events of a type in a batch.
+BatchHandlerType = Callable[[List[Event]], None]
+
 
 class EventEngine:
     """
@@ -35,31 +44,70 @@ class EventEngine:
 
     It also generates timer event by every interval seconds,
     which can be used for timing purpose.
+
+    High-throughput mode (batch_size > 1) drains up to batch_size
+    events from queue at once. Events whose type starts with one of
+    coalesce prefixes (e.g. "eTick.") are coalesced per type and
+    vt_symbol of data, only the latest one is dispatched at its
+    position in the batch. Batch handlers receive all events of
+    their type in a batch with one call.
+
+    Queue depth and dispatch latency (put to handled) percentiles
+    are exposed by metrics.
     """
 
-    def __init__(self, interval: int = 1):
+    def __init__(
+        self,
+        interval: int = 1,
+        batch_size: int = 1,
+        coalesce: Sequence[str] = (),
+        latency_window: int = 10000
+    ):
         """
         Timer event is generated every 1 second by default, if
         interval not specified.
         """
         self._interval: int = interval
+        self._batch_size: int = max(1, batch_size)
+        self._coalesce: tuple = tuple(coalesce)
         self._queue: Queue = Queue()
         self._active: bool = False
         self._thread: Thread = Thread(target=self._run)
         self._timer: Thread = Thread(target=self._run_timer)
         self._handlers: defaultdict = defaultdict(list)
         self._general_handlers: List = []
+        self._batch_handlers: defaultdict = defaultdict(list)
+
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._metrics_lock: Lock = Lock()
+        self._processed: int = 0
+        self._coalesced: int = 0
+        self._batches: int = 0
 
     def _run(self) -> None:
         """
-        Get event from queue and then process it.
+        Get events from queue and then process them.
         """
         while self._active:
             try:
                 event = self._queue.get(block=True, timeout=1)
+            except Empty:
+                continue
+
+            if self._batch_size == 1 and not self._batch_handlers:
                 self._process(event)
+                with self._metrics_lock:
+                    self._latencies.append(perf_counter() - event.time)
+                    self._processed += 1
+                continue
+
+            events = [event]
+            try:
+                while len(events) < self._batch_size:
+                    events.append(self._queue.get_nowait())
             except Empty:
                 pass
+            self._process_batch(events)
 
     def _process(self, event: Event) -> None:
         """
@@ -70,10 +118,55 @@ class EventEngine:
         to all types.
         """
         if event.type in self._handlers:
-            [handler(event) for handler in self._handlers[event.type]]
+            for handler in self._handlers[event.type]:
+                handler(event)
+
+        for handler in self._general_handlers:
+            handler(event)
+
+    def _coalesce_events(self, events: List[Event]) -> List[Event]:
+        """
+        Keep the latest event of each (type, vt_symbol) whose type starts
+        with coalesce prefixes, other events are kept in order.
+        """
+        seen = set()
+        kept = []
+        for event in reversed(events):
+            if event.type.startswith(self._coalesce):
+                key = (event.type, getattr(event.data, "vt_symbol", None))
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(event)
+        kept.reverse()
+        self._coalesced += len(events) - len(kept)
+        return kept
+
+    def _process_batch(self, events: List[Event]) -> None:
+        """
+        Coalesce events, distribute each event to handlers and general
+        handlers, then distribute events of each type to batch handlers.
+        """
+        dispatched = self._coalesce_events(events) if self._coalesce else events
+
+        for event in dispatched:
+            self._process(event)
 
-        if self._general_handlers:
-            [handler(event) for handler in self._general_handlers]
+        if self._batch_handlers:
+            by_type: Dict[str, List[Event]] = defaultdict(list)
+            for event in dispatched:
+                if event.type in self._batch_handlers:
+                    by_type[event.type].append(event)
+            for type, batch in by_type.items():
+                for handler in self._batch_handlers[type]:
+                    handler(batch)
+
+        now = perf_counter()
+        with self._metrics_lock:
+            # coalesced events are counted as handled with the latest one
+            self._latencies.extend(now - event.time for event in events)
+            self._processed += len(events)
+            self._batches += 1
 
     def _run_timer(self) -> None:
         """
@@ -104,6 +197,7 @@ class EventEngine:
         """
         Put an event object into event queue.
         """
+        event.time = perf_counter()
         self._queue.put(event)
 
     def register(self, type: str, handler: HandlerType) -> None:
@@ -141,3 +235,47 @@ class EventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+
+    def register_batch(self, type: str, handler: BatchHandlerType) -> None:
+        """
+        Register a new batch handler function for a specific event type,
+        which is called with all events of the type in a batch.
+        """
+        handler_list = self._batch_handlers[type]
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+    def unregister_batch(self, type: str, handler: BatchHandlerType) -> None:
+        """
+        Unregister an existing batch handler function.
+        """
+        handler_list = self._batch_handlers[type]
+
+        if handler in handler_list:
+            handler_list.remove(handler)
+
+        if not handler_list:
+            self._batch_handlers.pop(type)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Queue depth, counters and dispatch latency percentiles (seconds)
+        over the latest latency_window events.
+        """
+        with self._metrics_lock:
+            latencies = np.array(self._latencies)
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            latency_max = latencies.max()
+        else:
+            p50 = p90 = p99 = latency_max = np.nan
+        return {
+            "queue_depth": self._queue.qsize(),
+            "processed": self._processed,
+            "coalesced": self._coalesced,
+            "batches": self._batches,
+            "latency_p50": p50,
+            "latency_p90": p90,
+            "latency_p99": p99,
+            "latency_max": latency_max,
+        }
@@ -0,0 +1,127 @@
+"""
+Bulk persistence of SqlManager against an in-memory SQLite stand-in.
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("VNPY_TESTING", "1")
+pytest.importorskip("vnpy")
+peewee = pytest.importorskip("peewee")
+
+from vnpy.trader.constant import Exchange, Interval  # noqa: E402
+from vnpy.trader.object import BarData  # noqa: E402
+
+from reality.trader.database.database import Driver, DB_TZ, BAR_ARRAY_FIELDS  # noqa: E402
+from reality.trader.database.database_sql import (  # noqa: E402
+    ModelBase,
+    SqlManager,
+    bulk_upsert,
+    init_models,
+)
+
+
+@pytest.fixture
+def db():
+    database = peewee.SqliteDatabase(":memory:")
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def manager(db):
+    return SqlManager(*init_models(db, Driver.SQLITE))
+
+
+def minute_arrays(start, n):
+    dts = np.datetime64(start) + np.arange(n).astype("timedelta64[m]")
+    close = 10 + np.arange(n) * 0.01
+    return {
+        "datetime": dts,
+        "open_price": close,
+        "high_price": close + 0.01,
+        "low_price": close - 0.01,
+        "close_price": close,
+        "volume": np.full(n, 100.0),
+    }
+
+
+def test_bar_arrays_round_trip(manager):
+    data = minute_arrays("2020-01-02T09:31", 2500)
+    manager.save_bar_arrays("600000", Exchange.SSE, Interval.MINUTE, data)
+
+    loaded = manager.load_bar_arrays(
+        "600000", Exchange.SSE, Interval.MINUTE,
+        datetime(2020, 1, 1), datetime(2020, 12, 31)
+    )
+    assert set(loaded) == set(BAR_ARRAY_FIELDS)
+    np.testing.assert_array_equal(loaded["datetime"], data["datetime"].astype("datetime64[us]"))
+    np.testing.assert_allclose(loaded["close_price"], data["close_price"])
+    np.testing.assert_allclose(loaded["open_interest"], 0.0)
+
+
+def test_bar_arrays_replace_on_conflict(manager):
+    data = minute_arrays("2020-01-02T09:31", 10)
+    manager.save_bar_arrays("600000", Exchange.SSE, Interval.MINUTE, data)
+    data["close_price"] = data["close_price"] * 2
+    manager.save_bar_arrays("600000", Exchange.SSE, Interval.MINUTE, data)
+
+    loaded = manager.load_bar_arrays(
+        "600000", Exchange.SSE, Interval.MINUTE,
+        datetime(2020, 1, 1), datetime(2020, 12, 31)
+    )
+    assert len(loaded["datetime"]) == 10
+    np.testing.assert_allclose(loaded["close_price"], data["close_price"])
+
+
+def test_save_bar_data_converts_fields(manager):
+    start = DB_TZ.localize(datetime(2020, 1, 2, 9, 31))
+    bars = [
+        BarData(
+            symbol="600000",
+            exchange=Exchange.SSE,
+            datetime=start + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            volume=100,
+            open_price=10,
+            high_price=10,
+            low_price=10,
+            close_price=10 + i,
+            gateway_name="DB",
+        )
+        for i in range(5)
+    ]
+    manager.save_bar_data(bars)
+
+    loaded = manager.load_bar_data(
+        "600000", Exchange.SSE, Interval.MINUTE,
+        datetime(2020, 1, 1), datetime(2020, 12, 31)
+    )
+    assert [bar.close_price for bar in loaded] == [10, 11, 12, 13, 14]
+    assert loaded[0].datetime.replace(tzinfo=None) == start.replace(tzinfo=None)
+    assert loaded[0].interval is Interval.MINUTE
+
+
+def test_bulk_upsert_uses_db_value_and_column_name(db):
+    class Record(ModelBase):
+        key = peewee.CharField(column_name="record_key")
+        stamp = peewee.DateTimeField()
+        value = peewee.FloatField(column_name="record_value")
+
+        class Meta:
+            database = db
+            indexes = ((("key", "stamp"), True),)
+
+    db.create_tables([Record])
+    stamp = datetime(2020, 1, 2, 9, 31)
+    # more rows than one statement may bind on SQLite
+    rows = [(str(i), stamp, float(i)) for i in range(1200)]
+    bulk_upsert(db, Driver.SQLITE, Record, ("key", "stamp", "value"), rows, ("key", "stamp"))
+    bulk_upsert(db, Driver.SQLITE, Record, ("key", "stamp", "value"), [("1", stamp, -1.0)], ("key", "stamp"))
+
+    assert Record.select().count() == 1200
+    record = Record.get(Record.key == "1")
+    assert record.value == -1.0
+    assert record.stamp == stamp
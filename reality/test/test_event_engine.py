@@ -0,0 +1,145 @@
+"""
+Batched dispatch of EventEngine: coalescing, batch handlers and metrics.
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from reality.event import Event, EventEngine, EVENT_TIMER
+
+EVENT_TICK = "eTick."
+EVENT_ORDER = "eOrder."
+
+
+def tick(vt_symbol, price):
+    return Event(EVENT_TICK, SimpleNamespace(vt_symbol=vt_symbol, last_price=price))
+
+
+def order(orderid):
+    return Event(EVENT_ORDER, SimpleNamespace(vt_symbol="600000.SSE", orderid=orderid))
+
+
+def stream():
+    return [
+        tick("600000.SSE", 10.0),
+        tick("000001.SZSE", 20.0),
+        order("1"),
+        tick("600000.SSE", 10.1),
+        order("2"),
+        tick("000001.SZSE", 20.2),
+        tick("600000.SSE", 10.2),
+    ]
+
+
+def label(event):
+    data = event.data
+    return getattr(data, "orderid", None) or "%s@%s" % (data.vt_symbol, data.last_price)
+
+
+class Recorder:
+
+    def __init__(self, engine):
+        self.general = []
+        self.ticks = []
+        self.batches = []
+        engine.register_general(self.on_event)
+        engine.register(EVENT_TICK, lambda event: self.ticks.append(label(event)))
+        engine.register_batch(EVENT_ORDER, self.on_batch)
+        engine.register_batch(EVENT_TICK, self.on_batch)
+
+    def on_event(self, event):
+        # timer events of the engine thread are not recorded
+        if event.type != EVENT_TIMER:
+            self.general.append(label(event))
+
+    def on_batch(self, events):
+        self.batches.append([label(event) for event in events])
+
+
+def drain(engine):
+    events = []
+    while not engine._queue.empty():
+        events.append(engine._queue.get_nowait())
+    return events
+
+
+def test_coalesce_keeps_latest_tick_in_place():
+    engine = EventEngine(batch_size=100, coalesce=(EVENT_TICK,))
+    events = stream()
+    kept = engine._coalesce_events(events)
+    # latest tick of each symbol stays at its own position , orders are untouched
+    assert [label(event) for event in kept] == ["1", "2", "000001.SZSE@20.2", "600000.SSE@10.2"]
+    assert engine._coalesced == 3
+
+
+def test_batch_dispatch_order_and_counters():
+    engine = EventEngine(batch_size=100, coalesce=(EVENT_TICK,))
+    recorder = Recorder(engine)
+    assert np.isnan(engine.metrics()["latency_p50"])
+    for event in stream():
+        engine.put(event)
+    assert engine.metrics()["queue_depth"] == 7
+
+    engine._process_batch(drain(engine))
+    assert recorder.general == ["1", "2", "000001.SZSE@20.2", "600000.SSE@10.2"]
+    assert recorder.ticks == ["000001.SZSE@20.2", "600000.SSE@10.2"]
+    # one call per type after the events are dispatched , in order of first event of type
+    assert recorder.batches == [["1", "2"], ["000001.SZSE@20.2", "600000.SSE@10.2"]]
+
+    metrics = engine.metrics()
+    assert (metrics["queue_depth"], metrics["processed"], metrics["coalesced"], metrics["batches"]) == \
+        (0, 7, 3, 1)
+    assert 0 <= metrics["latency_p50"] <= metrics["latency_p90"] <= metrics["latency_p99"] \
+        <= metrics["latency_max"]
+
+
+def test_unregister_batch_and_no_coalesce():
+    engine = EventEngine(batch_size=100)
+    recorder = Recorder(engine)
+    engine.unregister_batch(EVENT_TICK, recorder.on_batch)
+    for event in stream():
+        engine.put(event)
+    engine._process_batch(drain(engine))
+    # every event is dispatched without coalesce prefixes
+    assert recorder.general == [label(event) for event in stream()]
+    assert recorder.batches == [["1", "2"]]
+    assert engine.metrics()["coalesced"] == 0
+
+
+def test_engine_thread_drains_queue_in_batches():
+    engine = EventEngine(batch_size=100, coalesce=(EVENT_TICK,))
+    recorder = Recorder(engine)
+    for event in stream():
+        engine.put(event)
+    engine.start()
+    try:
+        deadline = time.time() + 5
+        while engine.metrics()["processed"] < 7 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        engine.stop()
+    # events put before start are drained in one batch
+    assert recorder.general == ["1", "2", "000001.SZSE@20.2", "600000.SSE@10.2"]
+    metrics = engine.metrics()
+    assert metrics["coalesced"] == 3
+    assert metrics["processed"] >= 7
+
+
+def test_default_mode_dispatches_one_by_one():
+    engine = EventEngine()
+    recorder = Recorder(engine)
+    engine.unregister_batch(EVENT_ORDER, recorder.on_batch)
+    engine.unregister_batch(EVENT_TICK, recorder.on_batch)
+    for event in stream():
+        engine.put(event)
+    engine.start()
+    try:
+        deadline = time.time() + 5
+        while engine.metrics()["processed"] < 7 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        engine.stop()
+    assert recorder.general == [label(event) for event in stream()]
+    metrics = engine.metrics()
+    assert (metrics["coalesced"], metrics["batches"]) == (0, 0)
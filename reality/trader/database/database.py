@@ -4,6 +4,8 @@ from enum import Enum
 from typing import Optional, Sequence, List, Dict, TYPE_CHECKING
 from pytz import timezone
 
+import numpy as np
+
 from vnpy.trader.setting import SETTINGS
 
 if TYPE_CHECKING:
@@ -13,6 +15,17 @@ if TYPE_CHECKING:
 
 DB_TZ = timezone(SETTINGS["database.timezone"])
 
+# columns of the array based bar api, datetime is naive in DB_TZ
+BAR_ARRAY_FIELDS = (
+    "datetime",
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+    "volume",
+    "open_interest",
+)
+
 
 class Driver(Enum):
     SQLITE = "sqlite"
@@ -126,3 +139,62 @@ class BaseDatabaseManager(ABC):
         delete all records for a symbol
         """
         pass
+
+    def save_bar_arrays(
+        self,
+        symbol: str,
+        exchange: "Exchange",
+        interval: "Interval",
+        data: Dict[str, Sequence],
+    ):
+        """
+        Save columnar bar data, data maps BAR_ARRAY_FIELDS to equal length arrays.
+        Naive datetimes (or datetime64) are taken as database timezone.
+        Default implementation goes through BarData, override for bulk writes.
+        """
+        from vnpy.trader.object import BarData
+
+        dts = np.asarray(data["datetime"], dtype="datetime64[us]").tolist()
+        columns = [np.asarray(data.get(f, np.zeros(len(dts))), dtype=float).tolist()
+                   for f in BAR_ARRAY_FIELDS[1:]]
+        bars = [
+            BarData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=DB_TZ.localize(dt),
+                interval=interval,
+                open_price=o,
+                high_price=h,
+                low_price=low,
+                close_price=c,
+                volume=v,
+                open_interest=oi,
+                gateway_name="DB",
+            )
+            for dt, o, h, low, c, v, oi in zip(dts, *columns)
+        ]
+        self.save_bar_data(bars)
+
+    def load_bar_arrays(
+        self,
+        symbol: str,
+        exchange: "Exchange",
+        interval: "Interval",
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load bar data as columnar numpy arrays keyed by BAR_ARRAY_FIELDS,
+        datetime is datetime64 (naive, database timezone).
+        Default implementation goes through BarData, override for bulk reads.
+        """
+        bars = self.load_bar_data(symbol, exchange, interval, start, end)
+        data = {
+            "datetime": np.array(
+                [bar.datetime.astimezone(DB_TZ).replace(tzinfo=None) for bar in bars],
+                dtype="datetime64[us]"
+            )
+        }
+        for field in BAR_ARRAY_FIELDS[1:]:
+            data[field] = np.array([getattr(bar, field) for bar in bars], dtype=float)
+        return data
@@ -1,6 +1,8 @@
 """"""
 from datetime import datetime
-from typing import List, Dict, Optional, Sequence, Type
+from typing import List, Dict, Optional, Sequence, Tuple, Type
+
+import numpy as np
 
 from peewee import (
     AutoField,
@@ -20,7 +22,12 @@ from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData
 from vnpy.trader.utility import get_file_path
 
-from .database import BaseDatabaseManager, Driver, DB_TZ
+from .database import BaseDatabaseManager, Driver, DB_TZ, BAR_ARRAY_FIELDS
+
+# rows per multi-row INSERT statement
+BULK_CHUNK_SIZE = 1000
+# host parameters per statement of SQLite before 3.32
+SQLITE_MAX_VARIABLES = 999
 
 
 def init(driver: Driver, settings: dict):
@@ -63,6 +70,46 @@ class ModelBase(Model):
         return self.__data__
 
 
+def bulk_upsert(
+    db: Database,
+    driver: Driver,
+    model: Type[Model],
+    fields: Sequence[str],
+    rows: Sequence[Tuple],
+    conflict_target: Sequence[str],
+):
+    """
+    Insert rows (tuples ordered as fields), replace rows on unique conflict.
+
+    Rows go through Model.insert_many in multi-row chunks, so values are
+    converted by field.db_value (datetime, enum) as in save():
+
+    * SQLite: INSERT OR REPLACE, chunks bounded by the variable limit
+    * PostgreSQL: INSERT ... ON CONFLICT (conflict_target) DO UPDATE
+    * others: REPLACE INTO
+    """
+    if not rows:
+        return
+
+    model_fields = [model._meta.fields[f] for f in fields]
+    if driver is Driver.SQLITE:
+        chunk_size = max(1, min(BULK_CHUNK_SIZE, SQLITE_MAX_VARIABLES // len(fields)))
+    else:
+        chunk_size = BULK_CHUNK_SIZE
+
+    with db.atomic():
+        for c in chunked(rows, chunk_size):
+            query = model.insert_many(c, fields=model_fields)
+            if driver is Driver.POSTGRESQL:
+                query = query.on_conflict(
+                    conflict_target=[model._meta.fields[f] for f in conflict_target],
+                    preserve=[f for f in model_fields if f.name not in conflict_target],
+                )
+            else:
+                query = query.on_conflict_replace()
+            query.execute()
+
+
 def init_models(db: Database, driver: Driver):
     class DbBarData(ModelBase):
         """
@@ -137,23 +184,19 @@ def init_models(db: Database, driver: Driver):
             """
             save a list of objects, update if exists.
             """
-            dicts = [i.to_dict() for i in objs]
-            with db.atomic():
-                if driver is Driver.POSTGRESQL:
-                    for bar in dicts:
-                        DbBarData.insert(bar).on_conflict(
-                            update=bar,
-                            conflict_target=(
-                                DbBarData.symbol,
-                                DbBarData.exchange,
-                                DbBarData.interval,
-                                DbBarData.datetime,
-                            ),
-                        ).execute()
-                else:
-                    for c in chunked(dicts, 50):
-                        DbBarData.insert_many(
-                            c).on_conflict_replace().execute()
+            fields = [f for f in DbBarData._meta.sorted_field_names if f != "id"]
+            rows = [tuple(i.to_dict().get(f) for f in fields) for i in objs]
+            DbBarData.save_rows(fields, rows)
+
+        @staticmethod
+        def save_rows(fields: Sequence[str], rows: Sequence[Tuple]):
+            """
+            save rows (tuples ordered as fields), update if exists.
+            """
+            bulk_upsert(
+                db, driver, DbBarData, fields, rows,
+                ("symbol", "exchange", "interval", "datetime")
+            )
 
     class DbTickData(ModelBase):
         """
@@ -315,21 +358,19 @@ def init_models(db: Database, driver: Driver):
 
         @staticmethod
         def save_all(objs: List["DbTickData"]):
-            dicts = [i.to_dict() for i in objs]
-            with db.atomic():
-                if driver is Driver.POSTGRESQL:
-                    for tick in dicts:
-                        DbTickData.insert(tick).on_conflict(
-                            update=tick,
-                            conflict_target=(
-                                DbTickData.symbol,
-                                DbTickData.exchange,
-                                DbTickData.datetime,
-                            ),
-                        ).execute()
-                else:
-                    for c in chunked(dicts, 50):
-                        DbTickData.insert_many(c).on_conflict_replace().execute()
+            fields = [f for f in DbTickData._meta.sorted_field_names if f != "id"]
+            rows = [tuple(i.to_dict().get(f) for f in fields) for i in objs]
+            DbTickData.save_rows(fields, rows)
+
+        @staticmethod
+        def save_rows(fields: Sequence[str], rows: Sequence[Tuple]):
+            """
+            save rows (tuples ordered as fields), update if exists.
+            """
+            bulk_upsert(
+                db, driver, DbTickData, fields, rows,
+                ("symbol", "exchange", "datetime")
+            )
 
     db.connect()
     db.create_tables([DbBarData, DbTickData])
@@ -390,6 +431,58 @@ class SqlManager(BaseDatabaseManager):
         ds = [self.class_tick.from_tick(i) for i in datas]
         self.class_tick.save_all(ds)
 
+    def save_bar_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        data: Dict[str, Sequence],
+    ):
+        """
+        Bulk save columnar bar data without building BarData/model objects.
+        """
+        dts = np.asarray(data["datetime"], dtype="datetime64[us]").tolist()
+        n = len(dts)
+        columns = [np.asarray(data.get(f, np.zeros(n)), dtype=float).tolist()
+                   for f in BAR_ARRAY_FIELDS[1:]]
+
+        fields = ("symbol", "exchange", "interval") + BAR_ARRAY_FIELDS
+        key = (symbol, exchange.value, interval.value)
+        rows = [key + row for row in zip(dts, *columns)]
+        self.class_bar.save_rows(fields, rows)
+
+    def load_bar_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load bar data as columnar numpy arrays without building BarData objects.
+        """
+        s = (
+            self.class_bar.select(
+                *[getattr(self.class_bar, f) for f in BAR_ARRAY_FIELDS]
+            )
+            .where(
+                (self.class_bar.symbol == symbol)
+                & (self.class_bar.exchange == exchange.value)
+                & (self.class_bar.interval == interval.value)
+                & (self.class_bar.datetime >= start)
+                & (self.class_bar.datetime <= end)
+            )
+            .order_by(self.class_bar.datetime)
+            .tuples()
+        )
+
+        columns = list(zip(*s)) or [()] * len(BAR_ARRAY_FIELDS)
+        data = {"datetime": np.array(columns[0], dtype="datetime64[us]")}
+        for field, column in zip(BAR_ARRAY_FIELDS[1:], columns[1:]):
+            data[field] = np.array(column, dtype=float)
+        return data
+
     def get_newest_bar_data(
         self, symbol: str, exchange: "Exchange", interval: "Interval"
     ) -> Optional["BarData"]:
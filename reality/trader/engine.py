@@ -12,10 +12,14 @@ from queue import Empty, Queue
 from threading import Thread
 from typing import Any, Sequence, Type, Dict, List, Optional
 
-from vnpy.event import Event, EventEngine
+from pytz import timezone
+
+from ..event import Event, EventEngine
 from .app import BaseApp
 from .event import (
+    EVENT_TIMER,
     EVENT_TICK,
+    EVENT_BAR,
     EVENT_ORDER,
     EVENT_TRADE,
     EVENT_POSITION,
@@ -40,7 +44,7 @@ from .object import (
     Exchange
 )
 from .setting import SETTINGS
-from .utility import get_folder_path, TRADER_DIR
+from .utility import get_folder_path, TRADER_DIR, BarAggregator
 
 
 class MainEngine:
@@ -564,3 +568,75 @@ class EmailEngine(BaseEngine):
 
         self.active = False
         self.thread.join()
+
+
+class BarEngine(BaseEngine):
+    """
+    Aggregates batches of ticks of all symbols into minute and x minute bars.
+
+    Completed bars are put into event engine in batches, one event per
+    window with type EVENT_BAR + "1m" / EVENT_BAR + "5m" ..., event data is
+    the dict of arrays produced by BarAggregator plus the vt_symbols table.
+
+    Tick timestamps are naive datetime64 of wall clock in tz (the timezone
+    of TickData.datetime of gateways).
+    """
+
+    def __init__(
+        self,
+        main_engine: MainEngine,
+        event_engine: EventEngine,
+        windows: Sequence[int] = (5, 15, 30),
+        tz: str = "Asia/Shanghai"
+    ):
+        """"""
+        super(BarEngine, self).__init__(main_engine, event_engine, "bar")
+
+        self.tz = timezone(tz)
+        self.vt_symbols: List[str] = []
+        self.sids: Dict[str, int] = {}
+        self.aggregator: BarAggregator = BarAggregator(self.put_bars, windows)
+
+        self.add_function()
+        self.register_event()
+
+    def add_function(self) -> None:
+        """Add bar function to main engine."""
+        self.main_engine.get_sid = self.get_sid
+        self.main_engine.update_ticks = self.update_ticks
+
+    def register_event(self) -> None:
+        """"""
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+
+    def process_timer_event(self, event: Event) -> None:
+        """
+        Complete minute bars of symbols which have no tick in current minute.
+        """
+        self.aggregator.flush(datetime.now(self.tz).replace(tzinfo=None))
+
+    def get_sid(self, vt_symbol: str) -> int:
+        """
+        Get integer id of vt_symbol used in tick batches.
+        """
+        sid = self.sids.get(vt_symbol, None)
+        if sid is None:
+            sid = self.sids[vt_symbol] = len(self.vt_symbols)
+            self.vt_symbols.append(vt_symbol)
+        return sid
+
+    def update_ticks(self, sid, timestamp, price, volume) -> None:
+        """
+        Update a batch of ticks (arrays of sid, datetime64, last price, cumulative volume).
+        """
+        self.aggregator.update_ticks(sid, timestamp, price, volume)
+
+    def put_bars(self, window: int, bars: Dict) -> None:
+        """"""
+        # snapshot of symbol table, the table keeps growing with new symbols
+        payload = dict(bars, vt_symbols=tuple(self.vt_symbols))
+        self.event_engine.put(Event(EVENT_BAR + f"{window}m", payload))
+
+    def close(self) -> None:
+        """"""
+        self.aggregator.flush()
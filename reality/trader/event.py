@@ -2,9 +2,10 @@
 Event type string used in VN Trader.
 """
 
-from vnpy.event import EVENT_TIMER  # noqa
+from ..event import EVENT_TIMER  # noqa
 
 EVENT_TICK = "eTick."
+EVENT_BAR = "eBar."
 EVENT_TRADE = "eTrade."
 EVENT_ORDER = "eOrder."
 EVENT_POSITION = "ePosition."
@@ -6,7 +6,7 @@ import json
 import logging
 import sys
 from pathlib import Path
-from typing import Callable, Dict, Tuple, Union, Optional
+from typing import Callable, Dict, Iterable, Tuple, Union, Optional
 from decimal import Decimal
 from math import floor, ceil
 
@@ -319,6 +319,228 @@ class BarGenerator:
         return bar
 
 
+class _OhlcvReducer(object):
+    """
+    Vectorized OHLCV aggregation state of many symbols for one bar size.
+
+    Rows (sid, bucket, ohlcv) are grouped by (sid, bucket) with reduceat,
+    merged with the pending bar of every sid and completed bars are returned.
+    A bar is completed when a later bucket of the same sid arrives, or at once
+    if one of its rows is flagged as closing.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self.active: np.ndarray = np.zeros(0, dtype=bool)
+        self.bucket: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.ohlcv: np.ndarray = np.zeros((5, 0))
+
+    def _reserve(self, n: int) -> None:
+        capacity = len(self.bucket)
+        if n <= capacity:
+            return
+        extra = max(n - capacity, capacity, 64)
+        self.active = np.r_[self.active, np.zeros(extra, dtype=bool)]
+        self.bucket = np.r_[self.bucket, np.full(extra, -1, dtype=np.int64)]
+        self.ohlcv = np.c_[self.ohlcv, np.zeros((5, extra))]
+
+    def update(
+        self,
+        sid: np.ndarray,
+        bucket: np.ndarray,
+        ohlcv: np.ndarray,
+        closing: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return completed (sid, bucket, ohlcv) sorted by bucket then sid.
+        """
+        if not len(sid):
+            return sid, bucket, ohlcv
+        self._reserve(int(sid.max()) + 1)
+        if closing is None:
+            closing = np.zeros(len(sid), dtype=bool)
+
+        order = np.lexsort((bucket, sid))
+        sid, bucket, ohlcv, closing = sid[order], bucket[order], ohlcv[:, order], closing[order]
+
+        # drop rows older than the pending (or already completed) bar
+        pending = self.bucket[sid]
+        late = (bucket < pending) | ((bucket == pending) & ~self.active[sid])
+        if late.any():
+            keep = ~late
+            sid, bucket, ohlcv, closing = sid[keep], bucket[keep], ohlcv[:, keep], closing[keep]
+            if not len(sid):
+                return sid, bucket, ohlcv
+
+        change = (sid[1:] != sid[:-1]) | (bucket[1:] != bucket[:-1])
+        starts = np.r_[0, np.flatnonzero(change) + 1]
+        ends = np.r_[starts[1:], len(sid)] - 1
+
+        g_sid = sid[starts]
+        g_bucket = bucket[starts]
+        g_ohlcv = np.vstack([
+            ohlcv[0, starts],
+            np.maximum.reduceat(ohlcv[1], starts),
+            np.minimum.reduceat(ohlcv[2], starts),
+            ohlcv[3, ends],
+            np.add.reduceat(ohlcv[4], starts)
+        ])
+        g_closing = np.logical_or.reduceat(closing, starts)
+
+        first = np.r_[True, g_sid[1:] != g_sid[:-1]]
+        last = np.r_[g_sid[1:] != g_sid[:-1], True]
+
+        # continue the pending bar of a sid
+        merge = first & self.active[g_sid] & (g_bucket == self.bucket[g_sid])
+        if merge.any():
+            m_sid = g_sid[merge]
+            state = self.ohlcv[:, m_sid]
+            g_ohlcv[0, merge] = state[0]
+            g_ohlcv[1, merge] = np.maximum(g_ohlcv[1, merge], state[1])
+            g_ohlcv[2, merge] = np.minimum(g_ohlcv[2, merge], state[2])
+            g_ohlcv[4, merge] += state[4]
+
+        # pending bars superseded by a later bucket are completed
+        superseded = first & self.active[g_sid] & (g_bucket > self.bucket[g_sid])
+        s_sid = g_sid[superseded]
+
+        done = ~last | g_closing
+        out_sid = np.r_[s_sid, g_sid[done]]
+        out_bucket = np.r_[self.bucket[s_sid], g_bucket[done]]
+        out_ohlcv = np.c_[self.ohlcv[:, s_sid], g_ohlcv[:, done]]
+
+        l_sid = g_sid[last]
+        self.bucket[l_sid] = g_bucket[last]
+        self.ohlcv[:, l_sid] = g_ohlcv[:, last]
+        self.active[l_sid] = ~g_closing[last]
+
+        order = np.lexsort((out_sid, out_bucket))
+        return out_sid[order], out_bucket[order], out_ohlcv[:, order]
+
+    def flush(self, bucket: int = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Complete pending bars older than bucket (all pending bars if None).
+        """
+        mask = self.active.copy()
+        if bucket is not None:
+            mask &= self.bucket < bucket
+        sid = np.flatnonzero(mask)
+        self.active[sid] = False
+
+        order = np.lexsort((sid, self.bucket[sid]))
+        sid = sid[order]
+        return sid, self.bucket[sid], self.ohlcv[:, sid]
+
+
+class BarAggregator:
+    """
+    For:
+    1. generating 1 minute bar data of many symbols from batches of ticks
+    2. generating x minute bar data from those 1 minute bars
+
+    Notice:
+    1. symbols are integer ids (row of the caller's symbol table)
+    2. tick volume is the cumulative intraday volume, as in BarGenerator
+    3. completed bars are passed to on_bars(window, bars) in batches, bars is
+       a dict of arrays: sid, datetime (bar start), open_price, high_price,
+       low_price, close_price, volume; window is 1 for minute bars
+    4. for x minute bar, x must be able to divide 60: 2, 3, 5, 6, 10, 15, 20, 30
+    """
+
+    def __init__(self, on_bars: Callable, windows: Iterable[int] = ()):
+        """Constructor"""
+        self.on_bars: Callable = on_bars
+        self.windows: Tuple[int, ...] = tuple(windows)
+
+        self.last_volume: np.ndarray = np.zeros(0)
+        self.minute_reducer: _OhlcvReducer = _OhlcvReducer()
+        self.window_reducers: Dict[int, _OhlcvReducer] = {
+            window: _OhlcvReducer() for window in self.windows
+        }
+
+    def update_ticks(
+        self,
+        sid: np.ndarray,
+        timestamp: np.ndarray,
+        price: np.ndarray,
+        volume: np.ndarray
+    ) -> None:
+        """
+        Update a batch of ticks, timestamp is datetime64 (or epoch nanoseconds).
+        """
+        sid = np.asarray(sid, dtype=np.int64)
+        price = np.asarray(price, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        nanosecond = np.asarray(timestamp).astype("datetime64[ns]").astype(np.int64)
+
+        # Filter tick data with 0 last price
+        valid = price > 0
+        if not valid.all():
+            sid, nanosecond, price, volume = sid[valid], nanosecond[valid], price[valid], volume[valid]
+        if not len(sid):
+            return
+
+        # cumulative volume to per tick volume, first tick of a sid adds nothing
+        n = int(sid.max()) + 1
+        if n > len(self.last_volume):
+            self.last_volume = np.r_[self.last_volume, np.full(n - len(self.last_volume), np.nan)]
+
+        order = np.lexsort((nanosecond, sid))
+        sid, nanosecond, price, volume = sid[order], nanosecond[order], price[order], volume[order]
+        minute = nanosecond // 60000000000
+        first = np.r_[True, sid[1:] != sid[:-1]]
+        previous = np.r_[np.nan, volume[:-1]]
+        previous[first] = self.last_volume[sid[first]]
+        change = np.nan_to_num(np.clip(volume - previous, 0, None))
+        last = np.r_[sid[1:] != sid[:-1], True]
+        self.last_volume[sid[last]] = volume[last]
+
+        ohlcv = np.vstack([price, price, price, price, change])
+        self._publish(*self.minute_reducer.update(sid, minute, ohlcv))
+
+    def flush(self, timestamp: np.datetime64 = None) -> None:
+        """
+        Complete minute bars older than the minute of timestamp (all if None),
+        e.g. on timer events so that illiquid symbols still produce bars.
+        """
+        minute = None
+        if timestamp is not None:
+            minute = int(np.datetime64(timestamp, "m").astype(np.int64))
+        self._publish(*self.minute_reducer.flush(minute))
+
+        if timestamp is None:
+            for window, reducer in self.window_reducers.items():
+                w_sid, w_bucket, w_ohlcv = reducer.flush()
+                if len(w_sid):
+                    self.on_bars(window, self._to_bars(w_sid, w_bucket * window, w_ohlcv))
+
+    def _publish(self, sid: np.ndarray, minute: np.ndarray, ohlcv: np.ndarray) -> None:
+        """
+        Push completed minute bars to callback and into the window reducers.
+        """
+        if not len(sid):
+            return
+        self.on_bars(1, self._to_bars(sid, minute, ohlcv))
+
+        for window, reducer in self.window_reducers.items():
+            closing = (minute + 1) % window == 0
+            w_sid, w_bucket, w_ohlcv = reducer.update(sid, minute // window, ohlcv, closing)
+            if len(w_sid):
+                self.on_bars(window, self._to_bars(w_sid, w_bucket * window, w_ohlcv))
+
+    @staticmethod
+    def _to_bars(sid: np.ndarray, minute: np.ndarray, ohlcv: np.ndarray) -> Dict[str, np.ndarray]:
+        return {
+            "sid": sid,
+            "datetime": minute.astype("datetime64[m]"),
+            "open_price": ohlcv[0],
+            "high_price": ohlcv[1],
+            "low_price": ohlcv[2],
+            "close_price": ohlcv[3],
+            "volume": ohlcv[4],
+        }
+
+
 class ArrayManager(object):
     """
     For:
@@ -830,6 +1052,267 @@ class ArrayManager(object):
         return result[-1]
 
 
+BAR_FIELDS: Tuple[str, ...] = ("open", "high", "low", "close", "volume", "open_interest")
+
+
+class RingArrayManager(ArrayManager):
+    """
+    For:
+    1. time series container of bar data with O(1) bar update
+    2. calculating technical indicator value (same api as ArrayManager)
+
+    Notice:
+    1. every value is written twice (slot and slot + size), so the latest
+       window is always the contiguous view buffer[:, cursor: cursor + size]
+    2. properties return views into the buffer, copy them before keeping
+    """
+
+    def __init__(self, size: int = 100):
+        """Constructor"""
+        self.count: int = 0
+        self.size: int = size
+        self.inited: bool = False
+
+        self.cursor: int = 0
+        self.buffer: np.ndarray = np.zeros((len(BAR_FIELDS), 2 * size))
+
+    def update_bar(self, bar: BarData) -> None:
+        """
+        Update new bar data into array manager.
+        """
+        self.count += 1
+        if not self.inited and self.count >= self.size:
+            self.inited = True
+
+        values = (
+            bar.open_price,
+            bar.high_price,
+            bar.low_price,
+            bar.close_price,
+            bar.volume,
+            bar.open_interest
+        )
+        self.buffer[:, self.cursor] = values
+        self.buffer[:, self.cursor + self.size] = values
+        self.cursor = (self.cursor + 1) % self.size
+
+    def _window(self, field: int) -> np.ndarray:
+        """
+        Get contiguous view of the latest size values of field.
+        """
+        return self.buffer[field, self.cursor: self.cursor + self.size]
+
+    @property
+    def open(self) -> np.ndarray:
+        """
+        Get open price time series.
+        """
+        return self._window(0)
+
+    @property
+    def high(self) -> np.ndarray:
+        """
+        Get high price time series.
+        """
+        return self._window(1)
+
+    @property
+    def low(self) -> np.ndarray:
+        """
+        Get low price time series.
+        """
+        return self._window(2)
+
+    @property
+    def close(self) -> np.ndarray:
+        """
+        Get close price time series.
+        """
+        return self._window(3)
+
+    @property
+    def volume(self) -> np.ndarray:
+        """
+        Get trading volume time series.
+        """
+        return self._window(4)
+
+    @property
+    def open_interest(self) -> np.ndarray:
+        """
+        Get open interest time series.
+        """
+        return self._window(5)
+
+    # keep attribute access of ArrayManager working
+    open_array = open
+    high_array = high
+    low_array = low
+    close_array = close
+    volume_array = volume
+    open_interest_array = open_interest
+
+
+class SymbolArrayManager(RingArrayManager):
+    """
+    Per symbol view into MultiArrayManager, created by MultiArrayManager.get.
+    Nothing is copied, indicator methods read the shared 2-D block.
+    """
+
+    def __init__(self, manager: "MultiArrayManager", vt_symbol: str, row: int):
+        """Constructor"""
+        self.manager: MultiArrayManager = manager
+        self.vt_symbol: str = vt_symbol
+        self.row: int = row
+        self.size: int = manager.size
+
+    @property
+    def count(self) -> int:
+        return int(self.manager.count[self.row])
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.size
+
+    @property
+    def cursor(self) -> int:
+        return int(self.manager.cursor[self.row])
+
+    @property
+    def buffer(self) -> np.ndarray:
+        # looked up lazily, the block is reallocated when symbols are added
+        return self.manager.buffer[:, self.row]
+
+    def update_bar(self, bar: BarData) -> None:
+        """
+        Update new bar data into the shared block.
+        """
+        assert bar.vt_symbol == self.vt_symbol, \
+            f"bar of {bar.vt_symbol} is updated into view of {self.vt_symbol}"
+        self.manager.update_bar(bar)
+
+
+class MultiArrayManager(object):
+    """
+    For:
+    1. time series container of bar data for many symbols in one 2-D block
+    2. batched O(1) updates from tick/bar fan-in (e.g. BarGenerator callbacks)
+
+    Notice:
+    1. buffer layout is (field, symbol, 2 * size), see RingArrayManager
+    2. use get(vt_symbol) to calculate indicators of a single symbol
+    """
+
+    def __init__(self, vt_symbols: Iterable[str] = (), size: int = 100):
+        """Constructor"""
+        self.size: int = size
+        self.symbols: Dict[str, int] = {}
+
+        self.buffer: np.ndarray = np.zeros((len(BAR_FIELDS), 0, 2 * size))
+        self.cursor: np.ndarray = np.zeros(0, dtype=int)
+        self.count: np.ndarray = np.zeros(0, dtype=int)
+
+        self.add_symbols(vt_symbols)
+
+    def add_symbols(self, vt_symbols: Iterable[str]) -> None:
+        """
+        Register symbols, the block grows by doubling.
+        """
+        for vt_symbol in vt_symbols:
+            if vt_symbol in self.symbols:
+                continue
+            row = len(self.symbols)
+            capacity = self.buffer.shape[1]
+            if row >= capacity:
+                extra = max(capacity, 8)
+                self.buffer = np.concatenate(
+                    [self.buffer, np.zeros((len(BAR_FIELDS), extra, 2 * self.size))],
+                    axis=1
+                )
+                self.cursor = np.concatenate([self.cursor, np.zeros(extra, dtype=int)])
+                self.count = np.concatenate([self.count, np.zeros(extra, dtype=int)])
+            self.symbols[vt_symbol] = row
+
+    def get(self, vt_symbol: str) -> SymbolArrayManager:
+        """
+        Get ArrayManager compatible view of one symbol.
+        """
+        self.add_symbols([vt_symbol])
+        return SymbolArrayManager(self, vt_symbol, self.symbols[vt_symbol])
+
+    def update_bar(self, bar: BarData) -> None:
+        """
+        Update new bar data of one symbol.
+        """
+        self.update_bars([bar])
+
+    def update_bars(self, bars: Iterable[BarData]) -> None:
+        """
+        Update a batch of bar data in one vectorized write.
+        """
+        bars = list(bars)
+        if not bars:
+            return
+        self.add_symbols(bar.vt_symbol for bar in bars)
+
+        rows = np.array([self.symbols[bar.vt_symbol] for bar in bars])
+        values = np.array([
+            (
+                bar.open_price,
+                bar.high_price,
+                bar.low_price,
+                bar.close_price,
+                bar.volume,
+                bar.open_interest
+            )
+            for bar in bars
+        ]).T
+        self.update_arrays(rows, *values)
+
+    def update_arrays(
+        self,
+        rows: np.ndarray,
+        open_price: np.ndarray,
+        high_price: np.ndarray,
+        low_price: np.ndarray,
+        close_price: np.ndarray,
+        volume: np.ndarray,
+        open_interest: np.ndarray
+    ) -> None:
+        """
+        Update columnar bar data, rows are the symbol rows (see symbols).
+        Repeated rows are written in order of appearance.
+        """
+        rows = np.asarray(rows, dtype=int)
+        if not len(rows):
+            return
+        values = np.vstack([open_price, high_price, low_price, close_price, volume, open_interest])
+
+        # rank of each row among its duplicates, one vectorized write per rank
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_rows)) + 1]
+        rank = np.empty(len(rows), dtype=int)
+        rank[order] = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+
+        for level in range(rank.max() + 1):
+            mask = rank == level
+            batch = rows[mask]
+            pos = self.cursor[batch]
+            self.buffer[:, batch, pos] = values[:, mask]
+            self.buffer[:, batch, pos + self.size] = values[:, mask]
+            self.cursor[batch] = (pos + 1) % self.size
+            self.count[batch] += 1
+
+    def array(self, field: str) -> np.ndarray:
+        """
+        Get (symbol, size) copy of the latest window of field for all symbols.
+        """
+        n = len(self.symbols)
+        idx = self.cursor[:n, None] + np.arange(self.size)
+        return np.take_along_axis(self.buffer[BAR_FIELDS.index(field), :n], idx, axis=1)
+
+
 def virtual(func: Callable) -> Callable:
     """
     mark a function as "virtual", which means that this function can be override.
@@ -2,7 +2,7 @@ from typing import Any, Dict, List
 from datetime import datetime
 
 from vnpy.api.xtp import MdApi, TdApi
-from vnpy.event import EventEngine
+from .event import EventEngine
 from vnpy.trader.event import EVENT_TIMER
 from vnpy.trader.constant import (
     Exchange,
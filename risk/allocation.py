@@ -5,6 +5,7 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
+import numpy as np
 from abc import ABC, abstractmethod
 from gateway.driver.data_portal import portal
 from util.math_utils import measure_volatity
@@ -18,6 +19,15 @@ class CapitalUsage(ABC):
     def compute(self, assets, capital, dts):
         raise NotImplementedError
 
+    def weights(self, selected, panel):
+        """
+            vectorized allocation of trade.vectorized.VectorizedBacktest
+        :param selected: bool DataFrame index --- sessions , columns --- sid
+        :param panel: dict field -> adjusted DataFrame (sessions plus lookback , sid)
+        :return: DataFrame of weights aligned with selected , rows sum to 1 (0 if nothing selected)
+        """
+        raise NotImplementedError('%s has no vectorized allocation' % type(self).__name__)
+
 
 class Equal(CapitalUsage):
 
@@ -25,6 +35,11 @@ class Equal(CapitalUsage):
         mappings = {asset: capital / len(assets) for asset in assets}
         return mappings
 
+    def weights(self, selected, panel):
+        selected = selected.astype(float)
+        counts = selected.sum(axis=1).replace(0, np.nan)
+        return selected.div(counts, axis=0).fillna(0.0)
+
 
 class Turtle(CapitalUsage):
     """
@@ -41,6 +56,9 @@ class Turtle(CapitalUsage):
         return self._window
 
     def handle_data(self, assets, dt):
+        context = portal.get_session_context(dt)
+        if context is not None:
+            return context.history(assets, self.window, ['open', 'high', 'low', 'close', 'volume'])
         his = portal.get_history_window(
                                assets,
                                dt,
@@ -68,6 +86,27 @@ class Turtle(CapitalUsage):
             output = {assets[0]: capital}
         return output
 
+    def weights(self, selected, panel):
+        """
+            volatility of (high - low) over the window before session (as handle_data) ; weights
+            of 1 - x / aggregate are normalized so that capital is not over allocated
+        """
+        amplitude = panel['high'] - panel['low']
+        volatility = amplitude.rolling(self.window, min_periods=2).std().shift(1)
+        volatility = volatility.reindex(index=selected.index, columns=selected.columns)
+        # assets without history share the mean volatility of the session
+        volatility = volatility.where(selected)
+        volatility = volatility.T.fillna(volatility.mean(axis=1)).T.where(selected)
+        aggregate = volatility.sum(axis=1).replace(0, np.nan)
+        # zero aggregate means equal weights
+        raw = (1 - volatility.div(aggregate, axis=0).fillna(0.0)).where(selected)
+        # a single asset takes the whole capital
+        single = selected.sum(axis=1) == 1
+        raw[single] = selected[single].astype(float)
+        raw = raw.fillna(0.0)
+        totals = raw.sum(axis=1).replace(0, np.nan)
+        return raw.div(totals, axis=0).fillna(0.0)
+
 
 class Kelly(CapitalUsage):
 
@@ -14,6 +14,8 @@ from finance.restrictions import StatusRestrictions, DataBoundsRestrictions
 from finance.control import NetLeverage
 # pipe engine
 from pipe.pipeline import Pipeline
+from pipe.engine import SimplePipelineEngine
+from pipe.final import Final
 # risk management
 from risk.allocation import Turtle
 from risk.alert import PositionLossRisk
@@ -21,6 +23,8 @@ from risk.fuse import Fuse
 # metric module
 from algorithm import TradingAlgorithm
 from trade.params import create_simulation_parameters
+from trade.vectorized import VectorizedBacktest
+from util.profiling import tracer, profile
 
 
 def run_algorithm(start=None,
@@ -40,7 +44,10 @@ def run_algorithm(start=None,
                   restricted_rules=[StatusRestrictions(), DataBoundsRestrictions()],
                   risk_alert_policy=PositionLossRisk(0.1),
                   risk_fuse_policy=Fuse(0.85),
-                  metrics_set=None
+                  metrics_set=None,
+                  trace=None,
+                  profiler=None,
+                  profile_output=None
                   ):
     """
         Run a backtest for the given algorithm
@@ -83,6 +90,12 @@ def run_algorithm(start=None,
         used to handle portfolio when portfolio value is less than threshold
     metrics_set : iterable[Metric] or str, optional
         The set of metric to compute in the ArkQuant. If a string is passed,
+    trace : str , optional
+        json path to export timing of spans and counters (pipeline , broker , blotter , ledger , metrics)
+    profiler : {None, 'cprofile', 'pyinstrument'}
+        capture a profile of the run
+    profile_output : str , optional
+        pstats dump (cprofile) or html (pyinstrument) path , None prints the profile
     # default_extension : bool, optional
     #     Should the default zipline extension be loaded. This is found at
     #     ``$ZIPLINE_ROOT/extension.py``
@@ -144,7 +157,16 @@ def run_algorithm(start=None,
     # set account models
     # trading.set_net_leverage(1.3)
     # run algorithm
-    analysis = trading.run()
+    if trace:
+        tracer.reset()
+        tracer.enable()
+    try:
+        with profile(profiler, profile_output):
+            analysis = trading.run()
+    finally:
+        if trace:
+            tracer.disable()
+            tracer.to_json(trace)
     print('analysis', analysis)
     # analysis_path = '/Users/python/Library/Mobile Documents/com~apple~CloudDocs/ArkQuant/metric/temp.json'
     # with open(analysis_path, 'w+') as f:
@@ -152,6 +174,44 @@ def run_algorithm(start=None,
     # analysis.to_pickle(output)
 
 
+def run_vectorized(start=None,
+                   end=None,
+                   capital_base=None,
+                   benchmark=None,
+                   pipelines=None,
+                   commission=Commission(),
+                   allocation_policy=Turtle(5),
+                   restricted_rules=[StatusRestrictions(), DataBoundsRestrictions()],
+                   holding_period=1,
+                   pipeline_chunk_size=None,
+                   metrics_set=None):
+    """
+        screen pipelines with the vectorized backtest (trade.vectorized) instead of the event
+        driven simulation , parameters are the same as run_algorithm
+
+    Returns
+    -------
+    packets : list of MetricsTracker packets , the last one is the simulation end packet
+    """
+    sim_params = create_simulation_parameters(
+                                            start=start,
+                                            end=end,
+                                            delay=None,
+                                            capital_base=capital_base,
+                                            loan_base=None,
+                                            per_capital=None,
+                                            data_frequency='daily',
+                                            benchmark=benchmark)
+    engine = SimplePipelineEngine(pipelines, Final(), restricted_rules, chunk_size=pipeline_chunk_size)
+    selections = engine.compute_selections(list(sim_params.sessions))
+    backtest = VectorizedBacktest(sim_params,
+                                  allocation=allocation_policy,
+                                  commission=commission,
+                                  holding_period=holding_period,
+                                  metrics_set=metrics_set)
+    return backtest.transform(selections)
+
+
 if __name__ == '__main__':
 
     run_algorithm()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Feb 16 14:00:14 2019
+
+@author: python
+"""
+import importlib, pkgutil, threading
+from importlib import metadata as _metadata
+
+# third party signals --- setup(entry_points={'arkquant.signals': ['name = package.module:Class']})
+ENTRY_POINT_GROUP = 'arkquant.signals'
+
+
+class SignalRegistry(object):
+    """
+        registry of signal classes used by pipe.term.Term
+
+        script name --- module of strat package (e.g. 'cross' -> strat.cross.Cross) or entry point ;
+        modules are imported lazily on first lookup and cached (byte-code cached by python import
+        system) , so terms with the same script never reload the source.
+    """
+    def __init__(self, package='strat', group=ENTRY_POINT_GROUP):
+        self.package = package
+        self.group = group
+        self._signals = dict()
+        self._entry_points = None
+        self._lock = threading.Lock()
+
+    def _discover_entry_points(self):
+        if self._entry_points is None:
+            try:
+                eps = _metadata.entry_points()
+                eps = eps.select(group=self.group) if hasattr(eps, 'select') else eps.get(self.group, [])
+            except Exception:
+                eps = []
+            self._entry_points = {ep.name: ep for ep in eps}
+        return self._entry_points
+
+    def scripts(self):
+        """
+            available script names --- modules of package and entry points (not imported)
+        """
+        package = importlib.import_module(self.package)
+        names = {name for _, name, is_pkg in pkgutil.iter_modules(package.__path__)
+                 if not is_pkg and not name.startswith('_') and name != 'registry'}
+        return sorted(names | set(self._discover_entry_points()) | set(self._signals))
+
+    def register(self, script, logic):
+        """
+            register signal class explicitly , e.g. strategies defined out of strat package
+        """
+        self._signals[script] = logic
+        return logic
+
+    def _load(self, script):
+        entry_points = self._discover_entry_points()
+        if script in entry_points:
+            return entry_points[script].load()
+        module = importlib.import_module('%s.%s' % (self.package, script))
+        logic = getattr(module, script.capitalize())
+        if not isinstance(logic, type):
+            raise AttributeError('%s is not a signal class' % script.capitalize())
+        return logic
+
+    def get(self, script):
+        try:
+            return self._signals[script]
+        except KeyError:
+            with self._lock:
+                if script not in self._signals:
+                    try:
+                        self._signals[script] = self._load(script)
+                    except (ImportError, AttributeError) as e:
+                        raise ValueError('signal %s is not registered due to %s' % (script, e))
+                return self._signals[script]
+
+    def warm_up(self, scripts=None):
+        """
+            import signals ahead --- before forking workers of a sweep so that they inherit modules
+        :param scripts: list of script names , None means all scripts
+        :return: dict script -> signal class
+        """
+        if scripts is not None:
+            return {script: self.get(script) for script in scripts}
+        signals = dict()
+        for script in self.scripts():
+            try:
+                signals[script] = self.get(script)
+            except ValueError:
+                # helper modules of strat (e.g. filter , tseries) define no signal
+                pass
+        return signals
+
+    def __contains__(self, script):
+        return script in self._signals
+
+    def __len__(self):
+        return len(self._signals)
+
+
+registry = SignalRegistry()
+
+
+__all__ = ['SignalRegistry', 'registry']
@@ -8,6 +8,7 @@ Created on Tue Mar 12 15:37:47 2019
 BEFORE_TRADING_START = 1
 SESSION_START = 2
 SESSION_END = 3
+MINUTE_END = 4
 
 MAX_MONTH_RANGE = 23
 MAX_WEEK_RANGE = 5
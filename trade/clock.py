@@ -5,22 +5,41 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-import pandas as pd
+import numpy as np, pandas as pd
 from _calendar.trading_calendar import calendar
 from trade import (
     SESSION_START,
     SESSION_END,
+    MINUTE_END,
     BEFORE_TRADING_START
 )
 
+# minutes of session relative to midnight --- 9:30 - 11:30 , 13:00 - 15:00
+_MINUTE_OFFSETS = np.concatenate([
+    np.arange(9 * 60 + 30, 11 * 60 + 31),
+    np.arange(13 * 60, 15 * 60 + 1)
+]).astype('timedelta64[m]')
+
 
 class MinuteSimulationClock(object):
 
-    # before trading  , session start , session end 三个阶段
-    def __init__(self, sim_params):
+    # before trading  , session start , (minute end) , session end 阶段
+    def __init__(self, sim_params, minute_emission=False):
 
         self.sessions_nanos = sim_params.sessions
         self.trading_o_and_c = calendar.open_and_close_for_session(self.sessions_nanos)
+        # emit every trading minute between session start and session end
+        self.minute_emission = minute_emission
+
+    @staticmethod
+    def session_minutes(session_label, market_close=None):
+        """
+            precomputed minute index of session , truncated by market close (circuit breaker)
+        """
+        minutes = np.datetime64(pd.Timestamp(session_label).strftime('%Y-%m-%d'), 'm') + _MINUTE_OFFSETS
+        if market_close is not None:
+            minutes = minutes[:np.searchsorted(minutes, np.datetime64(market_close, 'm'), side='right')]
+        return pd.DatetimeIndex(minutes)
 
     def __iter__(self):
         """
@@ -32,5 +51,8 @@ class MinuteSimulationClock(object):
             for bts in session_minutes:
                 if bts == pd.Timestamp(session_label) + pd.Timedelta(hours=9, minutes=30):
                     yield bts, SESSION_START
+                    if self.minute_emission:
+                        for minute in self.session_minutes(session_label, session_minutes[-1]):
+                            yield minute, MINUTE_END
                 else:
                     yield bts, SESSION_END
@@ -0,0 +1,80 @@
+"""
+VectorizedBacktest over a small selection matrix against hand computed nav , turnover and fees.
+"""
+from collections import namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    from trade.vectorized import VectorizedBacktest
+    from finance.commission import Commission
+except ImportError as e:
+    pytest.skip('vectorized backtest is not importable : %s' % e, allow_module_level=True)
+
+Asset = namedtuple('Asset', ['sid'])
+
+SH, SZ = Asset('600000'), Asset('000001')
+
+# commission rate is cut down after 2015-06-09 , the cutoff session keeps the old rate
+Sessions = ['2015-06-05', '2015-06-08', '2015-06-09', '2015-06-10', '2015-06-11']
+
+Closes = pd.DataFrame({'000001': [20.0, 20.0, 22.0, 24.2, 24.2],
+                       '600000': [10.0, 11.0, 12.0, 12.0, 13.0]}, index=Sessions)
+
+
+def test_run_selection_matrix_nav_turnover_and_fees(monkeypatch):
+    capital = 100000.0
+    backtest = VectorizedBacktest(SimpleNamespace(sessions=Sessions, capital_base=capital),
+                                  commission=Commission(multiplier=5))
+    panel = {field: Closes.copy() for field in ['open', 'high', 'low', 'close']}
+    monkeypatch.setattr(backtest, '_load_panel', lambda assets, lookback: panel)
+    selections = {'2015-06-05': [SH], '2015-06-08': [SH], '2015-06-09': [SH, SZ],
+                  '2015-06-10': [SZ], '2015-06-11': [SZ]}
+    selected, proxy = backtest._selection_matrix(selections)
+    result = backtest._run(selected, proxy)
+    stats = result['stats']
+
+    # rates --- commission 5 * 1e-3 until the cutoff , 5 * 1e-4 after ; transfer 2e-5 on shanghai ;
+    # stamp 1e-3 on sell
+    buy_rates, sell_rates = backtest.commission.calculate_rates(['000001', '600000'], Sessions)
+    np.testing.assert_allclose(buy_rates[2], [5e-3, 5e-3 + 2e-5])
+    np.testing.assert_allclose(sell_rates[2], [6e-3, 6e-3 + 2e-5])
+    np.testing.assert_allclose(buy_rates[3], [5e-4, 5e-4 + 2e-5])
+    np.testing.assert_allclose(sell_rates[3], [1.5e-3, 1.5e-3 + 2e-5])
+
+    # 06-05 buy 600000 with all capital , fee is paid by trimming the position
+    fee0 = capital * 0.00502
+    sh = capital - fee0
+    nav0 = sh
+    # 06-08 hold , 600000 gains 10%
+    sh *= 11 / 10
+    nav1 = sh
+    # 06-09 (cutoff session , old rates) half of 600000 is sold into 000001
+    sh *= 12 / 11
+    nav2_before = sh
+    trade2 = nav2_before / 2
+    fee2 = trade2 * 0.00602 + trade2 * 0.005
+    sh = sz = (nav2_before - fee2) / 2
+    nav2 = sh + sz
+    # 06-10 (new rates) 000001 gains 10% , 600000 is sold into 000001
+    sz *= 24.2 / 22
+    nav3_before = sh + sz
+    fee3 = sh * 0.00152 + sh * 0.0005
+    turnover3 = 2 * sh / nav3_before
+    nav3 = nav3_before - fee3
+    # 06-11 hold , 000001 unchanged
+    nav4 = nav3
+
+    np.testing.assert_allclose(stats['portfolio_value'], [nav0, nav1, nav2, nav3, nav4])
+    np.testing.assert_allclose(stats['commission'], [fee0, 0, fee2, fee3, 0])
+    np.testing.assert_allclose(stats['turnover'], [1, 0, 1, turnover3, 0])
+    np.testing.assert_allclose(stats['trades'], [1, 0, 2, 2, 0])
+    np.testing.assert_allclose(stats['portfolio_cash'], 0, atol=1e-6)
+    np.testing.assert_allclose(stats['returns'], np.array([nav0, nav1, nav2, nav3, nav4]) /
+                               np.array([capital, nav0, nav1, nav2, nav3]) - 1)
+    np.testing.assert_allclose(result['weights'].loc['2015-06-09'], [0.5, 0.5])
+    np.testing.assert_allclose(result['weights'].loc['2015-06-10'], [1, 0])
+    np.testing.assert_allclose(result['position_pnl'].loc['2015-06-08'], [0, nav1 - nav0])
@@ -8,9 +8,12 @@ Created on Tue Mar 12 15:37:47 2019
 import pandas as pd
 from contextlib import ExitStack
 from util.api_support import AlgoAPI
+from gateway.driver.data_portal import portal
+from util.profiling import logger, tracer
 from trade import (
     SESSION_START,
     SESSION_END,
+    MINUTE_END,
     BEFORE_TRADING_START
 )
 
@@ -26,6 +29,9 @@ class AlgorithmSimulator(object):
         session start:
                         a.基于可行域 -- 调用blotter模块(orders --- transactions)
                         b.transactions --- update ledger
+        minute end (minute mode):
+                        a. orders due on the minute are matched against its bar --- transactions
+                           update ledger in one batch , unfilled orders wait for the next minute
         session end:
                         a.调用metrics_tracker --- generate metrics_perf
         simulation_end:
@@ -50,10 +56,22 @@ class AlgorithmSimulator(object):
         ledger = self.algorithm.ledger
         broker = self.algorithm.broker
         metrics_tracker = self.algorithm.tracker
+        algorithm = self.algorithm
+        event_manager = self.algorithm.event_manager
+
+        minute_emission = getattr(self.clock, 'minute_emission', False)
+        # rules of scheduled callbacks are compiled once , dts without trigger are skipped
+        event_manager.schedule(self.algorithm.sim_params.sessions, minute_emission)
 
         def once_a_day(dts):
             dts = dts.strftime('%Y-%m-%d') if isinstance(dts, pd.Timestamp) else dts
-            broker.implement_broke(ledger, dts)
+            if minute_emission:
+                broker.schedule_broke(ledger, dts)
+            else:
+                broker.implement_broke(ledger, dts)
+
+        def every_minute(dt):
+            broker.process_minute(ledger, dt)
 
         def on_exit():
             # Remove references to algo, data portal, et al to break cycles
@@ -75,14 +93,26 @@ class AlgorithmSimulator(object):
 
             # 生成器yield方法 ，返回yield 生成的数据，next 执行yield 之后的方法
             for session_label, action in self.clock:
-                print('session_label and action :', session_label, action)
+                logger.debug('session_label and action : %s %s', session_label, action)
                 if action == BEFORE_TRADING_START:
-                    metrics_tracker.handle_market_open(session_label, ledger)
+                    with tracer.span('metrics.handle_market_open'):
+                        metrics_tracker.handle_market_open(session_label, ledger)
                 elif action == SESSION_START:
-                    once_a_day(session_label)
+                    event_manager.handle_data(algorithm, portal, session_label)
+                    with tracer.span('broker.implement_broke'):
+                        once_a_day(session_label)
+                elif action == MINUTE_END:
+                    event_manager.handle_data(algorithm, portal, session_label)
+                    every_minute(session_label)
                 elif action == SESSION_END:
+                    if minute_emission:
+                        broker.flush_pending(ledger)
                     # Get a perf message for the given datetime.
-                    yield metrics_tracker.handle_market_close(session_label, ledger)
+                    with tracer.span('metrics.handle_market_close'):
+                        perf = metrics_tracker.handle_market_close(session_label, ledger)
+                    # leave SessionContext of session entered by broker
+                    portal.enter_session(None)
+                    yield perf
 
             yield metrics_tracker.handle_simulation_end(ledger)
 
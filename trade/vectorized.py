@@ -0,0 +1,270 @@
+# !/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import numpy as np, pandas as pd
+from collections import defaultdict
+from gateway.driver.data_portal import portal
+from gateway.driver.benchmark_source import BenchmarkSource
+from _calendar.trading_calendar import calendar
+from finance.commission import NoCommission
+from risk.allocation import Equal
+from metric import default_metrics
+from metric.tracker import MetricsTracker
+from util.profiling import logger, tracer
+
+PanelFields = ['open', 'high', 'low', 'close']
+
+
+class _ReplayPortfolio(object):
+    """
+        portfolio fields read by metrics (see metric.metrics) , replayed from arrays
+    """
+    __slots__ = ['pnl', 'returns', 'utility', 'portfolio_cash', 'portfolio_value',
+                 'positions_values', 'current_portfolio_weights', 'portfolio_daily_value']
+
+    def __init__(self, sessions, capital_base):
+        self.pnl = 0.0
+        self.returns = 0.0
+        self.utility = 0.0
+        self.portfolio_cash = capital_base
+        self.portfolio_value = capital_base
+        self.positions_values = 0.0
+        self.current_portfolio_weights = dict()
+        self.portfolio_daily_value = pd.Series(index=sessions, dtype='float64')
+
+
+class _ReplayPositionTracker(object):
+
+    def __init__(self):
+        # no position objects in vectorized mode
+        self.record_closed_position = defaultdict(list)
+
+
+class _ReplayLedger(object):
+    """
+        ledger interface of MetricsTracker (start_of_session , end_of_session , portfolio ,
+        daily_position_pnl) stepping over the result of VectorizedBacktest
+    """
+    def __init__(self, result, capital_base):
+        self._result = result
+        self._loc = -1
+        self.portfolio = _ReplayPortfolio(result['stats'].index, capital_base)
+        self.position_tracker = _ReplayPositionTracker()
+
+    def start_of_session(self, session_ix):
+        self._loc += 1
+        # value of the previous close (as Portfolio.record_daily_value)
+        self.portfolio.portfolio_daily_value[session_ix] = self.portfolio.portfolio_value
+
+    def end_of_session(self):
+        stats = self._result['stats'].iloc[self._loc]
+        p = self.portfolio
+        p.pnl = stats['portfolio_value'] - self._result['capital_base']
+        p.returns = stats['portfolio_value'] / self._result['capital_base'] - 1
+        p.portfolio_cash = stats['portfolio_cash']
+        p.portfolio_value = stats['portfolio_value']
+        p.positions_values = stats['positions_values']
+        p.utility = stats['utility']
+        weights = self._result['weights'].iloc[self._loc]
+        p.current_portfolio_weights = weights[weights != 0].to_dict()
+
+    def daily_position_pnl(self, dts):
+        pnl = self._result['position_pnl'].iloc[self._loc]
+        return pnl[pnl != 0].to_dict()
+
+    def get_transactions(self, dt):
+        # vectorized mode trades weights not transactions
+        return []
+
+
+class VectorizedBacktest(object):
+    """
+        fast backtest of the pipeline selections for research screens , thousands of variants
+        can be screened before full simulation (Broker -> Division -> SimulationBlotter -> Ledger)
+
+        1 selections --- per session selected assets , held for holding_period sessions
+        2 weights --- allocation model (Equal , Turtle) vectorized by CapitalUsage.weights
+        3 trading --- rebalance to weights on the close of session whose selections change over
+                      the adjusted close panel , commission by the rate rules of CommissionModel
+                      (min_cost per trade)
+        4 metrics --- MetricsTracker packets replayed over the daily stats
+
+        results are stored in cache (util.cache.ResultCache) keyed by selections , sessions and
+        the params of models , so re-running a screen loads instead of simulating
+
+        simplifications : no lot size (tick_size) , no price limit , no slippage , no order split ;
+        suspended sessions keep the previous close
+    """
+    def __init__(self,
+                 sim_params,
+                 allocation=None,
+                 commission=None,
+                 holding_period=1,
+                 metrics_set=None,
+                 benchmark_returns=None,
+                 cache=None):
+        self.sim_params = sim_params
+        self.allocation = allocation or Equal()
+        self.commission = commission or NoCommission()
+        self.holding_period = holding_period
+        self._metrics_set = metrics_set
+        self._benchmark_returns = benchmark_returns
+        self.cache = cache
+
+    @property
+    def sessions(self):
+        return list(self.sim_params.sessions)
+
+    @property
+    def benchmark_returns(self):
+        if self._benchmark_returns is None:
+            source = BenchmarkSource(self.sim_params.sessions)
+            self._benchmark_returns = source.calculate_returns(self.sim_params.benchmark)
+        return self._benchmark_returns
+
+    def _selection_matrix(self, selections):
+        """
+        :param selections: dict session -> assets (e.g. Engine.compute_selections) or
+                           bool DataFrame index --- sessions , columns --- assets
+        :return: bool DataFrame (sessions , sid) , dict sid -> asset
+        """
+        if isinstance(selections, pd.DataFrame):
+            proxy = {asset.sid: asset for asset in selections.columns}
+            selected = selections.copy()
+            selected.columns = [asset.sid for asset in selections.columns]
+        else:
+            proxy = {asset.sid: asset for assets in selections.values() for asset in assets}
+            selected = pd.DataFrame(False, index=self.sessions, columns=sorted(proxy))
+            for session, assets in selections.items():
+                if session in selected.index:
+                    selected.loc[session, [asset.sid for asset in assets]] = True
+        selected = selected.reindex(self.sessions).fillna(False).astype(bool)
+        if self.holding_period > 1:
+            selected = selected.rolling(self.holding_period, min_periods=1).max().astype(bool)
+        return selected, proxy
+
+    def _load_panel(self, assets, lookback):
+        """
+            adjusted OHLC panel of sessions plus lookback , dict field -> DataFrame (sessions , sid)
+        """
+        sessions = self.sessions
+        sdate = calendar.dt_window_size(sessions[0], - abs(lookback)) if lookback else sessions[0]
+        with tracer.span('vectorized.load_panel'):
+            arrays, _ = portal.get_history_panel(assets, [sdate, sessions[-1]], PanelFields, 'daily')
+        panel = dict()
+        for field in PanelFields:
+            frame = pd.DataFrame({sid: arrays[sid][field] for sid in arrays
+                                  if not arrays[sid].empty})
+            frame.index = frame.index.astype(str)
+            panel[field] = frame.sort_index()
+        return panel
+
+    def _simulate(self, weights, rebalance, close, buy_rates, sell_rates):
+        """
+            rebalance on close of sessions whose selections change , otherwise holdings drift
+            with returns between closes
+        """
+        capital_base = self.sim_params.capital_base
+        min_cost = self.commission.min_cost
+        returns = np.nan_to_num(close[1:] / close[:-1] - 1, nan=0.0, posinf=0.0, neginf=0.0)
+        returns = np.vstack([np.zeros(close.shape[1]), returns])
+        length, width = weights.shape
+        holdings = np.zeros(width)
+        cash = capital_base
+        out = np.zeros((length, 6))
+        holding_values = np.zeros((length, width))
+        position_pnl = np.zeros((length, width))
+        for loc in range(length):
+            position_pnl[loc] = holdings * returns[loc]
+            holdings = holdings * (1 + returns[loc])
+            nav = holdings.sum() + cash
+            target = weights[loc] * nav if rebalance[loc] else holdings
+            trades = target - holdings
+            traded = np.abs(trades) > 1e-8
+            fees = np.where(trades > 0, trades * buy_rates[loc], -trades * sell_rates[loc])
+            fees = np.where(traded, np.maximum(fees, min_cost), 0.0)
+            cost = fees.sum()
+            # fees are paid from cash , positions are trimmed if cash is not enough
+            scale = min(1.0, (nav - cost) / target.sum()) if target.sum() > 0 else 1.0
+            holdings = target * scale
+            cash = nav - cost - holdings.sum()
+            value = holdings.sum() + cash
+            holding_values[loc] = holdings
+            out[loc] = [value, holdings.sum(), cash,
+                        np.abs(trades).sum() / nav if nav else 0.0, cost, traded.sum()]
+        stats = pd.DataFrame(out, index=self.sessions,
+                             columns=['portfolio_value', 'positions_values', 'portfolio_cash',
+                                      'turnover', 'commission', 'trades'])
+        stats['returns'] = stats['portfolio_value'].pct_change().fillna(
+            stats['portfolio_value'].iloc[0] / capital_base - 1)
+        stats['utility'] = stats['positions_values'] / stats['portfolio_value']
+        return stats, holding_values, position_pnl
+
+    def run(self, selections):
+        """
+        :param selections: see _selection_matrix
+        :return: dict stats (daily nav , returns , turnover , commission , trades) ,
+                 weights and position_pnl (sessions , sid)
+        """
+        selected, proxy = self._selection_matrix(selections)
+        if self.cache is None:
+            return self._run(selected, proxy)
+        return self.cache.fetch('vectorized',
+                                lambda: self._run(selected, proxy),
+                                selected=selected,
+                                sessions=self.sessions,
+                                capital_base=self.sim_params.capital_base,
+                                allocation=self.allocation,
+                                commission=self.commission,
+                                holding_period=self.holding_period)
+
+    def _run(self, selected, proxy):
+        lookback = getattr(self.allocation, 'window', 0) + 1
+        panel = self._load_panel([proxy[sid] for sid in selected.columns], lookback)
+        # assets without kline are never held
+        selected = selected.reindex(columns=panel['close'].columns, fill_value=False)
+        with tracer.span('vectorized.weights'):
+            weights = self.allocation.weights(selected, panel)
+        # suspended sessions keep the previous close
+        close = panel['close'].reindex(panel['close'].index.union(self.sessions)).ffill()
+        close = close.reindex(index=self.sessions, columns=selected.columns)
+        buy_rates, sell_rates = self.commission.calculate_rates(list(selected.columns), self.sessions)
+        rebalance = selected.ne(selected.shift()).any(axis=1).values
+        with tracer.span('vectorized.simulate'):
+            stats, holdings, position_pnl = self._simulate(weights.values, rebalance, close.values,
+                                                           buy_rates, sell_rates)
+        logger.debug('vectorized stats %s', stats)
+        nav = stats['portfolio_value'].values[:, None]
+        return {
+            'capital_base': self.sim_params.capital_base,
+            'stats': stats,
+            'weights': pd.DataFrame(holdings / nav, index=self.sessions, columns=selected.columns),
+            'position_pnl': pd.DataFrame(position_pnl, index=self.sessions, columns=selected.columns)
+        }
+
+    def emit_packets(self, result):
+        """
+            MetricsTracker packets of result --- daily packets followed by the simulation end packet
+            (same as AlgorithmSimulator.transform)
+        """
+        metrics_set = self._metrics_set if self._metrics_set is not None else default_metrics()
+        tracker = MetricsTracker(sim_params=self.sim_params,
+                                 benchmark_returns=self.benchmark_returns,
+                                 metrics_sets=metrics_set)
+        ledger = _ReplayLedger(result, self.sim_params.capital_base)
+        tracker.handle_start_of_simulation(ledger)
+        for session in self.sessions:
+            tracker.handle_market_open(session, ledger)
+            yield tracker.handle_market_close(pd.Timestamp(session) + pd.Timedelta(hours=15), ledger)
+        yield tracker.handle_simulation_end(ledger)
+
+    def transform(self, selections):
+        result = self.run(selections)
+        return list(self.emit_packets(result))
+
+
+__all__ = ['VectorizedBacktest']
@@ -4,13 +4,15 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
-from collections import MutableMapping
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from functools import partial
-from distutils import dir_util
-from shutil import rmtree, move
-from tempfile import mkdtemp, NamedTemporaryFile
-import os, pickle, errno, pandas as pd
-from util.paths import ensure_directory
+from shutil import rmtree
+from tempfile import mkdtemp
+import os, io, json, pickle, errno, hashlib, numpy as np, pandas as pd
+from util.paths import ensure_directory, cache_path
+from util.context_tricks import nop_context
+from util.profiling import logger, tracer
 
 
 # cacheObject --- bar_reader
@@ -176,7 +178,7 @@ class dataframe_cache(MutableMapping):
                  serialization='msgpack'):
         # create directory
         self.path = path if path is not None else mkdtemp()
-        self.lock = lock if lock is not None else nop_context
+        self.lock = lock if lock is not None else nop_context()
         self.clean_on_failure = clean_on_failure
 
         if serialization == 'msgpack':
@@ -256,3 +258,303 @@ class dataframe_cache(MutableMapping):
             type(self).__name__,
             ', '.join(map(repr, sorted(self))),
         )
+
+
+# --- content addressed result cache (history windows , backtest outputs)
+
+def _canonical(obj):
+    """
+        json compatible form of key parts , arrays and frames are reduced to their digest
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        digest = hashlib.sha1(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+        return [type(obj).__name__, list(map(str, getattr(obj, 'columns', []))), digest.hexdigest()]
+    if isinstance(obj, np.ndarray):
+        return [str(obj.dtype), obj.shape, hashlib.sha1(np.ascontiguousarray(obj).tobytes()).hexdigest()]
+    if isinstance(obj, (set, frozenset)):
+        return sorted(map(_canonical, obj), key=repr)
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(item) for item in obj]
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (np.integer, np.floating, np.bool_)):
+        return obj.item()
+    if hasattr(obj, 'sid'):
+        # Asset
+        return obj.sid
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if hasattr(obj, '__dict__'):
+        # models (allocation , commission ...) are keyed by their params
+        return [type(obj).__name__, _canonical(vars(obj))]
+    return repr(obj)
+
+
+def content_key(*parts, **params):
+    """
+        sha1 of (parts , params) e.g. (data version , sessions , sids , fields , params) ,
+        equal contents map to the same key regardless of order of sets and dict keys
+    """
+    payload = json.dumps([_canonical(parts), _canonical(params)], sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _frame_to_feather(frame):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    sink = io.BytesIO()
+    feather.write_feather(pa.Table.from_pandas(frame, preserve_index=True), sink)
+    return sink.getvalue()
+
+
+def _feather_to_frame(data):
+    import pyarrow.feather as feather
+    return feather.read_table(io.BytesIO(data)).to_pandas()
+
+
+def _dump_frame(frame):
+    """
+        Arrow / Feather if pyarrow is installed and frame is arrow compatible , pickle otherwise
+    """
+    series = isinstance(frame, pd.Series)
+    try:
+        data = _frame_to_feather(frame.to_frame() if series else frame)
+        return (b'S' if series else b'F') + data
+    except Exception as e:
+        logger.debug('feather serialization failed %r , pickled instead', e)
+        return b'P' + pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def dumps(value):
+    """
+    :param value: DataFrame , Series , (nested) dict of them (history windows , backtest
+                  outputs) or any picklable object
+    :return: bytes
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _dump_frame(value)
+    if isinstance(value, dict):
+        # frames of nested dicts are serialized one by one
+        bundle = {key: (True, dumps(item)) if isinstance(item, (pd.DataFrame, pd.Series, dict))
+                  else (False, item) for key, item in value.items()}
+        return b'B' + pickle.dumps(bundle, protocol=pickle.HIGHEST_PROTOCOL)
+    return b'P' + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    tag, body = data[:1], data[1:]
+    if tag == b'F':
+        return _feather_to_frame(body)
+    if tag == b'S':
+        return _feather_to_frame(body).iloc[:, 0]
+    if tag == b'B':
+        bundle = pickle.loads(body)
+        return {key: loads(item) if nested else item for key, (nested, item) in bundle.items()}
+    return pickle.loads(body)
+
+
+class DiskStore(object):
+    """
+    Size bounded LRU store of bytes , one file per key under path.
+
+    Parameters
+    ----------
+    path : str , optional
+        Defaults to the ``results`` directory of the cache root.
+    max_bytes : int
+        Least recently used files are evicted once the total size exceeds it ,
+        recency survives restarts through the modified time of files.
+
+    Several processes (e.g. pickled copies sent to pool workers) may share path , entries
+    written by another process are adopted on lookup and eviction rescans the directory
+    so that max_bytes bounds the files of all writers.
+    """
+    suffix = '.bin'
+
+    def __init__(self, path=None, max_bytes=2 ** 30):
+        self.path = path if path is not None else cache_path(['results'])
+        self.max_bytes = max_bytes
+        ensure_directory(self.path)
+        self._scan()
+
+    def _scan(self):
+        """
+            rebuild the index from files on disk , least recently used first
+        """
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.name[:-len(self.suffix)], stat.st_size))
+        self._sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total = sum(self._sizes.values())
+
+    def _keypath(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def _adopt(self, key):
+        """
+            index file of key written by another process
+        """
+        try:
+            size = os.stat(self._keypath(key)).st_size
+        except FileNotFoundError:
+            return False
+        self._sizes[key] = size
+        self._total += size
+        return True
+
+    def __contains__(self, key):
+        return key in self._sizes or os.path.exists(self._keypath(key))
+
+    def __len__(self):
+        return len(self._sizes)
+
+    @property
+    def nbytes(self):
+        return self._total
+
+    def get(self, key):
+        """
+        :return: bytes or None
+        """
+        if key not in self._sizes and not self._adopt(key):
+            return None
+        try:
+            with open(self._keypath(key), 'rb') as f:
+                data = f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            # removed by another process
+            self._total -= self._sizes.pop(key)
+            return None
+        os.utime(self._keypath(key))
+        self._sizes.move_to_end(key)
+        return data
+
+    def set(self, key, data):
+        # temporary file per process , concurrent writers of key do not interleave
+        tmp = '%s.%d.tmp' % (self._keypath(key), os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._keypath(key))
+        self._total += len(data) - self._sizes.pop(key, 0)
+        self._sizes[key] = len(data)
+        self._evict()
+
+    def delete(self, key):
+        if key in self._sizes:
+            self._total -= self._sizes.pop(key)
+        try:
+            os.remove(self._keypath(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def _evict(self):
+        # files of other writers count towards max_bytes
+        self._scan()
+        while self._total > self.max_bytes and len(self._sizes) > 1:
+            key = next(iter(self._sizes))
+            logger.debug('evict cached result %s', key)
+            self.delete(key)
+
+    def clear(self):
+        self._scan()
+        for key in list(self._sizes):
+            self.delete(key)
+
+
+class RedisStore(object):
+    """
+    Store of bytes on a Redis compatible client (``get`` , ``set(name , value , ex=None)`` ,
+    ``delete``) , eviction is left to the maxmemory policy of server (allkeys-lru).
+
+    Parameters
+    ----------
+    client : redis.Redis or any object with the same get / set / delete
+    prefix : str
+        Namespace of keys.
+    expire : int , optional
+        Seconds to live of entries.
+    """
+    def __init__(self, client, prefix='arkquant:results:', expire=None):
+        self._client = client
+        self.prefix = prefix
+        self.expire = expire
+
+    def __contains__(self, key):
+        return self._client.get(self.prefix + key) is not None
+
+    def get(self, key):
+        return self._client.get(self.prefix + key)
+
+    def set(self, key, data):
+        self._client.set(self.prefix + key, data, ex=self.expire)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+
+class ResultCache(object):
+    """
+    Content addressed cache of results keyed by content_key(namespace , version , parts) ,
+    e.g. history windows (sessions , sids , fields) and backtest outputs (params) ,
+    so that re-running a sweep or a notebook loads instead of recomputing.
+
+    Parameters
+    ----------
+    store : DiskStore or RedisStore , default DiskStore()
+    version : str
+        Data version , bump it when the underlying data changes (e.g. after the spiders
+        run or adjustments are rebuilt) to invalidate every entry at once.
+    """
+    def __init__(self, store=None, version=''):
+        self.store = store if store is not None else DiskStore()
+        self.version = version
+
+    def key(self, namespace, **parts):
+        return content_key(namespace, self.version, **parts)
+
+    def get(self, namespace, **parts):
+        """
+        :raise KeyError: if namespace and parts are not cached
+        """
+        key = self.key(namespace, **parts)
+        data = self.store.get(key)
+        if data is None:
+            tracer.count('cache.miss')
+            raise KeyError(key)
+        tracer.count('cache.hit')
+        return loads(data)
+
+    def set(self, namespace, value, **parts):
+        self.store.set(self.key(namespace, **parts), dumps(value))
+
+    def fetch(self, namespace, compute, **parts):
+        """
+            cached value of namespace and parts , compute() is called and stored on miss
+        """
+        try:
+            return self.get(namespace, **parts)
+        except KeyError:
+            with tracer.span('cache.compute.%s' % namespace):
+                value = compute()
+            self.set(namespace, value, **parts)
+            return value
+
+
+__all__ = [
+    'ExpiredCache',
+    'dataframe_cache',
+    'content_key',
+    'dumps',
+    'loads',
+    'DiskStore',
+    'RedisStore',
+    'ResultCache'
+]
@@ -4,10 +4,14 @@ Created on Tue Mar 12 15:37:47 2019
 
 @author: python
 """
+import numpy as np, pandas as pd
 from abc import ABC, abstractmethod
 from collections import namedtuple
 from util.context_tricks import nop_context
 
+NANOS_IN_MINUTE = 60 * 10 ** 9
+NANOS_IN_DAY = 1440 * NANOS_IN_MINUTE
+
 
 # class Event(object):
 #
@@ -61,15 +65,26 @@ class EventManager(object):
         else:
             self._events.append(event)
 
+    def schedule(self, sessions, minute_emission=False):
+        """
+        Compiles the rules of events into trigger schedules of sessions (see ScheduledRule) ,
+        Always and Never are kept as they cost nothing.
+        """
+        self._events = [
+            event if isinstance(event.rule, (Always, Never, ScheduledRule)) else
+            event._replace(rule=ScheduledRule(event.rule, sessions, minute_emission))
+            for event in self._events
+        ]
+
     # __enter__ __exit_ 调用 __call__
     def handle_data(self, context, data, dt):
+        # rules are checked before entering the context , dts without trigger are skipped
+        triggered = [event for event in self._events if event.rule.should_trigger(dt)]
+        if not triggered:
+            return
         with self._create_context(data):
-            for event in self._events:
-                event.handle_data(
-                    context,
-                    data,
-                    dt,
-                )
+            for event in triggered:
+                event.callback(context, data)
 
 
 class Event(namedtuple('Event', ['rule', 'callback'])):
@@ -125,6 +140,23 @@ class StatelessRule(EventRule):
     def should_trigger(self, dt):
         raise NotImplementedError
 
+    def compile(self, sessions):
+        """
+        Evaluates the rule over sessions at once.
+
+        Parameters
+        ----------
+        sessions : pd.DatetimeIndex
+            The trading sessions (in order) the rule is evaluated over.
+
+        Returns
+        -------
+        (bool ndarray aligned with sessions , minute of day or None)
+            None means the rule triggers on the session regardless of the minute.
+        """
+        mask = np.array([self.should_trigger(session) for session in sessions], dtype=bool)
+        return mask, None
+
     def and_(self, rule):
         """
         Logical and of two rules, triggers only when both rules trigger.
@@ -166,6 +198,16 @@ class ComposedRule(StatelessRule):
             dt
         )
 
+    def compile(self, sessions):
+        if self.composer is not ComposedRule.lazy_and:
+            return super(ComposedRule, self).compile(sessions)
+        first_mask, first_minute = self.first.compile(sessions)
+        second_mask, second_minute = self.second.compile(sessions)
+        mask = first_mask & second_mask
+        if first_minute is not None and second_minute is not None and first_minute != second_minute:
+            mask[:] = False
+        return mask, first_minute if first_minute is not None else second_minute
+
     @staticmethod
     def lazy_and(first_should_trigger, second_should_trigger, dt):
         """
@@ -196,6 +238,9 @@ class Always(StatelessRule):
         return True
     should_trigger = always_trigger
 
+    def compile(self, sessions):
+        return np.ones(len(sessions), dtype=bool), None
+
 
 class Never(StatelessRule):
     """
@@ -209,6 +254,161 @@ class Never(StatelessRule):
         return False
     should_trigger = never_trigger
 
+    def compile(self, sessions):
+        return np.zeros(len(sessions), dtype=bool), None
+
+
+def _nth_of_groups(keys, n):
+    """
+        mask of the nth element of each run of equal keys (n < 0 counts from the end of run)
+    """
+    change = np.empty(len(keys), dtype=bool)
+    change[:1] = True
+    change[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(change)
+    groups = np.cumsum(change) - 1
+    positions = np.arange(len(keys)) - starts[groups]
+    if n >= 0:
+        return positions == n
+    sizes = np.diff(np.append(starts, len(keys)))
+    return positions - sizes[groups] == n
+
+
+class _SessionRule(StatelessRule):
+    """
+    A date rule , should_trigger is served by the rule compiled over the sessions
+    of calendar.
+    """
+    _compiled = None
+
+    def should_trigger(self, dt):
+        if self._compiled is None:
+            from _calendar.trading_calendar import calendar
+            sessions = pd.DatetimeIndex(self.cal.all_sessions if self.cal else calendar.all_sessions)
+            mask, _ = self.compile(sessions)
+            self._compiled = sessions.values[mask].astype('datetime64[ns]').view('int64')
+        day = pd.Timestamp(dt).normalize().value
+        loc = self._compiled.searchsorted(day)
+        return loc < len(self._compiled) and self._compiled[loc] == day
+
+
+class EveryDay(_SessionRule):
+    """
+    A rule that triggers on every trading session.
+    """
+    def compile(self, sessions):
+        return np.ones(len(sessions), dtype=bool), None
+
+
+class NthTradingDayOfWeek(_SessionRule):
+    """
+    A rule that triggers on the nth trading session of ISO week (n < 0 counts from the
+    end of week , -1 is the last trading session).
+    """
+    def __init__(self, n):
+        self.n = n
+
+    def compile(self, sessions):
+        iso = sessions.isocalendar()
+        keys = iso['year'].values.astype('int64') * 100 + iso['week'].values.astype('int64')
+        return _nth_of_groups(keys, self.n), None
+
+
+class NthTradingDayOfMonth(_SessionRule):
+    """
+    A rule that triggers on the nth trading session of month (n < 0 counts from the
+    end of month , -1 is the last trading session).
+    """
+    def __init__(self, n):
+        self.n = n
+
+    def compile(self, sessions):
+        keys = sessions.year.values * 100 + sessions.month.values
+        return _nth_of_groups(keys, self.n), None
+
+
+def week_start(days_offset=0):
+    return NthTradingDayOfWeek(days_offset)
+
+
+def week_end(days_offset=0):
+    return NthTradingDayOfWeek(- 1 - days_offset)
+
+
+def month_start(days_offset=0):
+    return NthTradingDayOfMonth(days_offset)
+
+
+def month_end(days_offset=0):
+    return NthTradingDayOfMonth(- 1 - days_offset)
+
+
+class AtMinute(StatelessRule):
+    """
+    A time rule that triggers on the specific minute of every session , e.g. 10:30
+    """
+    def __init__(self, hour, minute):
+        self.minute = hour * 60 + minute
+
+    def should_trigger(self, dt):
+        dt = pd.Timestamp(dt)
+        return dt.hour * 60 + dt.minute == self.minute
+
+    def compile(self, sessions):
+        return np.ones(len(sessions), dtype=bool), self.minute
+
+
+class ScheduledRule(EventRule):
+    """
+    A rule compiled into the sorted array of trigger timestamps over sessions once ,
+    should_trigger walks a pointer along the array as dts of simulation increase.
+
+    Unlike StatelessRule it is stateful : each trigger fires once , date rules fire on
+    the first dt of session and time rules on the minute (on the session in daily mode ,
+    i.e. minute_emission is False). A dt going backwards resets the pointer.
+
+    Parameters
+    ----------
+    rule : StatelessRule
+    sessions : list of sessions of simulation
+    minute_emission : bool
+    """
+    def __init__(self, rule, sessions, minute_emission=False):
+        self.rule = rule
+        self.cal = rule.cal
+        sessions = pd.DatetimeIndex(sessions)
+        if len(sessions):
+            # rules of week and month depend on the sessions before and after simulation
+            from _calendar.trading_calendar import calendar
+            all_sessions = pd.DatetimeIndex(rule.cal.all_sessions if rule.cal else calendar.all_sessions)
+            mask, minute = rule.compile(all_sessions)
+            triggers = all_sessions[mask]
+            triggers = triggers[(triggers >= sessions[0]) & (triggers <= sessions[-1])]
+        else:
+            triggers, minute = sessions, None
+        self._by_minute = minute_emission and minute is not None
+        offset = minute * NANOS_IN_MINUTE if self._by_minute else 0
+        self.triggers = triggers.values.astype('datetime64[ns]').view('int64') + offset
+        self._loc = 0
+        self._last = None
+
+    def _key(self, dt):
+        value = pd.Timestamp(dt).value
+        return value - value % NANOS_IN_MINUTE if self._by_minute else value - value % NANOS_IN_DAY
+
+    def should_trigger(self, dt):
+        key = self._key(dt)
+        if self._last is not None and key < self._last:
+            self._loc = self.triggers.searchsorted(key)
+        self._last = key
+        triggers = self.triggers
+        if self._loc < len(triggers) and triggers[self._loc] < key:
+            self._loc += triggers[self._loc:].searchsorted(key)
+        if self._loc < len(triggers) and triggers[self._loc] == key:
+            self._loc += 1
+            return True
+        return False
+
 
 __all__ = [
     'EventManager',
@@ -218,4 +418,13 @@ __all__ = [
     'ComposedRule',
     'Always',
     'Never',
+    'EveryDay',
+    'NthTradingDayOfWeek',
+    'NthTradingDayOfMonth',
+    'AtMinute',
+    'ScheduledRule',
+    'week_start',
+    'week_end',
+    'month_start',
+    'month_end',
 ]
@@ -0,0 +1,159 @@
+# -*- coding : utf-8 -*-
+"""
+Created on Tue Mar 12 15:37:47 2019
+
+@author: python
+"""
+import json, logging, threading, time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# level-gated logger replacing print in hot paths --- logger.debug('%s', obj) formats nothing
+# unless DEBUG is enabled e.g. logging.getLogger('ArkQuant').setLevel(logging.DEBUG)
+logger = logging.getLogger('ArkQuant')
+logger.addHandler(logging.NullHandler())
+
+
+class _NullSpan(object):
+    """
+        shared span used when tracer is disabled
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class _Span(object):
+
+    __slots__ = ['_tracer', '_name', '_start']
+
+    def __init__(self, tracer, name):
+        self._tracer = tracer
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._tracer.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Tracer(object):
+    """
+        named spans and counters of a backtest
+        e.g.
+            with tracer.span('pipeline.load'):
+                ...
+            tracer.count('blotter.orders', len(orders))
+
+        disabled by default --- span returns a shared noop context and count returns at once
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # name -> [calls , total seconds , max seconds]
+        self._spans = defaultdict(lambda: [0, 0.0, 0.0])
+        self._counters = defaultdict(int)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def span(self, name):
+        if not self.enabled:
+            return _null_span
+        return _Span(self, name)
+
+    def record(self, name, elapsed):
+        with self._lock:
+            stat = self._spans[name]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += n
+
+    def summary(self):
+        with self._lock:
+            spans = {name: {'calls': calls,
+                            'total': total,
+                            'mean': total / calls if calls else 0.0,
+                            'max': peak}
+                     for name, (calls, total, peak) in self._spans.items()}
+            counters = dict(self._counters)
+        return {'spans': spans, 'counters': counters}
+
+    def to_json(self, path=None):
+        """
+        :param path: file path , None means return json string
+        """
+        text = json.dumps(self.summary(), indent=2, sort_keys=True)
+        if path is None:
+            return text
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def profile(profiler=None, output=None):
+    """
+        capture a profile of the block
+    :param profiler: None , 'cprofile' or 'pyinstrument' (optional dependency)
+    :param output: file path --- pstats dump for cprofile , html for pyinstrument ; None prints
+    """
+    if profiler is None:
+        yield None
+    elif profiler == 'cprofile':
+        import cProfile, pstats
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield prof
+        finally:
+            prof.disable()
+            if output:
+                prof.dump_stats(output)
+            else:
+                pstats.Stats(prof).sort_stats('cumulative').print_stats(30)
+    elif profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError('pyinstrument is required for profiler=pyinstrument')
+        prof = Profiler()
+        prof.start()
+        try:
+            yield prof
+        finally:
+            prof.stop()
+            if output:
+                with open(output, 'w') as f:
+                    f.write(prof.output_html())
+            else:
+                print(prof.output_text(unicode=True))
+    else:
+        raise ValueError('profiler must be None , cprofile or pyinstrument')
+
+
+__all__ = ['logger', 'Tracer', 'tracer', 'profile']
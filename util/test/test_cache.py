@@ -0,0 +1,140 @@
+"""
+Content keys , serialization and stores of the result cache.
+"""
+import os
+import pickle
+import time
+
+import pandas as pd
+import pytest
+
+from util.cache import DiskStore, RedisStore, ResultCache, content_key, dumps, loads
+
+
+class FakeRedis(object):
+    """
+        dict backed stand-in of redis.Redis (get / set / delete)
+    """
+    def __init__(self):
+        self.data = dict()
+        self.expires = dict()
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = bytes(value)
+        self.expires[name] = ex
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+
+def frame():
+    index = pd.Index(['2020-01-02', '2020-01-03', '2020-01-06'])
+    return pd.DataFrame({'open': [1.0, 2.0, 3.0], 'close': [1.5, 2.5, 3.5]}, index=index)
+
+
+def touch(store, key, mtime):
+    path = store._keypath(key)
+    os.utime(path, (mtime, mtime))
+
+
+def test_content_key_ignores_set_and_dict_order():
+    assert content_key('history', sids={'600000', '000001', '300750'}, fields=['close']) == \
+        content_key('history', fields=['close'], sids={'300750', '600000', '000001'})
+    assert content_key({'a': 1, 'b': {'c': 2, 'd': 3}}) == content_key({'b': {'d': 3, 'c': 2}, 'a': 1})
+    # list order matters
+    assert content_key(fields=['open', 'close']) != content_key(fields=['close', 'open'])
+    assert content_key(frame=frame()) == content_key(frame=frame())
+    assert content_key(frame=frame()) != content_key(frame=frame() * 2)
+
+
+def test_dumps_loads_pickle(monkeypatch):
+    import util.cache as cache
+
+    def unavailable(_):
+        raise ImportError('pyarrow')
+
+    monkeypatch.setattr(cache, '_frame_to_feather', unavailable)
+    data = dumps(frame())
+    assert data[:1] == b'P'
+    pd.testing.assert_frame_equal(loads(data), frame())
+    value = {'stats': frame(), 'params': {'n': 3}, 'nested': {'returns': frame()['close']}}
+    loaded = loads(dumps(value))
+    pd.testing.assert_frame_equal(loaded['stats'], value['stats'])
+    pd.testing.assert_series_equal(loaded['nested']['returns'], value['nested']['returns'])
+    assert loaded['params'] == {'n': 3}
+    assert loads(dumps([1, 'a', None])) == [1, 'a', None]
+
+
+def test_dumps_loads_feather():
+    pytest.importorskip('pyarrow')
+    data = dumps(frame())
+    assert data[:1] == b'F'
+    pd.testing.assert_frame_equal(loads(data), frame())
+    series = dumps(frame()['close'])
+    assert series[:1] == b'S'
+    pd.testing.assert_series_equal(loads(series), frame()['close'])
+
+
+def test_disk_store_lru_eviction_and_reopen(tmp_path):
+    store = DiskStore(str(tmp_path), max_bytes=300)
+    now = time.time()
+    for age, key in enumerate(['a', 'b', 'c']):
+        store.set(key, bytes(100))
+        touch(store, key, now - 100 + age)
+    # a is used , b becomes least recent
+    assert store.get('a') == bytes(100)
+    store.set('d', bytes(100))
+    assert 'b' not in store
+    assert {'a', 'c', 'd'} <= set(store._sizes)
+    assert store.nbytes == 300
+
+    reopened = DiskStore(str(tmp_path), max_bytes=300)
+    assert len(reopened) == 3
+    assert next(iter(reopened._sizes)) == 'c'
+    assert reopened.get('d') == bytes(100)
+    assert reopened.get('b') is None
+    reopened.clear()
+    assert len(reopened) == 0 and not os.listdir(str(tmp_path))
+
+
+def test_disk_store_shared_between_processes(tmp_path):
+    store = DiskStore(str(tmp_path), max_bytes=250)
+    # pool workers receive pickled copies of the store
+    worker = pickle.loads(pickle.dumps(store))
+    worker.set('a', bytes(100))
+    assert 'a' in store
+    assert store.get('a') == bytes(100)
+
+    touch(store, 'a', time.time() - 100)
+    worker.set('b', bytes(100))
+    # files of the worker count towards max_bytes of the original
+    store.set('c', bytes(100))
+    assert sorted(os.listdir(str(tmp_path))) == ['b.bin', 'c.bin']
+    assert store.nbytes == 200
+
+
+def test_redis_store_against_fake_client():
+    client = FakeRedis()
+    store = RedisStore(client, prefix='test:', expire=60)
+    assert store.get('a') is None and 'a' not in store
+    store.set('a', b'value')
+    assert client.data == {'test:a': b'value'} and client.expires['test:a'] == 60
+    assert 'a' in store and store.get('a') == b'value'
+    store.delete('a')
+    assert 'a' not in store
+
+    cache = ResultCache(store, version='v1')
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return frame()
+
+    pd.testing.assert_frame_equal(cache.fetch('history', compute, sids={'1', '2'}), frame())
+    pd.testing.assert_frame_equal(cache.fetch('history', compute, sids={'2', '1'}), frame())
+    assert len(calls) == 1
+    with pytest.raises(KeyError):
+        ResultCache(store, version='v2').get('history', sids={'1', '2'})